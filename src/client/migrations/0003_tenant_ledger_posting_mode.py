@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0002_branch_contact_email_branch_contact_phone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenant',
+            name='ledger_posting_mode',
+            field=models.CharField(choices=[('invoice', 'One entry per invoice'), ('daily_summary', 'One summary entry per branch per day')], default='invoice', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0003_tenant_ledger_posting_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenant',
+            name='ledger_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0004_tenant_ledger_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenant',
+            name='chart_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -6,10 +6,20 @@ from django.utils.translation import gettext_lazy as _
 
 
 class Tenant(models.Model):
+    LEDGER_POSTING_CHOICES = [
+        ("invoice", _("One entry per invoice")),
+        ("daily_summary", _("One summary entry per branch per day")),
+    ]
+
     logo = models.ImageField(null=True, blank=True)
     name = models.CharField(max_length=150)
     slug = models.SlugField(max_length=150, unique=True)
     is_active = models.BooleanField(default=True)
+    ledger_posting_mode = models.CharField(max_length=20, choices=LEDGER_POSTING_CHOICES, default="invoice")
+    # Bumped after every committed ledger or sales write; report caches are keyed on it.
+    ledger_version = models.PositiveBigIntegerField(default=0, editable=False)
+    # Bumped whenever a ledger account changes; the cached chart of accounts is keyed on it.
+    chart_version = models.PositiveBigIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -1,7 +1,13 @@
+from datetime import date
+from decimal import Decimal
+
 from django.contrib.auth.models import User
 from django.test import Client, TestCase
 from django.urls import reverse
 
+from store.models import BranchStock, Category, Products
+from store.rollups import add_daily_totals, branch_comparison
+
 from .models import Branch, BranchMember, Store, StoreMember, Tenant, TenantMember
 
 
@@ -39,6 +45,47 @@ class BranchManagementViewTests(TestCase):
         self.assertEqual(response.context["selected_branch"], self.branch_a)
         self.assertContains(response, "Branch Management")
 
+    def test_branch_comparison_ranks_branches_with_grouped_queries(self):
+        self._set_context(self.owner, self.branch_a)
+        branch_c = Branch.objects.create(store=self.store, name="Branch C")
+        today = date.today()
+        add_daily_totals(self.tenant.id, self.branch_a.id, today, sales_total=Decimal("100.00"), bill_count=2)
+        add_daily_totals(self.tenant.id, self.branch_a.id, today, expense_total=Decimal("80.00"))
+        add_daily_totals(self.tenant.id, self.branch_b.id, today, sales_total=Decimal("50.00"), bill_count=1)
+        category = Category.objects.create(tenant=self.tenant, name="Food", description="Food")
+        product = Products.objects.create(
+            tenant=self.tenant,
+            category=category,
+            name="Rice",
+            package_contain=10,
+            package_purchase_price=Decimal("500.00"),
+            package_sale_price=Decimal("600.00"),
+            num_of_packages=3,
+            total_package_price=Decimal("1500.00"),
+            item_sale_price=Decimal("60.00"),
+            num_items=0,
+            stock=35,
+        )
+        BranchStock.objects.create(branch=self.branch_a, product=product, stock=30)
+        BranchStock.objects.create(branch=branch_c, product=product, stock=5)
+        params = {"branch_id": self.branch_a.id, "from_date": today.isoformat(), "to_date": today.isoformat()}
+
+        response = self.client.get(reverse("branch-management"), params)
+        rows = response.context["comparison_rows"]
+        self.assertEqual([row["branch"] for row in rows], [self.branch_b, self.branch_a, branch_c])
+        self.assertEqual([row["profit_rank"] for row in rows], [1, 2, 3])
+        self.assertEqual(rows[1]["profit_total"], Decimal("20.00"))
+        self.assertEqual(rows[1]["employee_count"], 1)
+        self.assertEqual(response.context["selected_snapshot"]["sales_count"], 2)
+
+        with self.assertNumQueries(3):
+            branch_comparison(self.tenant, [self.branch_a, self.branch_b, branch_c], today, today)
+
+        response = self.client.get(reverse("branch-management"), {**params, "sort": "stock"})
+        rows = response.context["comparison_rows"]
+        self.assertEqual([row["branch"] for row in rows], [self.branch_a, branch_c, self.branch_b])
+        self.assertEqual(rows[0]["stock_total"], 30)
+
     def test_staff_cannot_access_branch_management_page(self):
         self._set_context(self.staff, self.branch_a)
 
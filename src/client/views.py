@@ -4,7 +4,6 @@ from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.db import transaction
-from django.db.models import Count, Q, Sum
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils.dateparse import parse_date
@@ -12,8 +11,10 @@ from django.utils import timezone
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.utils.translation import activate, gettext_lazy as _
 
+from store.carts import forget_cart
 from store.utils import safe_int
-from store.models import BranchStock, Expense, InventoryMovement, OtherIncome, SalesDetails
+from store.models import InventoryMovement
+from store.rollups import BRANCH_RANKINGS, branch_comparison
 
 from .forms import BranchEmployeeForm, BranchSettingsForm, RegistrationForm, UserActivationForm
 from .models import BranchMember, StoreMember, Tenant, TenantMember, UserOnboarding
@@ -46,48 +47,6 @@ def _resolve_branch_date_range(request):
     return start_date, end_date
 
 
-def _branch_report_snapshot(tenant, branch, start_date, end_date):
-    sales_total = (
-        SalesDetails.objects
-        .filter(tenant=tenant, branch=branch, created_at__date__range=(start_date, end_date))
-        .aggregate(total=Sum("total_amount"), count=Count("id"))
-    )
-    income_total = (
-        OtherIncome.objects
-        .filter(tenant=tenant, branch=branch, date_created__range=(start_date, end_date))
-        .aggregate(total=Sum("amount"))
-    )
-    expense_total = (
-        Expense.objects
-        .filter(tenant=tenant, branch=branch, date_created__range=(start_date, end_date))
-        .aggregate(total=Sum("amount"))
-    )
-    stock_total = (
-        BranchStock.objects
-        .filter(branch=branch)
-        .aggregate(
-            total_stock=Sum("stock"),
-            active_products=Count("id", filter=Q(stock__gt=0)),
-            tracked_products=Count("id"),
-        )
-    )
-    sales_amount = sales_total["total"] or 0
-    income_amount = income_total["total"] or 0
-    expense_amount = expense_total["total"] or 0
-    return {
-        "branch": branch,
-        "sales_count": sales_total["count"] or 0,
-        "sales_total": sales_amount,
-        "income_total": income_amount,
-        "expense_total": expense_amount,
-        "profit_total": sales_amount + income_amount - expense_amount,
-        "stock_total": stock_total["total_stock"] or 0,
-        "active_products": stock_total["active_products"] or 0,
-        "tracked_products": stock_total["tracked_products"] or 0,
-        "employee_count": branch.memberships.count(),
-    }
-
-
 def switch_language(request, lang_code):
     if lang_code in ["en", "fa"]:
         activate(lang_code)
@@ -246,7 +205,7 @@ def select_tenant(request):
         request.session["active_tenant_id"] = allowed.tenant_id
         request.session.pop("active_branch_id", None)
         request.session.pop("active_store_id", None)
-        request.session.pop("cart", None)
+        forget_cart(request)
         request.session.pop("customer", None)
 
         branches = get_accessible_branches(request.user, allowed.tenant)
@@ -326,7 +285,7 @@ def select_branch(request):
 
         request.session["active_branch_id"] = branch.id
         request.session["active_store_id"] = branch.store_id
-        request.session.pop("cart", None)
+        forget_cart(request)
         request.session.pop("customer", None)
         return redirect("home")
 
@@ -356,7 +315,7 @@ def switch_context(request):
 
     request.session["active_branch_id"] = branch.id
     request.session["active_store_id"] = branch.store_id
-    request.session.pop("cart", None)
+    forget_cart(request)
     request.session.pop("customer", None)
 
     next_url = request.POST.get("next") or request.META.get("HTTP_REFERER") or ""
@@ -453,11 +412,9 @@ def branch_management(request):
                 messages.success(request, _("Employee role updated successfully."))
             return redirect(_branch_management_redirect_url(selected_branch, start_date, end_date))
 
-    selected_snapshot = _branch_report_snapshot(tenant, selected_branch, start_date, end_date)
-    comparison_rows = [
-        _branch_report_snapshot(tenant, branch, start_date, end_date)
-        for branch in branches
-    ]
+    comparison_sort = request.GET.get("sort") if request.GET.get("sort") in BRANCH_RANKINGS else "profit"
+    comparison_rows = branch_comparison(tenant, branches, start_date, end_date, sort=comparison_sort)
+    selected_snapshot = next(row for row in comparison_rows if row["branch"].id == selected_branch.id)
     recent_activity = (
         InventoryMovement.objects
         .select_related("product", "created_by")
@@ -480,6 +437,7 @@ def branch_management(request):
         "selected_branch": selected_branch,
         "selected_snapshot": selected_snapshot,
         "comparison_rows": comparison_rows,
+        "comparison_sort": comparison_sort,
         "recent_activity": recent_activity,
         "branch_members": branch_members,
         "branch_form": branch_form,
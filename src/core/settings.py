@@ -162,6 +162,41 @@ STATICFILES_FINDERS = [
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Ledger posting
+# When enabled, checkout writes journal entries to the LedgerOutbox table and
+# `python manage.py drain_ledger_outbox` posts them outside the request.
+LEDGER_DEFERRED_POSTING = False
+
+# Cached financial_reports/summary results are invalidated by Tenant.ledger_version;
+# the timeout only ages out entries for versions that are no longer read.
+REPORT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Seconds identical report requests wait on the one computing a cache miss. Coalescing
+# spans processes only with a shared cache backend (Redis, Memcached, database).
+REPORT_SINGLE_FLIGHT_TIMEOUT = 30
+
+# Threads shared by report pages to run independent aggregates concurrently, each on its
+# own database connection (so keep the database's connection limit in mind). 0 runs
+# them sequentially.
+REPORT_QUERY_WORKERS = 0
+
+# Bill number sequences: "tenant" (one plain sequence), "store" or "branch" (prefixed
+# sequences per store or branch). A BILL_NUMBER_BLOCK_SIZE above 1 lets each process
+# reserve that many numbers at a time, leaving gaps when a process exits. Checkout takes
+# its number before the sale transaction, so a failed sale leaves a gap as well.
+BILL_NUMBER_SCOPE = "tenant"
+BILL_NUMBER_BLOCK_SIZE = 1
+
+# Where sale carts live: "db" (Cart/CartLine tables) or "cache" (the default cache, so
+# it must be shared between processes). Sessions keep only the cart id. Carts untouched
+# for CART_MAX_AGE seconds are abandoned: cache keys expire and "manage.py purge_carts"
+# deletes database carts.
+CART_STORE_BACKEND = "db"
+CART_MAX_AGE = 60 * 60 * 24
+
+# Jalali month the fiscal year starts in (10 = Jadi, Afghanistan's government fiscal year).
+JALALI_FISCAL_START_MONTH = 10
+
 # Define the media root and URL
 MEDIA_URL = '/media/'  # URL to access media files
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')  # Path where files are stored
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:23
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def backfill_business_date(apps, schema_editor):
+    CustomerPayment = apps.get_model("customer", "CustomerPayment")
+    CustomerPayment.objects.update(business_date=TruncDate("created_at"))
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customerpayment',
+            name='business_date',
+            field=models.DateField(default=django.utils.timezone.localdate, editable=False),
+        ),
+        migrations.RunPython(backfill_business_date, noop_reverse),
+        migrations.AddIndex(
+            model_name='customerpayment',
+            index=models.Index(fields=['tenant', 'branch', 'business_date'], name='payment_tenant_branch_date_idx'),
+        ),
+    ]
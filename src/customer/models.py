@@ -2,6 +2,7 @@ from decimal import Decimal
 
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -57,9 +58,13 @@ class CustomerPayment(models.Model):
     payment_method = models.CharField(max_length=255, choices=PAYMENT_METHOD, default="cash")
     note = models.TextField(max_length=255, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    business_date = models.DateField(default=timezone.localdate, editable=False)
 
     class Meta:
         db_table = "store_customerpayment"
+        indexes = [
+            models.Index(fields=["tenant", "branch", "business_date"], name="payment_tenant_branch_date_idx"),
+        ]
 
     def clean(self):
         super().clean()
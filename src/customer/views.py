@@ -7,6 +7,7 @@ from django.utils.translation import gettext_lazy as _
 
 from client.services import active_branch, active_tenant
 from store.accounting import record_customer_payment_entry
+from store.rollups import add_sale_totals
 from store.utils import to_decimal
 
 from .forms import CustomerForm, CustomerPaymentForm
@@ -195,6 +196,7 @@ def create_payment(request, cid):
                     sale.unpaid_amount = current_unpaid - allocation
                     sale.paid_amount = to_decimal(sale.paid_amount or 0) + allocation
                     sale.save(update_fields=["unpaid_amount", "paid_amount"])
+                    add_sale_totals(sale, paid_total=allocation, unpaid_total=-allocation)
                     remaining_payment -= allocation
                     if remaining_payment <= Decimal("0.00"):
                         break
@@ -206,7 +208,7 @@ def create_payment(request, cid):
                     store=store,
                     branch=branch,
                     created_by=request.user,
-                    reference_id=payment.id,
+                    reference_id=f"PAYMENT-{payment.id}",
                 )
             messages.success(request, _("Customer payment added successfully."))
             return redirect("create-payment", cid=customer_obj.id)
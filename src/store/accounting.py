@@ -1,12 +1,37 @@
+from datetime import timedelta
 from decimal import Decimal, ROUND_HALF_UP
+from functools import partial
 
-from django.db import transaction
-from django.db.models import Sum
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Max, Min, Q, Sum
+from django.utils import timezone
 
-from .models import JournalEntry, JournalLine, LedgerAccount
+from .models import (
+    AccountingPeriod,
+    Branch,
+    JournalEntry,
+    JournalLine,
+    LedgerAccount,
+    LedgerDailyBalance,
+    LedgerOutbox,
+    PeriodClosingBalance,
+    SaleLedgerStaging,
+    Store,
+    Tenant,
+    bump_chart_version,
+)
 
 MONEY_PLACES = Decimal("0.01")
 ZERO = Decimal("0.00")
+BULK_BATCH_SIZE = 500
+ROLLUP_LOOKUP_CHUNK = 100
+OUTBOX_BATCH_SIZE = 500
+DAILY_BALANCE_FIELDS = ("debit", "credit", "purchase_debit")
+# Shared row locks by database vendor; SQLite has none and serialises writers anyway.
+SHARED_LOCK_CLAUSES = {"postgresql": "FOR KEY SHARE", "mysql": "FOR SHARE"}
 
 # Essential chart of accounts for inventory retail.
 SYSTEM_ACCOUNTS = {
@@ -33,9 +58,33 @@ def money(value):
         return ZERO
 
 
+ACCOUNT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _account_cache_key(tenant):
+    return f"ledger-accounts:{tenant.pk}:{tenant.chart_version}"
+
+
+def invalidate_account_cache(tenant_id):
+    bump_chart_version(tenant_id)
+
+
 def ensure_default_accounts(tenant):
-    created_or_existing = {}
-    for code, (name, account_type) in SYSTEM_ACCOUNTS.items():
+    """
+    The tenant's chart of accounts by code, served from the shared cache. The key carries
+    the chart_version loaded with the tenant, which every account write bumps, so tenants
+    loaded after a write (the next request) miss the old entry; a freshly loaded chart is
+    only cached once its transaction commits.
+    """
+    key = _account_cache_key(tenant)
+    cached = cache.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    accounts = {account.code: account for account in LedgerAccount.objects.filter(tenant=tenant)}
+    missing = [code for code in SYSTEM_ACCOUNTS if code not in accounts]
+    for code in missing:
+        name, account_type = SYSTEM_ACCOUNTS[code]
         account, _ = LedgerAccount.objects.get_or_create(
             tenant=tenant,
             code=code,
@@ -46,26 +95,21 @@ def ensure_default_accounts(tenant):
                 "is_active": True,
             },
         )
-        created_or_existing[code] = account
-    return created_or_existing
+        accounts[code] = account
+    if missing:
+        # Creating accounts moved the chart version.
+        tenant.refresh_from_db(fields=["chart_version"])
+        key = _account_cache_key(tenant)
+
+    transaction.on_commit(partial(cache.set, key, dict(accounts), ACCOUNT_CACHE_TIMEOUT))
+    return accounts
 
 
 def get_account(tenant, code):
     return ensure_default_accounts(tenant)[code]
 
 
-def post_journal_entry(
-    *,
-    tenant,
-    store=None,
-    branch=None,
-    reference_type,
-    reference_id="",
-    memo="",
-    created_by=None,
-    entry_date=None,
-    lines,
-):
+def _prepare_lines(lines, accounts):
     prepared = []
     total_debit = ZERO
     total_credit = ZERO
@@ -78,7 +122,9 @@ def post_journal_entry(
             continue
         if debit > ZERO and credit > ZERO:
             raise ValueError("A journal line cannot contain both debit and credit amounts.")
-        account = get_account(tenant, code)
+        account = accounts.get(code)
+        if account is None:
+            raise ValueError(f"Account {code} does not exist.")
         if not account.is_active:
             raise ValueError(f"Account {account.code} is inactive.")
         description = line.get("description", "")
@@ -93,15 +139,200 @@ def post_journal_entry(
         total_debit += debit
         total_credit += credit
 
-    total_debit = money(total_debit)
-    total_credit = money(total_credit)
+    if prepared and money(total_debit) != money(total_credit):
+        raise ValueError("Journal entry is not balanced.")
+    return prepared
+
+
+def closed_through(tenant):
+    return AccountingPeriod.objects.filter(tenant=tenant).aggregate(last=Max("end_date"))["last"]
+
+
+def _lock_periods(tenant):
+    list(Tenant.objects.select_for_update().filter(pk=tenant.pk).values_list("pk", flat=True))
+
+
+def _share_periods(tenant):
+    clause = SHARED_LOCK_CLAUSES.get(connection.vendor)
+    if not clause:
+        return
+    table = connection.ops.quote_name(Tenant._meta.db_table)
+    column = connection.ops.quote_name(Tenant._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT 1 FROM {table} WHERE {column} = %s {clause}", [tenant.pk])
+
+
+def _ensure_open_period(tenant, entry_dates):
+    """
+    Must run inside the posting transaction: it takes a shared lock on the tenant row, so
+    posts run side by side while close_accounting_period, which locks the row exclusively,
+    cannot snapshot balances with an entry dated inside its period still uncommitted.
+    """
+    _share_periods(tenant)
+    lock_date = closed_through(tenant)
+    if lock_date and min(entry_dates) <= lock_date:
+        raise ValueError(f"The accounting period through {lock_date} is closed.")
+
+
+def _add_daily_deltas(deltas, entry, prepared):
+    for item in prepared:
+        key = (entry.store_id, entry.branch_id, item["account"].id, entry.entry_date)
+        debit, credit, purchase_debit = deltas.get(key, (ZERO, ZERO, ZERO))
+        if entry.reference_type == "purchase":
+            purchase_debit += item["debit"]
+        deltas[key] = (debit + item["debit"], credit + item["credit"], purchase_debit)
+
+
+def _update_daily_balances(tenant, deltas):
+    if not deltas:
+        return
+    existing = {}
+    keys = list(deltas)
+    for start in range(0, len(keys), ROLLUP_LOOKUP_CHUNK):
+        keys_filter = Q()
+        for store_id, branch_id, account_id, entry_date in keys[start:start + ROLLUP_LOOKUP_CHUNK]:
+            keys_filter |= Q(store_id=store_id, branch_id=branch_id, account_id=account_id, entry_date=entry_date)
+        for row in LedgerDailyBalance.objects.select_for_update().filter(keys_filter, tenant=tenant):
+            existing.setdefault((row.store_id, row.branch_id, row.account_id, row.entry_date), row)
+
+    to_update = []
+    to_create = []
+    for key, (debit, credit, purchase_debit) in deltas.items():
+        row = existing.get(key)
+        if row:
+            row.debit += debit
+            row.credit += credit
+            row.purchase_debit += purchase_debit
+            to_update.append(row)
+        else:
+            store_id, branch_id, account_id, entry_date = key
+            to_create.append(
+                LedgerDailyBalance(
+                    tenant=tenant,
+                    store_id=store_id,
+                    branch_id=branch_id,
+                    account_id=account_id,
+                    entry_date=entry_date,
+                    debit=debit,
+                    credit=credit,
+                    purchase_debit=purchase_debit,
+                )
+            )
+    if to_update:
+        LedgerDailyBalance.objects.bulk_update(to_update, DAILY_BALANCE_FIELDS, batch_size=BULK_BATCH_SIZE)
+    if to_create:
+        try:
+            with transaction.atomic():
+                LedgerDailyBalance.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+        except IntegrityError:
+            # A concurrent first posting created some of these rows; add to them instead.
+            for row in to_create:
+                _add_daily_balance(row)
+
+
+def _add_daily_balance(row):
+    lookup = {
+        "tenant_id": row.tenant_id,
+        "store_id": row.store_id,
+        "branch_id": row.branch_id,
+        "account_id": row.account_id,
+        "entry_date": row.entry_date,
+    }
+    increments = {name: F(name) + getattr(row, name) for name in DAILY_BALANCE_FIELDS}
+    if LedgerDailyBalance.objects.filter(**lookup).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            row.save(force_insert=True)
+    except IntegrityError:
+        LedgerDailyBalance.objects.filter(**lookup).update(**increments)
+
+
+def bump_ledger_version(tenant):
+    tenant_id = getattr(tenant, "pk", tenant)
+    transaction.on_commit(lambda: Tenant.objects.filter(pk=tenant_id).update(ledger_version=F("ledger_version") + 1))
+
+
+def journal_idempotency_key(reference_type, reference_id):
+    reference_id = str(reference_id or "")
+    return f"{reference_type}:{reference_id}" if reference_id else None
+
+
+def _existing_entry(tenant, key):
+    if not key:
+        return None
+    return JournalEntry.objects.filter(tenant=tenant, idempotency_key=key).first()
+
+
+def _journal_lines(entry, prepared, branch_store_id=None):
+    return [
+        JournalLine(
+            journal_entry=entry,
+            account=item["account"],
+            debit=item["debit"],
+            credit=item["credit"],
+            description=item["description"],
+            tenant_id=entry.tenant_id,
+            store_id=entry.store_id or branch_store_id,
+            branch_id=entry.branch_id,
+            entry_date=entry.entry_date,
+        )
+        for item in prepared
+    ]
+
+
+def post_journal_entry(
+    *,
+    tenant,
+    store=None,
+    branch=None,
+    reference_type,
+    reference_id="",
+    memo="",
+    created_by=None,
+    entry_date=None,
+    lines,
+    deferred=False,
+    idempotent=False,
+):
+    """
+    With idempotent=True the entry is keyed by (tenant, reference_type, reference_id)
+    and a repeated call returns the entry (or outbox row) that is already there.
+    """
+    key = journal_idempotency_key(reference_type, reference_id) if idempotent else None
+    existing = _existing_entry(tenant, key)
+    if existing is not None:
+        return existing
 
+    prepared = _prepare_lines(lines, ensure_default_accounts(tenant))
     if not prepared:
         return None
-    if total_debit != total_credit:
-        raise ValueError("Journal entry is not balanced.")
+
+    if deferred:
+        if key:
+            queued = LedgerOutbox.objects.filter(
+                tenant=tenant,
+                reference_type=reference_type,
+                reference_id=str(reference_id),
+            ).first()
+            if queued is not None:
+                return queued
+        with transaction.atomic():
+            _ensure_open_period(tenant, [entry_date or timezone.localdate()])
+            return _enqueue_journal_entry(
+                tenant=tenant,
+                store=store,
+                branch=branch,
+                reference_type=reference_type,
+                reference_id=reference_id,
+                memo=memo,
+                created_by=created_by,
+                entry_date=entry_date,
+                prepared=prepared,
+            )
 
     with transaction.atomic():
+        _ensure_open_period(tenant, [entry_date or timezone.localdate()])
         entry_kwargs = {
             "tenant": tenant,
             "store": store,
@@ -109,28 +340,239 @@ def post_journal_entry(
             "reference_type": reference_type,
             "reference_id": str(reference_id or ""),
             "memo": memo or "",
+            "idempotency_key": key,
             "created_by": created_by,
         }
         if entry_date is not None:
             entry_kwargs["entry_date"] = entry_date
 
-        entry = JournalEntry.objects.create(
-            **entry_kwargs,
+        entry = JournalEntry(**entry_kwargs)
+        try:
+            # The foreign keys and the idempotency key are left to the database constraints
+            # rather than a lookup query each; clean() checks the scope on loaded instances.
+            entry.full_clean(exclude=["tenant", "store", "branch", "created_by"], validate_unique=False, validate_constraints=False)
+            with transaction.atomic():
+                JournalEntry.objects.bulk_create([entry])
+        except (IntegrityError, ValidationError):
+            # A concurrent retry may have posted the same key since the lookup above.
+            existing = _existing_entry(tenant, key)
+            if existing is None:
+                raise
+            return existing
+
+        JournalLine.objects.bulk_create(_journal_lines(entry, prepared, branch.store_id if branch else None))
+
+        deltas = {}
+        _add_daily_deltas(deltas, entry, prepared)
+        _update_daily_balances(tenant, deltas)
+        bump_ledger_version(tenant)
+        return entry
+
+
+def ledger_posting_deferred():
+    return getattr(settings, "LEDGER_DEFERRED_POSTING", False)
+
+
+def _enqueue_journal_entry(*, tenant, store, branch, reference_type, reference_id, memo, created_by, entry_date, prepared):
+    outbox_kwargs = {
+        "tenant": tenant,
+        "store": store,
+        "branch": branch,
+        "reference_type": reference_type,
+        "reference_id": str(reference_id or ""),
+        "memo": memo or "",
+        "created_by": created_by,
+        "lines": [
+            {
+                "account_code": item["account"].code,
+                "debit": str(item["debit"]),
+                "credit": str(item["credit"]),
+                "description": item["description"],
+            }
+            for item in prepared
+        ],
+    }
+    if entry_date is not None:
+        outbox_kwargs["entry_date"] = entry_date
+    return LedgerOutbox.objects.create(**outbox_kwargs)
+
+
+def _outbox_spec(row):
+    return {
+        "store": row.store_id,
+        "branch": row.branch_id,
+        "reference_type": row.reference_type,
+        "reference_id": row.reference_id,
+        "memo": row.memo,
+        "created_by": row.created_by_id,
+        "entry_date": row.entry_date,
+        "lines": row.lines,
+        "idempotent": True,
+    }
+
+
+def drain_ledger_outbox(batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Post one batch of pending outbox rows; returns how many rows were processed.
+    Rows are claimed with SKIP LOCKED and marked posted in the posting transaction.
+    """
+    with transaction.atomic():
+        rows = list(
+            LedgerOutbox.objects
+            .select_for_update(skip_locked=True, of=("self",))
+            .select_related("tenant")
+            .filter(status="pending")
+            .order_by("id")[:batch_size]
         )
+        by_tenant = {}
+        for row in rows:
+            by_tenant.setdefault(row.tenant_id, []).append(row)
+
+        now = timezone.now()
+        for tenant_rows in by_tenant.values():
+            tenant = tenant_rows[0].tenant
+            try:
+                with transaction.atomic():
+                    entries = post_journal_entries(tenant=tenant, entries=[_outbox_spec(row) for row in tenant_rows])
+                results = list(zip(tenant_rows, entries, [""] * len(tenant_rows)))
+            except ValueError:
+                # Post rows one at a time so a single bad row does not hold back the rest.
+                results = []
+                for row in tenant_rows:
+                    try:
+                        with transaction.atomic():
+                            entry = post_journal_entries(tenant=tenant, entries=[_outbox_spec(row)])[0]
+                        results.append((row, entry, ""))
+                    except ValueError as exc:
+                        results.append((row, None, str(exc)[:255]))
+
+            for row, entry, error in results:
+                row.status = "failed" if error else "posted"
+                row.journal_entry = entry
+                row.last_error = error
+                row.processed_at = now
+        LedgerOutbox.objects.bulk_update(rows, ["status", "journal_entry", "last_error", "processed_at"], batch_size=BULK_BATCH_SIZE)
+    return len(rows)
+
+
+def _pk(value):
+    return getattr(value, "pk", value)
+
+
+def _validate_batch_scope(tenant, specs):
+    store_ids = {_pk(spec.get("store")) for spec in specs} - {None}
+    branch_ids = {_pk(spec.get("branch")) for spec in specs} - {None}
+    store_tenants = dict(Store.objects.filter(id__in=store_ids).values_list("id", "tenant_id"))
+    branch_scope = {
+        branch_id: (store_id, tenant_id)
+        for branch_id, store_id, tenant_id in Branch.objects.filter(id__in=branch_ids).values_list(
+            "id", "store_id", "store__tenant_id"
+        )
+    }
+
+    for spec in specs:
+        store_id = _pk(spec.get("store"))
+        branch_id = _pk(spec.get("branch"))
+        if store_id is not None and store_tenants.get(store_id) != tenant.id:
+            raise ValueError(f"Entry {spec['_index']}: store must belong to the selected tenant.")
+        if branch_id is not None:
+            branch_store_id, branch_tenant_id = branch_scope.get(branch_id, (None, None))
+            if branch_tenant_id != tenant.id:
+                raise ValueError(f"Entry {spec['_index']}: branch must belong to the selected tenant.")
+            if store_id is not None and branch_store_id != store_id:
+                raise ValueError(f"Entry {spec['_index']}: branch must belong to the selected store.")
+    return {branch_id: store_id for branch_id, (store_id, _tenant_id) in branch_scope.items()}
+
+
+def post_journal_entries(*, tenant, entries, created_by=None, batch_size=BULK_BATCH_SIZE):
+    """
+    Post many entries for one tenant in a single transaction with bulk inserts.
+    Each spec takes the keys of post_journal_entry; returns entries in input order.
+    Idempotent specs whose key is already posted (or repeated in the batch) reuse that entry.
+    """
+    accounts = ensure_default_accounts(tenant)
+    reference_types = {choice for choice, _ in JournalEntry.REFERENCE_TYPE_CHOICES}
+
+    specs = []
+    for index, spec in enumerate(entries):
+        if spec["reference_type"] not in reference_types:
+            raise ValueError(f"Entry {index}: unknown reference type {spec['reference_type']}.")
+        try:
+            prepared = _prepare_lines(spec["lines"], accounts)
+        except ValueError as exc:
+            raise ValueError(f"Entry {index}: {exc}") from exc
+        key = journal_idempotency_key(spec["reference_type"], spec.get("reference_id")) if spec.get("idempotent") else None
+        specs.append({**spec, "_index": index, "_lines": prepared, "_key": key})
+
+    results = [None] * len(specs)
+    keys = {spec["_key"] for spec in specs} - {None}
+    posted = {}
+    if keys:
+        posted = {
+            entry.idempotency_key: entry
+            for entry in JournalEntry.objects.filter(tenant=tenant, idempotency_key__in=keys)
+        }
+
+    postable = []
+    repeated = []
+    batch_keys = set()
+    for spec in specs:
+        key = spec["_key"]
+        if key in posted:
+            results[spec["_index"]] = posted[key]
+        elif key in batch_keys:
+            repeated.append(spec)
+        elif spec["_lines"]:
+            postable.append(spec)
+            if key:
+                batch_keys.add(key)
+    branch_stores = _validate_batch_scope(tenant, postable)
+
+    if not postable:
+        return results
+    today = timezone.localdate()
+
+    with transaction.atomic():
+        _ensure_open_period(tenant, [spec.get("entry_date") or today for spec in postable])
+        journal_entries = []
+        for spec in postable:
+            entry_kwargs = {
+                "tenant": tenant,
+                "store_id": _pk(spec.get("store")),
+                "branch_id": _pk(spec.get("branch")),
+                "reference_type": spec["reference_type"],
+                "reference_id": str(spec.get("reference_id") or ""),
+                "memo": spec.get("memo") or "",
+                "idempotency_key": spec["_key"],
+                "created_by_id": _pk(spec.get("created_by", created_by)),
+            }
+            if spec.get("entry_date") is not None:
+                entry_kwargs["entry_date"] = spec["entry_date"]
+            journal_entries.append(JournalEntry(**entry_kwargs))
+        JournalEntry.objects.bulk_create(journal_entries, batch_size=batch_size)
 
         JournalLine.objects.bulk_create(
             [
-                JournalLine(
-                    journal_entry=entry,
-                    account=item["account"],
-                    debit=item["debit"],
-                    credit=item["credit"],
-                    description=item["description"],
-                )
-                for item in prepared
-            ]
+                line
+                for spec, entry in zip(postable, journal_entries)
+                for line in _journal_lines(entry, spec["_lines"], branch_stores.get(entry.branch_id))
+            ],
+            batch_size=batch_size,
         )
-        return entry
+
+        deltas = {}
+        for spec, entry in zip(postable, journal_entries):
+            _add_daily_deltas(deltas, entry, spec["_lines"])
+        _update_daily_balances(tenant, deltas)
+        bump_ledger_version(tenant)
+
+    for spec, entry in zip(postable, journal_entries):
+        results[spec["_index"]] = entry
+        if spec["_key"]:
+            posted[spec["_key"]] = entry
+    for spec in repeated:
+        results[spec["_index"]] = posted[spec["_key"]]
+    return results
 
 
 def record_purchase_entry(*, tenant, total_cost, product=None, store=None, branch=None, created_by=None, reference_id=""):
@@ -144,6 +586,7 @@ def record_purchase_entry(*, tenant, total_cost, product=None, store=None, branc
         branch=branch,
         reference_type="purchase",
         reference_id=reference_id,
+        idempotent=True,
         memo=memo,
         created_by=created_by,
         lines=[
@@ -163,26 +606,7 @@ def record_purchase_entry(*, tenant, total_cost, product=None, store=None, branc
     )
 
 
-def record_sale_entry(
-    *,
-    tenant,
-    sale_total,
-    paid_amount,
-    unpaid_amount,
-    cogs_total,
-    store=None,
-    branch=None,
-    created_by=None,
-    reference_id="",
-):
-    sale_total = money(sale_total)
-    paid_amount = money(paid_amount)
-    unpaid_amount = money(unpaid_amount)
-    cogs_total = money(cogs_total)
-
-    if sale_total <= ZERO:
-        return None
-
+def sale_entry_lines(*, sale_total, paid_amount, unpaid_amount, cogs_total):
     lines = []
     if paid_amount > ZERO:
         lines.append(
@@ -230,19 +654,220 @@ def record_sale_entry(
             }
         )
 
+    return lines
+
+
+def record_sale_entry(
+    *,
+    tenant,
+    sale_total,
+    paid_amount,
+    unpaid_amount,
+    cogs_total,
+    store=None,
+    branch=None,
+    created_by=None,
+    reference_id="",
+    deferred=False,
+):
+    sale_total = money(sale_total)
+    paid_amount = money(paid_amount)
+    unpaid_amount = money(unpaid_amount)
+    cogs_total = money(cogs_total)
+
+    if sale_total <= ZERO:
+        return None
+
+    if tenant.ledger_posting_mode == "daily_summary":
+        return _stage_sale(
+            tenant=tenant,
+            store=store,
+            branch=branch,
+            created_by=created_by,
+            reference_id=reference_id,
+            sale_total=sale_total,
+            paid_amount=paid_amount,
+            unpaid_amount=unpaid_amount,
+            cogs_total=cogs_total,
+        )
+
+    lines = sale_entry_lines(
+        sale_total=sale_total,
+        paid_amount=paid_amount,
+        unpaid_amount=unpaid_amount,
+        cogs_total=cogs_total,
+    )
+
     return post_journal_entry(
         tenant=tenant,
         store=store,
         branch=branch,
         reference_type="sale",
         reference_id=reference_id,
+        idempotent=True,
         memo="Sales invoice posted",
         created_by=created_by,
         lines=lines,
+        deferred=deferred,
     )
 
 
-def record_customer_payment_entry(*, tenant, amount, store=None, branch=None, created_by=None, reference_id=""):
+def record_sale_entries(*, tenant, sales, created_by=None):
+    """
+    Bulk counterpart of record_sale_entry. Each sale is a dict with sale_total,
+    paid_amount, unpaid_amount, cogs_total, store, branch, reference_id and
+    business_date; sales are staged or posted in one batch depending on the tenant's
+    ledger posting mode.
+    """
+    sales = [
+        {**sale, **{field: money(sale[field]) for field in ("sale_total", "paid_amount", "unpaid_amount", "cogs_total")}}
+        for sale in sales
+    ]
+    sales = [sale for sale in sales if sale["sale_total"] > ZERO]
+    if not sales:
+        return []
+
+    if tenant.ledger_posting_mode == "daily_summary":
+        # A sale already staged under its reference (or repeated in the batch) is skipped.
+        staged = {}
+        for index, sale in enumerate(sales):
+            staged.setdefault(str(sale["reference_id"] or "") or index, sale)
+        sales = list(staged.values())
+        with transaction.atomic():
+            _ensure_open_period(tenant, [sale["business_date"] for sale in sales])
+            return SaleLedgerStaging.objects.bulk_create(
+                [
+                    SaleLedgerStaging(
+                        tenant=tenant,
+                        store=sale["store"],
+                        branch=sale["branch"],
+                        created_by=created_by,
+                        business_date=sale["business_date"],
+                        reference_id=str(sale["reference_id"]),
+                        sale_total=sale["sale_total"],
+                        paid_amount=sale["paid_amount"],
+                        unpaid_amount=sale["unpaid_amount"],
+                        cogs_total=sale["cogs_total"],
+                    )
+                    for sale in sales
+                ],
+                batch_size=BULK_BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+
+    return post_journal_entries(
+        tenant=tenant,
+        created_by=created_by,
+        entries=[
+            {
+                "store": sale["store"],
+                "branch": sale["branch"],
+                "reference_type": "sale",
+                "reference_id": sale["reference_id"],
+                "idempotent": True,
+                "memo": "Sales invoice posted",
+                "entry_date": sale["business_date"],
+                "lines": sale_entry_lines(
+                    sale_total=sale["sale_total"],
+                    paid_amount=sale["paid_amount"],
+                    unpaid_amount=sale["unpaid_amount"],
+                    cogs_total=sale["cogs_total"],
+                ),
+            }
+            for sale in sales
+        ],
+    )
+
+
+def _stage_sale(*, tenant, store, branch, created_by, reference_id, **totals):
+    reference_id = str(reference_id or "")
+    if reference_id:
+        staged = SaleLedgerStaging.objects.filter(tenant=tenant, reference_id=reference_id).first()
+        if staged is not None:
+            return staged
+    try:
+        with transaction.atomic():
+            _ensure_open_period(tenant, [timezone.localdate()])
+            return SaleLedgerStaging.objects.create(
+                tenant=tenant,
+                store=store,
+                branch=branch,
+                created_by=created_by,
+                reference_id=reference_id,
+                **totals,
+            )
+    except IntegrityError:
+        # A concurrent retry staged the same reference since the lookup above.
+        staged = SaleLedgerStaging.objects.filter(tenant=tenant, reference_id=reference_id).first() if reference_id else None
+        if staged is None:
+            raise
+        return staged
+
+
+def post_sale_summaries(*, tenant=None, through=None):
+    """
+    Post one sale entry per branch and business day for staged sales up to `through`
+    (default yesterday). Returns the number of entries posted and any per-tenant errors.
+    """
+    through = through or timezone.localdate() - timedelta(days=1)
+    posted = 0
+    errors = []
+    with transaction.atomic():
+        staged = SaleLedgerStaging.objects.select_for_update(skip_locked=True).filter(
+            journal_entry__isnull=True,
+            business_date__lte=through,
+        )
+        if tenant is not None:
+            staged = staged.filter(tenant=tenant)
+
+        groups = {}
+        for row in staged.order_by("id").values(
+            "id", "tenant_id", "store_id", "branch_id", "business_date", "sale_total", "paid_amount", "unpaid_amount", "cogs_total"
+        ):
+            group = groups.setdefault(
+                (row["tenant_id"], row["store_id"], row["branch_id"], row["business_date"]),
+                {"ids": [], "sale_total": ZERO, "paid_amount": ZERO, "unpaid_amount": ZERO, "cogs_total": ZERO},
+            )
+            group["ids"].append(row["id"])
+            for field in ("sale_total", "paid_amount", "unpaid_amount", "cogs_total"):
+                group[field] += row[field]
+
+        by_tenant = {}
+        for key, group in groups.items():
+            by_tenant.setdefault(key[0], []).append((key, group))
+        tenants = Tenant.objects.in_bulk(list(by_tenant))
+
+        for tenant_id, tenant_groups in by_tenant.items():
+            specs = [
+                {
+                    "store": store_id,
+                    "branch": branch_id,
+                    "reference_type": "sale",
+                    "reference_id": f"SUMMARY-{business_date:%Y%m%d}-{branch_id or 0}",
+                    "memo": f"Daily sales summary ({len(group['ids'])} invoices)",
+                    "entry_date": business_date,
+                    "lines": sale_entry_lines(
+                        sale_total=group["sale_total"],
+                        paid_amount=group["paid_amount"],
+                        unpaid_amount=group["unpaid_amount"],
+                        cogs_total=group["cogs_total"],
+                    ),
+                }
+                for (_tenant_id, store_id, branch_id, business_date), group in tenant_groups
+            ]
+            try:
+                with transaction.atomic():
+                    entries = post_journal_entries(tenant=tenants[tenant_id], entries=specs)
+                    for (_key, group), entry in zip(tenant_groups, entries):
+                        SaleLedgerStaging.objects.filter(id__in=group["ids"]).update(journal_entry=entry)
+            except ValueError as exc:
+                errors.append(f"{tenants[tenant_id].slug}: {exc}")
+                continue
+            posted += len(entries)
+    return posted, errors
+
+
+def record_customer_payment_entry(*, tenant, amount, store=None, branch=None, created_by=None, reference_id="", deferred=False):
     amount = money(amount)
     if amount <= ZERO:
         return None
@@ -252,6 +877,7 @@ def record_customer_payment_entry(*, tenant, amount, store=None, branch=None, cr
         branch=branch,
         reference_type="payment",
         reference_id=reference_id,
+        idempotent=True,
         memo="Customer payment received",
         created_by=created_by,
         lines=[
@@ -268,6 +894,7 @@ def record_customer_payment_entry(*, tenant, amount, store=None, branch=None, cr
                 "description": "Accounts receivable settled",
             },
         ],
+        deferred=deferred,
     )
 
 
@@ -281,6 +908,7 @@ def record_expense_entry(*, tenant, amount, store=None, branch=None, created_by=
         branch=branch,
         reference_type="expense",
         reference_id=reference_id,
+        idempotent=True,
         memo=memo or "Operating expense posted",
         created_by=created_by,
         lines=[
@@ -310,6 +938,7 @@ def record_other_income_entry(*, tenant, amount, store=None, branch=None, create
         branch=branch,
         reference_type="other_income",
         reference_id=reference_id,
+        idempotent=True,
         memo=memo or "Other income posted",
         created_by=created_by,
         lines=[
@@ -329,30 +958,128 @@ def record_other_income_entry(*, tenant, amount, store=None, branch=None, create
     )
 
 
-def account_balances(queryset):
-    grouped = (
+def _grouped_balances(queryset):
+    return (
         queryset.values("account_id", "account__code", "account__name", "account__account_type")
         .annotate(total_debit=Sum("debit"), total_credit=Sum("credit"))
         .order_by("account__code")
     )
-    results = []
-    for row in grouped:
-        debit = money(row["total_debit"])
-        credit = money(row["total_credit"])
-        account_type = row["account__account_type"]
-        if account_type in {"asset", "expense"}:
-            balance = debit - credit
-        else:
-            balance = credit - debit
-        results.append(
-            {
-                "account_id": row["account_id"],
-                "code": row["account__code"],
-                "name": row["account__name"],
-                "account_type": account_type,
-                "debit": debit,
-                "credit": credit,
-                "balance": money(balance),
-            }
+
+
+def balance_row(row):
+    debit = money(row["total_debit"])
+    credit = money(row["total_credit"])
+    account_type = row["account__account_type"]
+    if account_type in {"asset", "expense"}:
+        balance = debit - credit
+    else:
+        balance = credit - debit
+    return {
+        "account_id": row["account_id"],
+        "code": row["account__code"],
+        "name": row["account__name"],
+        "account_type": account_type,
+        "debit": debit,
+        "credit": credit,
+        "balance": money(balance),
+    }
+
+
+def account_balances(queryset):
+    return [balance_row(row) for row in _grouped_balances(queryset)]
+
+
+def _apply_balance_scope(queryset, store=None, branch=None):
+    if branch is not None:
+        return queryset.filter(branch=branch)
+    if store is not None:
+        return queryset.filter(Q(store=store) | Q(branch__store=store))
+    return queryset
+
+
+def balances_as_of(tenant, as_of=None, store=None, branch=None):
+    periods = AccountingPeriod.objects.filter(tenant=tenant)
+    if as_of:
+        periods = periods.filter(end_date__lte=as_of)
+    period = periods.order_by("-end_date").first()
+
+    sources = []
+    rollups = LedgerDailyBalance.objects.filter(tenant=tenant)
+    if period:
+        sources.append(PeriodClosingBalance.objects.filter(period=period))
+        rollups = rollups.filter(entry_date__gt=period.end_date)
+    if as_of:
+        rollups = rollups.filter(entry_date__lte=as_of)
+    sources.append(rollups)
+
+    merged = {}
+    for source in sources:
+        for row in _grouped_balances(_apply_balance_scope(source, store=store, branch=branch)):
+            current = merged.setdefault(row["account_id"], {**row, "total_debit": ZERO, "total_credit": ZERO})
+            current["total_debit"] += row["total_debit"] or ZERO
+            current["total_credit"] += row["total_credit"] or ZERO
+    return [balance_row(row) for row in sorted(merged.values(), key=lambda row: row["account__code"])]
+
+
+def close_accounting_period(*, tenant, end_date, period_type="month", start_date=None, closed_by=None):
+    with transaction.atomic():
+        _lock_periods(tenant)
+        previous = (
+            AccountingPeriod.objects
+            .filter(tenant=tenant)
+            .order_by("-end_date")
+            .first()
         )
-    return results
+        if previous and end_date <= previous.end_date:
+            raise ValueError(f"The accounting period through {previous.end_date} is already closed.")
+        if start_date is None:
+            if previous:
+                start_date = previous.end_date + timedelta(days=1)
+            else:
+                first_date = LedgerDailyBalance.objects.filter(tenant=tenant).aggregate(first=Min("entry_date"))["first"]
+                start_date = min(first_date or end_date, end_date)
+        elif previous and start_date <= previous.end_date:
+            raise ValueError("A closed period cannot overlap an earlier closed period.")
+
+        period = AccountingPeriod.objects.create(
+            tenant=tenant,
+            period_type=period_type,
+            start_date=start_date,
+            end_date=end_date,
+            closed_by=closed_by,
+        )
+
+        totals = {}
+        rollups = LedgerDailyBalance.objects.filter(tenant=tenant, entry_date__lte=end_date)
+        sources = [rollups]
+        if previous:
+            sources = [
+                rollups.filter(entry_date__gt=previous.end_date),
+                PeriodClosingBalance.objects.filter(period=previous),
+            ]
+        for source in sources:
+            grouped = (
+                source.values("store_id", "branch_id", "account_id")
+                .annotate(total_debit=Sum("debit"), total_credit=Sum("credit"))
+                .order_by()
+            )
+            for row in grouped:
+                key = (row["store_id"], row["branch_id"], row["account_id"])
+                debit, credit = totals.get(key, (ZERO, ZERO))
+                totals[key] = (debit + (row["total_debit"] or ZERO), credit + (row["total_credit"] or ZERO))
+
+        PeriodClosingBalance.objects.bulk_create(
+            [
+                PeriodClosingBalance(
+                    period=period,
+                    store_id=store_id,
+                    branch_id=branch_id,
+                    account_id=account_id,
+                    debit=debit,
+                    credit=credit,
+                )
+                for (store_id, branch_id, account_id), (debit, credit) in totals.items()
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+    return period
@@ -1,20 +1,30 @@
 from django.contrib import admin
 
 from .models import (
+    AccountingPeriod,
     BaseUnit,
+    BranchDailyTotals,
     BranchStock,
+    Cart,
+    CartLine,
     Category,
     ExchangeRate,
     Expense,
     InventoryMovement,
     InventoryTransfer,
+    JalaliCalendar,
     JournalEntry,
     JournalLine,
     LedgerAccount,
+    LedgerDailyBalance,
+    LedgerOutbox,
     OtherIncome,
+    PeriodClosingBalance,
     Products,
     PurchaseUnit,
+    SaleLedgerStaging,
     SalesDetails,
+    SalesFact,
     SalesProducts,
     StockTransfer,
     StoreStock,
@@ -39,3 +49,13 @@ admin.site.register(InventoryMovement)
 admin.site.register(LedgerAccount)
 admin.site.register(JournalEntry)
 admin.site.register(JournalLine)
+admin.site.register(LedgerDailyBalance)
+admin.site.register(AccountingPeriod)
+admin.site.register(PeriodClosingBalance)
+admin.site.register(LedgerOutbox)
+admin.site.register(SaleLedgerStaging)
+admin.site.register(BranchDailyTotals)
+admin.site.register(SalesFact)
+admin.site.register(JalaliCalendar)
+admin.site.register(Cart)
+admin.site.register(CartLine)
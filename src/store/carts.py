@@ -0,0 +1,370 @@
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from customer.models import Customer
+from customer.services import set_active_customer
+from client.services import active_branch, active_tenant
+
+from .models import Cart, CartLine
+from .utils import safe_int, to_decimal
+
+CART_SESSION_KEY = "cart_id"
+CART_LOCK_TIMEOUT = 5
+CART_LOCK_WAIT = 10
+CART_LOCK_POLL = 0.01
+
+
+class CartLockTimeout(Exception):
+    pass
+
+
+def _cart_max_age():
+    return getattr(settings, "CART_MAX_AGE", 60 * 60 * 24)
+
+
+def _line(item):
+    return {
+        "product_id": safe_int(item.get("product_id")),
+        "item_quantity": safe_int(item.get("item_quantity")),
+        "package_quantity": safe_int(item.get("package_quantity")),
+        "item_price": to_decimal(item.get("item_price")),
+        "package_price": to_decimal(item.get("package_price")),
+    }
+
+
+class DatabaseCartStore:
+    """
+    Carts in the Cart/CartLine tables; each change writes one line row.
+    """
+
+    def _meta(self, cart):
+        return {
+            "id": str(cart["id"]),
+            "tenant_id": cart["tenant_id"],
+            "branch_id": cart["branch_id"],
+            "user_id": cart["user_id"],
+            "customer_id": cart["customer_id"],
+            "status": cart["status"],
+            "label": cart["label"],
+            "updated_at": cart["updated_at"],
+        }
+
+    def create(self, tenant_id, branch_id, user_id=None):
+        return str(Cart.objects.create(tenant_id=tenant_id, branch_id=branch_id, user_id=user_id).id)
+
+    def get(self, cart_id):
+        cart = Cart.objects.filter(pk=cart_id).values().first()
+        return self._meta(cart) if cart else None
+
+    def lines(self, cart_id):
+        rows = CartLine.objects.filter(cart_id=cart_id).order_by("id")
+        return {
+            str(row["product_id"]): _line(row)
+            for row in rows.values("product_id", "item_quantity", "package_quantity", "item_price", "package_price")
+        }
+
+    def put_line(self, cart_id, item):
+        line = _line(item)
+        CartLine.objects.update_or_create(cart_id=cart_id, product_id=line.pop("product_id"), defaults=line)
+
+    def remove_line(self, cart_id, product_id):
+        CartLine.objects.filter(cart_id=cart_id, product_id=safe_int(product_id)).delete()
+
+    def count(self, cart_id):
+        return CartLine.objects.filter(cart_id=cart_id).count()
+
+    def update(self, cart_id, **fields):
+        Cart.objects.filter(pk=cart_id).update(updated_at=timezone.now(), **fields)
+
+    def reopen(self, cart_id):
+        return bool(Cart.objects.filter(pk=cart_id, status="held").update(status="open", updated_at=timezone.now()))
+
+    def held(self, tenant_id, branch_id):
+        carts = (
+            Cart.objects.filter(tenant_id=tenant_id, branch_id=branch_id, status="held")
+            .annotate(line_count=Count("lines"))
+            .order_by("-updated_at")
+            .values()
+        )
+        return [dict(self._meta(cart), line_count=cart["line_count"]) for cart in carts]
+
+    def discard(self, cart_id):
+        Cart.objects.filter(pk=cart_id).delete()
+
+
+@contextmanager
+def _cache_lock(key):
+    """
+    Serialise read-modify-write of a cache key across worker processes with a cache.add()
+    lock holding a token of its own. The lock expires after CART_LOCK_TIMEOUT, so a holder
+    that died only stalls the others that long; a caller still waiting after CART_LOCK_WAIT
+    gets CartLockTimeout. Release only deletes the lock while it still holds the token.
+    """
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + CART_LOCK_WAIT
+    while not cache.add(lock_key, token, CART_LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            raise CartLockTimeout(key)
+        time.sleep(CART_LOCK_POLL)
+    try:
+        yield
+    finally:
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+
+class CacheCartStore:
+    """
+    Carts in the default cache: a metadata key, one key per line and a list of line keys,
+    so a change writes one line. Every key expires CART_MAX_AGE after its last write.
+    Changes to the metadata, the line list and a branch's held list take a cache lock, so
+    two terminals cannot both resume a cart or drop each other's lines.
+    """
+
+    def _timeout(self):
+        return _cart_max_age()
+
+    def _held_key(self, tenant_id, branch_id):
+        return f"cart:held:{tenant_id}:{branch_id}"
+
+    def _line_key(self, cart_id, product_id):
+        return f"cart:{cart_id}:line:{product_id}"
+
+    def create(self, tenant_id, branch_id, user_id=None):
+        cart_id = str(uuid.uuid4())
+        meta = {
+            "id": cart_id,
+            "tenant_id": tenant_id,
+            "branch_id": branch_id,
+            "user_id": user_id,
+            "customer_id": None,
+            "status": "open",
+            "label": "",
+            "updated_at": timezone.now(),
+        }
+        cache.set_many({f"cart:{cart_id}": meta, f"cart:{cart_id}:lines": []}, self._timeout())
+        return cart_id
+
+    def get(self, cart_id):
+        return cache.get(f"cart:{cart_id}")
+
+    def lines(self, cart_id):
+        product_ids = cache.get(f"cart:{cart_id}:lines") or []
+        rows = cache.get_many([self._line_key(cart_id, product_id) for product_id in product_ids])
+        return {
+            str(product_id): rows[self._line_key(cart_id, product_id)]
+            for product_id in product_ids
+            if self._line_key(cart_id, product_id) in rows
+        }
+
+    def put_line(self, cart_id, item):
+        line = _line(item)
+        cache.set(self._line_key(cart_id, line["product_id"]), line, self._timeout())
+        with _cache_lock(f"cart:{cart_id}:lines"):
+            product_ids = cache.get(f"cart:{cart_id}:lines") or []
+            if line["product_id"] not in product_ids:
+                cache.set(f"cart:{cart_id}:lines", [*product_ids, line["product_id"]], self._timeout())
+
+    def remove_line(self, cart_id, product_id):
+        product_id = safe_int(product_id)
+        cache.delete(self._line_key(cart_id, product_id))
+        with _cache_lock(f"cart:{cart_id}:lines"):
+            product_ids = cache.get(f"cart:{cart_id}:lines") or []
+            if product_id in product_ids:
+                cache.set(f"cart:{cart_id}:lines", [pid for pid in product_ids if pid != product_id], self._timeout())
+
+    def count(self, cart_id):
+        return len(cache.get(f"cart:{cart_id}:lines") or [])
+
+    def _save(self, cart_id, meta, **fields):
+        held_key = self._held_key(meta["tenant_id"], meta["branch_id"])
+        meta.update(fields, updated_at=timezone.now())
+        cache.set(f"cart:{cart_id}", meta, self._timeout())
+        with _cache_lock(held_key):
+            held = [held_id for held_id in cache.get(held_key) or [] if held_id != cart_id]
+            if meta["status"] == "held":
+                held.insert(0, cart_id)
+            cache.set(held_key, held, self._timeout())
+
+    def update(self, cart_id, **fields):
+        with _cache_lock(f"cart:{cart_id}"):
+            meta = self.get(cart_id)
+            if meta:
+                self._save(cart_id, meta, **fields)
+
+    def reopen(self, cart_id):
+        with _cache_lock(f"cart:{cart_id}"):
+            meta = self.get(cart_id)
+            if not meta or meta["status"] != "held":
+                return False
+            self._save(cart_id, meta, status="open")
+        return True
+
+    def held(self, tenant_id, branch_id):
+        cart_ids = cache.get(self._held_key(tenant_id, branch_id)) or []
+        metas = cache.get_many([f"cart:{cart_id}" for cart_id in cart_ids])
+        return [
+            dict(metas[f"cart:{cart_id}"], line_count=self.count(cart_id))
+            for cart_id in cart_ids
+            if metas.get(f"cart:{cart_id}", {}).get("status") == "held"
+        ]
+
+    def discard(self, cart_id):
+        with _cache_lock(f"cart:{cart_id}"):
+            meta = self.get(cart_id)
+            if meta:
+                held_key = self._held_key(meta["tenant_id"], meta["branch_id"])
+                with _cache_lock(held_key):
+                    cache.set(held_key, [held_id for held_id in cache.get(held_key) or [] if held_id != cart_id], self._timeout())
+            product_ids = cache.get(f"cart:{cart_id}:lines") or []
+            cache.delete_many(
+                [f"cart:{cart_id}", f"cart:{cart_id}:lines", *(self._line_key(cart_id, product_id) for product_id in product_ids)]
+            )
+
+
+def purge_expired_carts(max_age=None):
+    """
+    Delete database carts, open or held, with no change for CART_MAX_AGE seconds; cache
+    carts expire on their own. Returns the number of carts deleted.
+    """
+    cutoff = timezone.now() - timedelta(seconds=max_age or _cart_max_age())
+    expired = Cart.objects.filter(updated_at__lt=cutoff).exclude(lines__updated_at__gte=cutoff)
+    return expired.delete()[1].get(Cart._meta.label, 0)
+
+
+CART_STORES = {
+    "db": DatabaseCartStore,
+    "cache": CacheCartStore,
+}
+
+
+def cart_store():
+    backend = getattr(settings, "CART_STORE_BACKEND", "db")
+    store_class = CART_STORES.get(backend) or import_string(backend)
+    return store_class()
+
+
+def active_cart_id(request, create=False, store=None):
+    """
+    The session's open cart for the active tenant and branch. A cart id left over from
+    another branch, or one that was held elsewhere, is dropped from the session.
+    """
+    store = store or cart_store()
+    tenant = active_tenant(request)
+    branch = active_branch(request)
+    cart_id = request.session.get(CART_SESSION_KEY)
+    if cart_id:
+        meta = store.get(cart_id)
+        if meta and meta["status"] == "open" and tenant and branch and meta["tenant_id"] == tenant.id and meta["branch_id"] == branch.id:
+            return cart_id
+        request.session.pop(CART_SESSION_KEY, None)
+    if not (create and tenant and branch):
+        return None
+    user_id = request.user.id if request.user.is_authenticated else None
+    cart_id = store.create(tenant.id, branch.id, user_id)
+    request.session[CART_SESSION_KEY] = cart_id
+    return cart_id
+
+
+def cart_items(request):
+    store = cart_store()
+    cart_id = active_cart_id(request, store=store)
+    return store.lines(cart_id) if cart_id else {}
+
+
+def cart_count(request):
+    store = cart_store()
+    cart_id = request.session.get(CART_SESSION_KEY)
+    return store.count(cart_id) if cart_id else 0
+
+
+def add_cart_item(request, item):
+    store = cart_store()
+    cart_id = active_cart_id(request, create=True, store=store)
+    store.put_line(cart_id, item)
+    return store.count(cart_id)
+
+
+def remove_cart_line(request, product_id):
+    store = cart_store()
+    cart_id = active_cart_id(request, store=store)
+    if cart_id:
+        store.remove_line(cart_id, product_id)
+
+
+def forget_cart(request):
+    """
+    Discard the session's open cart, e.g. after checkout or when switching branch.
+    """
+    cart_id = request.session.pop(CART_SESSION_KEY, None)
+    if not cart_id:
+        return
+    store = cart_store()
+    meta = store.get(cart_id)
+    if meta and meta["status"] == "open":
+        store.discard(cart_id)
+
+
+def _session_customer_id(request):
+    customer_session = request.session.get("customer") or {}
+    return safe_int(next(iter(customer_session), None), None)
+
+
+def hold_cart(request, label=""):
+    """
+    Park the open cart (and its customer) so any terminal of the branch can resume it.
+    Returns False when there is nothing to hold.
+    """
+    store = cart_store()
+    cart_id = active_cart_id(request, store=store)
+    if not cart_id or not store.count(cart_id):
+        return False
+    store.update(cart_id, status="held", label=label[:100], customer_id=_session_customer_id(request))
+    request.session.pop(CART_SESSION_KEY, None)
+    request.session["customer"] = {}
+    return True
+
+
+def held_carts(request):
+    tenant = active_tenant(request)
+    branch = active_branch(request)
+    if not (tenant and branch):
+        return []
+    return cart_store().held(tenant.id, branch.id)
+
+
+def resume_cart(request, cart_id):
+    """
+    Reopen a held cart of the active branch in this session. The cart being worked on is
+    held in its place if it has lines. Returns False for unknown or foreign carts and for
+    carts another terminal resumed first.
+    """
+    store = cart_store()
+    tenant = active_tenant(request)
+    branch = active_branch(request)
+    meta = store.get(str(cart_id))
+    if not (meta and tenant and branch and meta["status"] == "held" and meta["tenant_id"] == tenant.id and meta["branch_id"] == branch.id):
+        return False
+    current_id = active_cart_id(request, store=store)
+    if not store.reopen(meta["id"]):
+        return False
+    if current_id and store.count(current_id):
+        store.update(current_id, status="held", customer_id=_session_customer_id(request))
+    elif current_id:
+        store.discard(current_id)
+    request.session[CART_SESSION_KEY] = meta["id"]
+    customer = Customer.objects.filter(pk=meta["customer_id"], tenant=tenant).first() if meta["customer_id"] else None
+    if customer:
+        set_active_customer(request, customer)
+    else:
+        request.session["customer"] = {}
+    return True
@@ -0,0 +1,398 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.translation import gettext as _
+
+from customer.services import get_or_create_walk_in_customer
+
+from .accounting import (
+    bump_ledger_version,
+    closed_through,
+    ledger_posting_deferred,
+    record_customer_payment_entry,
+    record_sale_entries,
+    record_sale_entry,
+)
+from .models import BillNumberTracker, BranchStock, Customer, Products, SalesDetails, SalesProducts
+from .rollups import add_sale_totals, add_sales_facts, record_batch_totals, record_checkout_totals
+from .utils import safe_int, to_decimal
+
+OFFLINE_SALE_CHUNK_SIZE = 100
+
+
+class InsufficientStock(ValueError):
+    pass
+
+
+def take_branch_stock(branch, product, quantity):
+    """
+    Decrement branch stock with one guarded UPDATE; returns False when fewer than quantity
+    units are left. Only this product's row is locked, so checkouts of other products never
+    wait on each other. stock is assigned last so every expression reads the old value.
+    """
+    package_contain = max(safe_int(product.package_contain, 1), 1)
+    remaining = F("stock") - quantity
+    return bool(
+        BranchStock.objects
+        .filter(branch=branch, product=product, stock__gte=quantity)
+        .update(
+            num_of_packages=remaining / package_contain,
+            num_items=remaining % package_contain,
+            updated_at=timezone.now(),
+            stock=remaining,
+        )
+    )
+
+
+def _checkout_line(item, product):
+    item_quantity = safe_int(item.get("item_quantity"))
+    package_quantity = safe_int(item.get("package_quantity"))
+    if item_quantity < 0 or package_quantity < 0:
+        raise ValueError(_("Invalid quantity."))
+    item_price = to_decimal(item.get("item_price"))
+    package_price = to_decimal(item.get("package_price"))
+    return {
+        "product": product,
+        "item_quantity": item_quantity,
+        "package_quantity": package_quantity,
+        "item_price": item_price,
+        "package_price": package_price,
+        "sub_total": to_decimal((Decimal(item_quantity) * item_price) + (Decimal(package_quantity) * package_price)),
+        "sold_stock": (package_quantity * safe_int(product.package_contain, 1)) + item_quantity,
+    }
+
+
+def checkout_lines(tenant, branch, items):
+    """
+    Price cart items ({product_id, item_quantity, package_quantity, item_price,
+    package_price}) and check them against branch stock with one product query and one
+    stock query. Unknown products are skipped.
+    """
+    product_ids = [safe_int(item.get("product_id")) for item in items]
+    products = {product.id: product for product in Products.objects.filter(pk__in=product_ids, tenant=tenant)}
+    stocks = {row.product_id: row for row in BranchStock.objects.filter(branch=branch, product_id__in=product_ids)}
+
+    lines = []
+    for item in items:
+        product = products.get(safe_int(item.get("product_id")))
+        if not product:
+            continue
+        line = _checkout_line(item, product)
+        stock_row = stocks.get(product.id)
+        current_stock = safe_int(stock_row.stock if stock_row else 0)
+        if current_stock < line["sold_stock"]:
+            raise InsufficientStock(_("Insufficient stock for %(product)s.") % {"product": product.name})
+        product.stock = current_stock
+        product.num_of_packages = safe_int(stock_row.num_of_packages if stock_row else 0)
+        product.num_items = safe_int(stock_row.num_items if stock_row else 0)
+        lines.append(line)
+    return lines
+
+
+def _sale_lines(sale, lines):
+    return [
+        SalesProducts(
+            sale_detail=sale,
+            product=line["product"],
+            item_price=line["item_price"],
+            package_price=line["package_price"],
+            item_qty=line["item_quantity"],
+            package_qty=line["package_quantity"],
+            total_price=line["sub_total"],
+        ) for line in lines
+    ]
+
+
+def _cogs_total(lines):
+    cogs_total = Decimal("0.00")
+    for line in lines:
+        product = line["product"]
+        package_contain = max(safe_int(getattr(product, "package_contain", 1), 1), 1)
+        unit_cost = to_decimal(product.package_purchase_price or 0) / Decimal(package_contain)
+        cogs_total += to_decimal(Decimal(line["sold_stock"]) * unit_cost)
+    return cogs_total
+
+
+def customer_due(customer, tenant, branch):
+    if not customer:
+        return Decimal("0.00")
+    total = SalesDetails.objects.filter(customer=customer, tenant=tenant, branch=branch).aggregate(total=Sum("unpaid_amount"))["total"]
+    return to_decimal(total or 0)
+
+
+def complete_sale(*, tenant, branch, user, customer, lines, paid_amount):
+    """
+    Record a sale for priced checkout lines: roll the customer's earlier unpaid bills into
+    it, take branch stock, write the bill and its lines, and post rollups and the ledger.
+    Raises ValueError (InsufficientStock for stock) and leaves nothing written but the
+    bill number, which is taken in its own short transaction so the tracker row is not
+    locked for the whole checkout; a failed sale leaves a gap in the sequence.
+    """
+    bill_total = sum((line["sub_total"] for line in lines), Decimal("0.00"))
+    if not paid_amount.is_finite():
+        raise ValueError(_("Enter a valid paid amount."))
+    if paid_amount < 0:
+        raise ValueError(_("Paid amount cannot be negative."))
+
+    bill_number = BillNumberTracker.get_next_bill_number(tenant, branch)
+    with transaction.atomic():
+        previous_unpaid_sales = list(
+            SalesDetails.objects
+            .select_for_update()
+            .filter(customer=customer, tenant=tenant, branch=branch, unpaid_amount__gt=0)
+            .order_by("created_at", "id")
+        )
+        carried_forward_amount = sum(
+            (to_decimal(sale.unpaid_amount or 0) for sale in previous_unpaid_sales),
+            Decimal("0.00"),
+        )
+        payable_total = bill_total + carried_forward_amount
+        if paid_amount > payable_total:
+            raise ValueError(_("Paid amount cannot be greater than the total payable amount."))
+        unpaid_amount = payable_total - paid_amount
+
+        for line in lines:
+            if line["sold_stock"] > 0 and not take_branch_stock(branch, line["product"], line["sold_stock"]):
+                raise InsufficientStock(_("Insufficient stock for %(product)s.") % {"product": line["product"].name})
+
+        for previous_sale in previous_unpaid_sales:
+            add_sale_totals(previous_sale, unpaid_total=-to_decimal(previous_sale.unpaid_amount or 0))
+            previous_sale.unpaid_amount = Decimal("0.00")
+            previous_sale.save(update_fields=["unpaid_amount"])
+
+        sales_details = SalesDetails.objects.create(
+            user=user,
+            tenant=tenant,
+            branch=branch,
+            customer=customer,
+            bill_number=bill_number,
+            total_amount=bill_total,
+            carried_forward_amount=carried_forward_amount,
+            payable_amount=payable_total,
+            paid_amount=paid_amount,
+            unpaid_amount=unpaid_amount,
+        )
+        record_checkout_totals(sales_details)
+
+        sales_products = _sale_lines(sales_details, lines)
+        SalesProducts.objects.bulk_create(sales_products)
+        add_sales_facts(sales_details, sales_products)
+        cogs_total = _cogs_total(lines)
+
+        applied_to_previous_due = min(paid_amount, carried_forward_amount)
+        current_sale_paid = paid_amount - applied_to_previous_due
+        current_sale_unpaid = bill_total - current_sale_paid
+
+        if applied_to_previous_due > Decimal("0.00"):
+            record_customer_payment_entry(
+                tenant=tenant,
+                amount=applied_to_previous_due,
+                store=branch.store,
+                branch=branch,
+                created_by=user,
+                reference_id=sales_details.bill_number,
+                deferred=ledger_posting_deferred(),
+            )
+
+        record_sale_entry(
+            tenant=tenant,
+            sale_total=bill_total,
+            paid_amount=current_sale_paid,
+            unpaid_amount=current_sale_unpaid,
+            cogs_total=cogs_total,
+            store=branch.store,
+            branch=branch,
+            created_by=user,
+            reference_id=sales_details.bill_number,
+            deferred=ledger_posting_deferred(),
+        )
+        bump_ledger_version(tenant)
+    return sales_details
+
+
+def _offline_result(key, status, **extra):
+    return {"key": key, "status": status, **extra}
+
+
+def _ingest_offline_chunk(tenant, branch, user, documents):
+    today = timezone.localdate()
+    lock_date = closed_through(tenant)
+    keys = [str(doc.get("key") or "").strip() for doc in documents]
+    existing = dict(
+        SalesDetails.objects.filter(tenant=tenant, client_key__in=[key for key in keys if key]).values_list("client_key", "bill_number")
+    )
+    customers = Customer.objects.filter(
+        tenant=tenant,
+        pk__in={safe_int(doc.get("customer_id")) for doc in documents if doc.get("customer_id")},
+    ).in_bulk()
+    product_ids = {
+        safe_int(item.get("product_id"))
+        for doc in documents
+        for item in doc.get("lines") or []
+        if isinstance(item, dict)
+    }
+    products = Products.objects.filter(tenant=tenant, pk__in=product_ids).in_bulk()
+    walk_in = None
+
+    results = [None] * len(documents)
+    with transaction.atomic():
+        remaining = dict(
+            BranchStock.objects.select_for_update()
+            .filter(branch=branch, product_id__in=products)
+            .values_list("product_id", "stock")
+        )
+        accepted = []
+        repeated = []
+        batch_keys = set()
+        for index, (key, doc) in enumerate(zip(keys, documents)):
+            if not key:
+                results[index] = _offline_result(key, "error", message=_("Missing idempotency key."))
+                continue
+            if key in existing:
+                results[index] = _offline_result(key, "duplicate", bill_number=existing[key])
+                continue
+            if key in batch_keys:
+                repeated.append((index, key))
+                continue
+
+            try:
+                business_date = parse_date(str(doc.get("business_date") or today))
+            except ValueError:
+                business_date = None
+            if not business_date or business_date > today:
+                results[index] = _offline_result(key, "error", message=_("Invalid business date."))
+                continue
+            if lock_date and business_date <= lock_date:
+                results[index] = _offline_result(key, "error", message=_("The accounting period for this date is closed."))
+                continue
+
+            if doc.get("customer_id"):
+                customer = customers.get(safe_int(doc.get("customer_id")))
+            else:
+                walk_in = walk_in or get_or_create_walk_in_customer(tenant)
+                customer = walk_in
+            if not customer:
+                results[index] = _offline_result(key, "error", message=_("Customer not found."))
+                continue
+
+            items = doc.get("lines") or []
+            if not isinstance(items, list) or not items:
+                results[index] = _offline_result(key, "error", message=_("Add at least one line to the sale."))
+                continue
+            try:
+                if not all(isinstance(item, dict) and safe_int(item.get("product_id")) in products for item in items):
+                    raise ValueError(_("Product not found."))
+                lines = [_checkout_line(item, products[safe_int(item.get("product_id"))]) for item in items]
+            except ValueError as exc:
+                results[index] = _offline_result(key, "error", message=str(exc))
+                continue
+
+            needed = {}
+            for line in lines:
+                needed[line["product"].id] = needed.get(line["product"].id, 0) + line["sold_stock"]
+            short = next((products[pid] for pid, quantity in needed.items() if remaining.get(pid, 0) < quantity), None)
+            if short:
+                results[index] = _offline_result(key, "error", message=_("Insufficient stock for %(product)s.") % {"product": short.name})
+                continue
+
+            total = sum((line["sub_total"] for line in lines), Decimal("0.00"))
+            paid = to_decimal(doc.get("paid", 0))
+            if not paid.is_finite() or paid < 0 or paid > total:
+                results[index] = _offline_result(key, "error", message=_("Paid amount must be between zero and the bill total."))
+                continue
+
+            for pid, quantity in needed.items():
+                remaining[pid] -= quantity
+            batch_keys.add(key)
+            accepted.append((index, key, business_date, customer, lines, total, paid))
+
+        if accepted:
+            taken = {}
+            for *_head, lines, _total, _paid in accepted:
+                for line in lines:
+                    taken[line["product"].id] = taken.get(line["product"].id, 0) + line["sold_stock"]
+            for pid, quantity in taken.items():
+                if quantity > 0 and not take_branch_stock(branch, products[pid], quantity):
+                    raise InsufficientStock(_("Insufficient stock for %(product)s.") % {"product": products[pid].name})
+
+            prefix = BillNumberTracker.bill_prefix(branch)
+            first_number = BillNumberTracker.reserve(tenant, prefix, len(accepted))
+            sales = SalesDetails.objects.bulk_create([
+                SalesDetails(
+                    tenant=tenant,
+                    branch=branch,
+                    user=user,
+                    customer=customer,
+                    bill_number=BillNumberTracker.format_bill_number(prefix, first_number + offset),
+                    total_amount=total,
+                    payable_amount=total,
+                    paid_amount=paid,
+                    unpaid_amount=total - paid,
+                    business_date=business_date,
+                    client_key=key,
+                )
+                for offset, (_index, key, business_date, customer, _lines, total, paid) in enumerate(accepted)
+            ])
+            sale_lines = [_sale_lines(sale, accepted_sale[4]) for sale, accepted_sale in zip(sales, accepted)]
+            SalesProducts.objects.bulk_create([line for lines in sale_lines for line in lines])
+
+            record_batch_totals(sales)
+            by_day = {}
+            for sale, lines in zip(sales, sale_lines):
+                by_day.setdefault(sale.business_date, (sale, []))[1].extend(lines)
+            for sale, lines in by_day.values():
+                add_sales_facts(sale, lines)
+
+            record_sale_entries(
+                tenant=tenant,
+                created_by=user,
+                sales=[
+                    {
+                        "sale_total": sale.total_amount,
+                        "paid_amount": sale.paid_amount,
+                        "unpaid_amount": sale.unpaid_amount,
+                        "cogs_total": _cogs_total(accepted_sale[4]),
+                        "store": branch.store,
+                        "branch": branch,
+                        "reference_id": sale.bill_number,
+                        "business_date": sale.business_date,
+                    }
+                    for sale, accepted_sale in zip(sales, accepted)
+                ],
+            )
+            bump_ledger_version(tenant)
+
+            for sale, (index, key, *_rest) in zip(sales, accepted):
+                existing[key] = sale.bill_number
+                results[index] = _offline_result(key, "created", bill_number=sale.bill_number)
+        for index, key in repeated:
+            results[index] = _offline_result(key, "duplicate", bill_number=existing[key])
+    return results
+
+
+def ingest_offline_sales(*, tenant, branch, user, documents, chunk_size=OFFLINE_SALE_CHUNK_SIZE):
+    """
+    Record queued offline sales, each a dict with a client-generated key, business_date,
+    customer_id, paid and lines. Chunks of documents commit separately with aggregated
+    stock decrements, bulk inserts and one ledger batch. Sales do not carry forward
+    earlier dues. Returns one result per document; keys already recorded come back as
+    "duplicate", so resubmitting a batch changes nothing.
+    """
+    results = []
+    for start in range(0, len(documents), chunk_size):
+        chunk = documents[start:start + chunk_size]
+        for attempt in range(2):
+            try:
+                results.extend(_ingest_offline_chunk(tenant, branch, user, chunk))
+                break
+            except IntegrityError:
+                # A concurrent upload recorded some of these keys first; retry to report them.
+                if attempt:
+                    raise
+            except ValueError as exc:
+                results.extend(_offline_result(str(doc.get("key") or ""), "error", message=str(exc)) for doc in chunk)
+                break
+    return results
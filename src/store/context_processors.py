@@ -1,6 +1,6 @@
-import json
 from pathlib import Path
 from django.conf import settings
+from .carts import cart_count
 from .models import Branch, BranchMember, TenantMember
 from .permissions import (
     can_transfer_stock,
@@ -12,12 +12,7 @@ from .permissions import (
 
 def cart_context(request):
     try:
-        # Retrieve the cart from the session
-        cart = request.session.get('cart', {})
-        json.dumps(cart)
-
-        # Calculate cart length
-        cart_length = len(cart) if cart else 0
+        cart_length = cart_count(request)
 
         tenant_membership = None
         branch_membership = None
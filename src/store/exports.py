@@ -0,0 +1,150 @@
+import csv
+import importlib.util
+import tempfile
+
+import jdatetime
+from django.db.models import Count, Max, Sum
+from django.http import FileResponse, StreamingHttpResponse
+
+EXPORT_CHUNK_SIZE = 2000
+# openpyxl is an optional dependency; without it only CSV exports are offered.
+XLSX_AVAILABLE = importlib.util.find_spec("openpyxl") is not None
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _jalali(value):
+    return jdatetime.date.fromgregorian(date=value).strftime("%Y-%m-%d") if value else ""
+
+
+def _dated(header, rows, jalali):
+    """
+    Rows start with a Gregorian date; with jalali=True a Jalali column follows it.
+    """
+    if not jalali:
+        return header, rows
+    return [header[0], f"{header[0]} (jalali)", *header[1:]], ((row[0], _jalali(row[0]), *row[1:]) for row in rows)
+
+
+def sales_rows(sales, jalali=False):
+    header = ["business_date", "bill_number", "branch", "cashier", "customer", "total", "carried_forward", "payable", "paid", "unpaid"]
+    rows = sales.order_by("id").values_list(
+        "business_date",
+        "bill_number",
+        "branch__name",
+        "user__username",
+        "customer__name",
+        "total_amount",
+        "carried_forward_amount",
+        "payable_amount",
+        "paid_amount",
+        "unpaid_amount",
+    )
+    return _dated(header, rows.iterator(chunk_size=EXPORT_CHUNK_SIZE), jalali)
+
+
+def sale_line_rows(sale_lines, jalali=False):
+    header = ["business_date", "bill_number", "branch", "product", "category", "package_qty", "item_qty", "package_price", "item_price", "total"]
+    rows = sale_lines.order_by("sale_detail_id", "id").values_list(
+        "sale_detail__business_date",
+        "sale_detail__bill_number",
+        "sale_detail__branch__name",
+        "product__name",
+        "product__category__name",
+        "package_qty",
+        "item_qty",
+        "package_price",
+        "item_price",
+        "total_price",
+    )
+    return _dated(header, rows.iterator(chunk_size=EXPORT_CHUNK_SIZE), jalali)
+
+
+def journal_rows(journal_lines, jalali=False):
+    header = ["entry_date", "reference_type", "reference_id", "account_code", "account", "branch", "debit", "credit", "description"]
+    rows = journal_lines.order_by("entry_date", "id").values_list(
+        "entry_date",
+        "journal_entry__reference_type",
+        "journal_entry__reference_id",
+        "account__code",
+        "account__name",
+        "branch__name",
+        "debit",
+        "credit",
+        "description",
+    )
+    return _dated(header, rows.iterator(chunk_size=EXPORT_CHUNK_SIZE), jalali)
+
+
+def stock_rows(branch_stocks, jalali=False):
+    header = ["branch", "product_code", "product", "category", "stock", "packages", "items"]
+    rows = branch_stocks.order_by("branch_id", "product_id").values_list(
+        "branch__name",
+        "product__code",
+        "product__name",
+        "product__category__name",
+        "stock",
+        "num_of_packages",
+        "num_items",
+    )
+    return header, rows.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def customer_balance_rows(sales, jalali=False):
+    header = ["last_sale", "customer", "phone", "bills", "total", "paid", "unpaid"]
+    rows = (
+        sales.values("customer_id", "customer__name", "customer__phone")
+        .annotate(
+            last_sale=Max("business_date"),
+            bills=Count("id"),
+            total=Sum("total_amount"),
+            paid=Sum("paid_amount"),
+            unpaid=Sum("unpaid_amount"),
+        )
+        .order_by("customer_id")
+        .values_list("last_sale", "customer__name", "customer__phone", "bills", "total", "paid", "unpaid")
+    )
+    return _dated(header, rows.iterator(chunk_size=EXPORT_CHUNK_SIZE), jalali)
+
+
+EXPORTS = {
+    "sales": sales_rows,
+    "sale-lines": sale_line_rows,
+    "journal": journal_rows,
+    "stock": stock_rows,
+    "customers": customer_balance_rows,
+}
+
+
+def csv_response(filename, header, rows):
+    writer = csv.writer(_Echo())
+
+    def stream():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(stream(), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def xlsx_response(filename, header, rows):
+    """
+    Write rows through openpyxl's write-only workbook into a temporary file, then stream
+    the file. Callers check XLSX_AVAILABLE first.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(filename[:31])
+    sheet.append(header)
+    for row in rows:
+        sheet.append(list(row))
+    handle = tempfile.TemporaryFile()
+    workbook.save(handle)
+    handle.seek(0)
+    return FileResponse(handle, as_attachment=True, filename=f"{filename}.xlsx")
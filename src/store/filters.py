@@ -24,7 +24,6 @@ class ProductsFilter(django_filters.FilterSet):
 # filters.py
 import django_filters
 import jdatetime
-from datetime import datetime, timedelta
 from .models import SalesDetails
 
 class SalesDetailsFilter(django_filters.FilterSet):
@@ -39,19 +38,18 @@ class SalesDetailsFilter(django_filters.FilterSet):
         try:
             year, month, day = map(int, jalali_str.split('-'))
             jalali_date = jdatetime.date(year, month, day)
-            gregorian = jalali_date.togregorian()
-            return datetime(gregorian.year, gregorian.month, gregorian.day)
+            return jalali_date.togregorian()
         except Exception:
             return None
 
     def filter_from_date(self, queryset, name, value):
         date = self._convert_jalali_to_gregorian(value)
         if date:
-            return queryset.filter(created_at__gte=date)
+            return queryset.filter(business_date__gte=date)
         return queryset
 
     def filter_to_date(self, queryset, name, value):
         date = self._convert_jalali_to_gregorian(value)
         if date:
-            return queryset.filter(created_at__lt=(date + timedelta(days=1)))
+            return queryset.filter(business_date__lte=date)
         return queryset
@@ -0,0 +1,79 @@
+from datetime import date, timedelta
+
+import jdatetime
+from django.conf import settings
+from django.db.models import Max, Min
+from django.utils.translation import gettext_lazy as _
+
+from .models import JalaliCalendar
+
+CALENDAR_START = date(2010, 1, 1)
+CALENDAR_END = date(2040, 12, 31)
+
+JALALI_MONTHS = (
+    _("Hamal"),
+    _("Sawr"),
+    _("Jawza"),
+    _("Saratan"),
+    _("Asad"),
+    _("Sunbula"),
+    _("Mizan"),
+    _("Aqrab"),
+    _("Qaws"),
+    _("Jadi"),
+    _("Dalw"),
+    _("Hut"),
+)
+
+
+def calendar_row(day, fiscal_start_month=None):
+    """
+    Calendar columns for one Gregorian date. Weeks start on Saturday; a fiscal year is
+    named after the Jalali year it ends in.
+    """
+    fiscal_start_month = fiscal_start_month or getattr(settings, "JALALI_FISCAL_START_MONTH", 1)
+    jalali = jdatetime.date.fromgregorian(date=day)
+    week = jalali.weeknumber()
+    fiscal_year = jalali.year + 1 if fiscal_start_month > 1 and jalali.month >= fiscal_start_month else jalali.year
+    return {
+        "date": day,
+        "jalali_year": jalali.year,
+        "jalali_month": jalali.month,
+        "jalali_day": jalali.day,
+        "jalali_week": week,
+        "month_key": jalali.year * 100 + jalali.month,
+        "week_key": jalali.year * 100 + week,
+        "fiscal_year": fiscal_year,
+        "fiscal_period": (jalali.month - fiscal_start_month) % 12 + 1,
+    }
+
+
+def calendar_rows(start=CALENDAR_START, end=CALENDAR_END, fiscal_start_month=None):
+    day = start
+    while day <= end:
+        yield calendar_row(day, fiscal_start_month)
+        day += timedelta(days=1)
+
+
+def ensure_jalali_calendar(start, end):
+    existing = JalaliCalendar.objects.filter(date__range=(start, end)).count()
+    if existing == (end - start).days + 1:
+        return 0
+    rows = [JalaliCalendar(**row) for row in calendar_rows(start, end)]
+    JalaliCalendar.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    return len(rows) - existing
+
+
+def cover_jalali_calendar(queryset, field="business_date"):
+    """
+    Extend the calendar over the dates a queryset spans, so joins on it (such as
+    BranchDailyTotals.calendar_day) find a row even for dates outside the seeded range.
+    """
+    bounds = queryset.aggregate(first=Min(field), last=Max(field))
+    if bounds["first"]:
+        ensure_jalali_calendar(bounds["first"], bounds["last"])
+
+
+def month_label(month_key):
+    year, month = divmod(month_key, 100)
+    return f"{JALALI_MONTHS[month - 1]} {year}"
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from client.models import Tenant
+from store.rollups import rebuild_sales_facts
+
+
+class Command(BaseCommand):
+    help = "Rebuild the sales fact table used by pivot reports from sale lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenant", action="append", default=[], help="Tenant slug; repeat for several. Defaults to all tenants.")
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.order_by("id")
+        if options["tenant"]:
+            tenants = tenants.filter(slug__in=options["tenant"])
+        if not tenants.exists():
+            raise CommandError("No matching tenants.")
+
+        for tenant in tenants:
+            rows = rebuild_sales_facts(tenant.id)
+            self.stdout.write(f"{tenant.slug}: {rows} sales fact rows")
+        self.stdout.write(self.style.SUCCESS("Sales facts rebuilt."))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from client.models import Tenant
+from store.accounting import close_accounting_period
+from store.models import AccountingPeriod
+
+
+class Command(BaseCommand):
+    help = "Close an accounting period for a tenant and snapshot its closing balances."
+
+    def add_arguments(self, parser):
+        parser.add_argument("tenant", help="Tenant slug.")
+        parser.add_argument("end_date", help="Last day of the period (YYYY-MM-DD).")
+        parser.add_argument("--start-date", help="First day of the period. Defaults to the day after the last closed period.")
+        parser.add_argument(
+            "--period-type",
+            default="month",
+            choices=[choice for choice, _ in AccountingPeriod.PERIOD_TYPE_CHOICES],
+        )
+
+    def handle(self, *args, **options):
+        tenant = Tenant.objects.filter(slug=options["tenant"]).first()
+        if not tenant:
+            raise CommandError(f"Tenant {options['tenant']} does not exist.")
+
+        end_date = parse_date(options["end_date"])
+        start_date = parse_date(options["start_date"]) if options["start_date"] else None
+        if not end_date or (options["start_date"] and not start_date):
+            raise CommandError("Dates must use the YYYY-MM-DD format.")
+
+        try:
+            period = close_accounting_period(
+                tenant=tenant,
+                end_date=end_date,
+                start_date=start_date,
+                period_type=options["period_type"],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Closed {period} for {tenant.name} with {period.closing_balances.count()} balance rows."
+            )
+        )
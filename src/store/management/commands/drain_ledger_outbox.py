@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.accounting import OUTBOX_BATCH_SIZE, drain_ledger_outbox
+
+
+class Command(BaseCommand):
+    help = "Post pending LedgerOutbox rows as journal entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=OUTBOX_BATCH_SIZE)
+        parser.add_argument("--loop", action="store_true", help="Keep polling for new rows instead of exiting when empty.")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Seconds to wait between polls in --loop mode.")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = drain_ledger_outbox(batch_size=options["batch_size"])
+            total += processed
+            if processed:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["sleep"])
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} outbox rows."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from client.models import Tenant
+from store.accounting import post_sale_summaries
+
+
+class Command(BaseCommand):
+    help = "Post staged sales of daily-summary tenants as one journal entry per branch per business day."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenant", help="Tenant slug. Defaults to all tenants.")
+        parser.add_argument("--through", help="Last business day to post (YYYY-MM-DD). Defaults to yesterday.")
+
+    def handle(self, *args, **options):
+        tenant = None
+        if options["tenant"]:
+            tenant = Tenant.objects.filter(slug=options["tenant"]).first()
+            if not tenant:
+                raise CommandError(f"Tenant {options['tenant']} does not exist.")
+
+        through = parse_date(options["through"]) if options["through"] else None
+        if options["through"] and not through:
+            raise CommandError("Dates must use the YYYY-MM-DD format.")
+
+        posted, errors = post_sale_summaries(tenant=tenant, through=through)
+        for error in errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(f"Posted {posted} daily sales summaries."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from store.carts import purge_expired_carts
+
+
+class Command(BaseCommand):
+    help = "Delete database carts with no change for CART_MAX_AGE seconds."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-age", type=int, default=None, help="Seconds since the last change; defaults to CART_MAX_AGE.")
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_carts(options["max_age"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired carts."))
@@ -0,0 +1,62 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from client.models import Tenant
+from store.reconciliation import RECONCILE_CHUNK_SIZE, RECONCILE_KINDS, RECONCILE_REPORT_LIMIT, reconcile_tenant
+
+
+class Command(BaseCommand):
+    help = "Compare sales, payments, expenses, income and purchases with their journal entries and report drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenant", action="append", default=[], help="Tenant slug; repeat for several. Defaults to all tenants.")
+        parser.add_argument("--kind", action="append", choices=RECONCILE_KINDS, help="Source to check; repeat for several. Defaults to all.")
+        parser.add_argument("--rebuild", action="store_true", help="Post missing entries and corrections for drifted ones.")
+        parser.add_argument("--chunk-size", type=int, default=RECONCILE_CHUNK_SIZE)
+        parser.add_argument("--workers", type=int, default=1, help="Tenants reconciled in parallel processes.")
+        parser.add_argument("--report-limit", type=int, default=RECONCILE_REPORT_LIMIT, help="Drift rows printed per tenant.")
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.order_by("id")
+        if options["tenant"]:
+            tenants = tenants.filter(slug__in=options["tenant"])
+        tenant_ids = list(tenants.values_list("id", flat=True))
+        if not tenant_ids:
+            raise CommandError("No matching tenants.")
+
+        task = partial(
+            reconcile_tenant,
+            kinds=options["kind"] or RECONCILE_KINDS,
+            rebuild=options["rebuild"],
+            chunk_size=options["chunk_size"],
+            report_limit=options["report_limit"],
+        )
+        if options["workers"] > 1 and len(tenant_ids) > 1:
+            # Child processes must open their own connections.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options["workers"], initializer=django.setup) as pool:
+                for result in pool.map(task, tenant_ids):
+                    self._report(result)
+        else:
+            for tenant_id in tenant_ids:
+                self._report(task(tenant_id))
+
+    def _report(self, result):
+        for row in result["drift"]:
+            self.stdout.write(
+                f"{result['tenant']} {row['kind']} {row['reference_id']}: {row['status']} "
+                f"(expected {row['expected']}, posted {row['posted']})"
+            )
+        for error in result["errors"]:
+            self.stderr.write(f"{result['tenant']} {error}")
+
+        summary = (
+            f"{result['tenant']}: checked {result['checked']}, missing {result['missing']}, "
+            f"mismatched {result['mismatched']}, rebuilt {result['rebuilt']}, failed {result['failed']}."
+        )
+        style = self.style.WARNING if result["missing"] or result["mismatched"] else self.style.SUCCESS
+        self.stdout.write(style(summary))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from store.jalali import CALENDAR_END, CALENDAR_START, ensure_jalali_calendar
+
+
+class Command(BaseCommand):
+    help = "Fill the Jalali calendar dimension for a Gregorian date range."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", default=CALENDAR_START.isoformat(), help="First Gregorian date (YYYY-MM-DD).")
+        parser.add_argument("--end", default=CALENDAR_END.isoformat(), help="Last Gregorian date (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        start = parse_date(options["start"])
+        end = parse_date(options["end"])
+        if not (start and end) or start > end:
+            raise CommandError("Provide a valid --start/--end date range.")
+
+        created = ensure_jalali_calendar(start, end)
+        self.stdout.write(self.style.SUCCESS(f"{created} calendar days added."))
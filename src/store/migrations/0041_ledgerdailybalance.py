@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:55
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_ledger_daily_balances(apps, schema_editor):
+    JournalLine = apps.get_model("store", "JournalLine")
+    LedgerDailyBalance = apps.get_model("store", "LedgerDailyBalance")
+    grouped = (
+        JournalLine.objects
+        .values(
+            "journal_entry__tenant_id",
+            "journal_entry__store_id",
+            "journal_entry__branch_id",
+            "account_id",
+            "journal_entry__entry_date",
+        )
+        .annotate(total_debit=Sum("debit"), total_credit=Sum("credit"))
+        .order_by()
+    )
+    LedgerDailyBalance.objects.bulk_create(
+        (
+            LedgerDailyBalance(
+                tenant_id=row["journal_entry__tenant_id"],
+                store_id=row["journal_entry__store_id"],
+                branch_id=row["journal_entry__branch_id"],
+                account_id=row["account_id"],
+                entry_date=row["journal_entry__entry_date"],
+                debit=row["total_debit"] or Decimal("0.00"),
+                credit=row["total_credit"] or Decimal("0.00"),
+            )
+            for row in grouped.iterator()
+        ),
+        batch_size=500,
+    )
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0002_branch_contact_email_branch_contact_phone'),
+        ('store', '0040_salesdetails_carried_forward_amount_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerDailyBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_date', models.DateField()),
+                ('debit', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('credit', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='daily_balances', to='store.ledgeraccount')),
+                ('branch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_daily_balances', to='client.branch')),
+                ('store', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_daily_balances', to='client.store')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_daily_balances', to='client.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tenant', 'entry_date'], name='ledger_daily_tenant_date_idx'), models.Index(fields=['tenant', 'account', 'entry_date'], name='ledger_daily_account_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_ledger_daily_balances, noop_reverse),
+    ]
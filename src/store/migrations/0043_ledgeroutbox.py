@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0002_branch_contact_email_branch_contact_phone'),
+        ('store', '0042_accountingperiod_periodclosingbalance'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reference_type', models.CharField(choices=[('sale', 'Sale'), ('purchase', 'Purchase'), ('payment', 'Payment'), ('expense', 'Expense'), ('other_income', 'Other Income'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('reference_id', models.CharField(blank=True, default='', max_length=80)),
+                ('memo', models.CharField(blank=True, default='', max_length=255)),
+                ('entry_date', models.DateField(default=django.utils.timezone.localdate)),
+                ('lines', models.JSONField(default=list)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('posted', 'Posted'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('last_error', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('branch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_outbox', to='client.branch')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_outbox', to=settings.AUTH_USER_MODEL)),
+                ('journal_entry', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outbox_rows', to='store.journalentry')),
+                ('store', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_outbox', to='client.store')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_outbox', to='client.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='ledger_outbox_status_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('reference_id', ''), _negated=True), fields=('tenant', 'reference_type', 'reference_id'), name='uniq_outbox_reference_per_tenant')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0002_branch_contact_email_branch_contact_phone'),
+        ('store', '0043_ledgeroutbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journalentry',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=120, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['tenant', 'reference_type', 'reference_id'], name='journal_entry_reference_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='journalentry',
+            constraint=models.UniqueConstraint(fields=('tenant', 'idempotency_key'), name='journal_entry_idempotency_key_uniq'),
+        ),
+    ]
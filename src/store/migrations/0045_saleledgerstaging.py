@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:08
+
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0003_tenant_ledger_posting_mode'),
+        ('store', '0044_journalentry_idempotency_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaleLedgerStaging',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_date', models.DateField(default=django.utils.timezone.localdate)),
+                ('reference_id', models.CharField(blank=True, default='', max_length=80)),
+                ('sale_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('paid_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('unpaid_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('cogs_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('branch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sale_ledger_staging', to='client.branch')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sale_ledger_staging', to=settings.AUTH_USER_MODEL)),
+                ('journal_entry', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='staged_sales', to='store.journalentry')),
+                ('store', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sale_ledger_staging', to='client.store')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sale_ledger_staging', to='client.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('journal_entry__isnull', True)), fields=['business_date', 'tenant'], name='sale_staging_pending_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('reference_id', ''), _negated=True), fields=('tenant', 'reference_id'), name='uniq_staged_sale_reference_per_tenant')],
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_journal_line_scope(apps, schema_editor):
+    JournalEntry = apps.get_model("store", "JournalEntry")
+    JournalLine = apps.get_model("store", "JournalLine")
+    entry = JournalEntry.objects.filter(pk=OuterRef("journal_entry_id"))
+    JournalLine.objects.update(
+        tenant_id=Subquery(entry.values("tenant_id")[:1]),
+        store_id=Subquery(entry.annotate(scope_store=Coalesce("store_id", "branch__store_id")).values("scope_store")[:1]),
+        branch_id=Subquery(entry.values("branch_id")[:1]),
+        entry_date=Subquery(entry.values("entry_date")[:1]),
+    )
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0003_tenant_ledger_posting_mode'),
+        ('store', '0045_saleledgerstaging'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journalline',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='journal_lines', to='client.tenant'),
+        ),
+        migrations.AddField(
+            model_name='journalline',
+            name='store',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='journal_lines', to='client.store'),
+        ),
+        migrations.AddField(
+            model_name='journalline',
+            name='branch',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='journal_lines', to='client.branch'),
+        ),
+        migrations.AddField(
+            model_name='journalline',
+            name='entry_date',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(backfill_journal_line_scope, noop_reverse),
+        migrations.AlterField(
+            model_name='journalline',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='journal_lines', to='client.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='journalline',
+            name='entry_date',
+            field=models.DateField(),
+        ),
+        migrations.AddIndex(
+            model_name='journalline',
+            index=models.Index(fields=['tenant', 'account', 'entry_date'], name='journal_line_account_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalline',
+            index=models.Index(fields=['tenant', 'entry_date'], name='journal_line_tenant_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalline',
+            index=models.Index(fields=['store', 'account', 'entry_date'], name='journal_line_store_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalline',
+            index=models.Index(fields=['branch', 'account', 'entry_date'], name='journal_line_branch_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:20
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0004_tenant_ledger_version'),
+        ('store', '0046_journalline_denormalized_scope'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BranchDailyTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_date', models.DateField()),
+                ('sales_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('paid_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('unpaid_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('bill_count', models.IntegerField(default=0)),
+                ('customer_count', models.IntegerField(default=0)),
+                ('income_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('expense_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_totals', to='client.branch')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='branch_daily_totals', to='client.tenant')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='branch_daily_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tenant', 'branch', 'business_date'], name='branch_daily_totals_idx')],
+            },
+        ),
+    ]
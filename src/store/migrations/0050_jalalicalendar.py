@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:35
+
+from django.db import migrations, models
+
+from store.jalali import calendar_rows
+
+
+def seed_jalali_calendar(apps, schema_editor):
+    JalaliCalendar = apps.get_model("store", "JalaliCalendar")
+    JalaliCalendar.objects.bulk_create((JalaliCalendar(**row) for row in calendar_rows()), batch_size=1000)
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0049_salesdetails_business_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JalaliCalendar',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False)),
+                ('jalali_year', models.PositiveSmallIntegerField()),
+                ('jalali_month', models.PositiveSmallIntegerField()),
+                ('jalali_day', models.PositiveSmallIntegerField()),
+                ('jalali_week', models.PositiveSmallIntegerField()),
+                ('month_key', models.PositiveIntegerField()),
+                ('week_key', models.PositiveIntegerField()),
+                ('fiscal_year', models.PositiveSmallIntegerField()),
+                ('fiscal_period', models.PositiveSmallIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month_key'], name='jalali_calendar_month_idx'), models.Index(fields=['week_key'], name='jalali_calendar_week_idx'), models.Index(fields=['fiscal_year', 'fiscal_period'], name='jalali_calendar_fiscal_idx')],
+            },
+        ),
+        migrations.RunPython(seed_jalali_calendar, noop_reverse),
+    ]
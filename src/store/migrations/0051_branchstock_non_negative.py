@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:43
+
+from django.db import migrations, models
+
+
+def clear_negative_branch_stock(apps, schema_editor):
+    # Oversold rows are set to zero so the constraint can be added; each one gets an
+    # adjustment movement carrying the quantity written off, so the oversell stays on record.
+    BranchStock = apps.get_model("store", "BranchStock")
+    InventoryMovement = apps.get_model("store", "InventoryMovement")
+    negative = BranchStock.objects.filter(stock__lt=0).select_related("branch__store", "product")
+    InventoryMovement.objects.bulk_create(
+        [
+            InventoryMovement(
+                tenant_id=row.product.tenant_id or row.branch.store.tenant_id,
+                product_id=row.product_id,
+                scope="branch",
+                store_id=row.branch.store_id,
+                branch_id=row.branch_id,
+                movement_type="adjustment",
+                package_qty=-row.num_of_packages,
+                item_qty=-row.num_items,
+                total_items=-row.stock,
+                note=f"Negative stock {row.stock} cleared before branch_stock_non_negative",
+            )
+            for row in negative
+        ]
+    )
+    BranchStock.objects.filter(stock__lt=0).update(stock=0, num_of_packages=0, num_items=0)
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0004_tenant_ledger_version'),
+        ('store', '0050_jalalicalendar'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_negative_branch_stock, noop_reverse),
+        migrations.AddConstraint(
+            model_name='branchstock',
+            constraint=models.CheckConstraint(condition=models.Q(('stock__gte', 0)), name='branch_stock_non_negative'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0004_tenant_ledger_version'),
+        ('store', '0051_branchstock_non_negative'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='billnumbertracker',
+            name='scope_key',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='billnumbertracker',
+            name='tenant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bill_trackers', to='client.tenant'),
+        ),
+        migrations.AddConstraint(
+            model_name='billnumbertracker',
+            constraint=models.UniqueConstraint(fields=('tenant', 'scope_key'), name='uniq_bill_tracker_scope'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0004_tenant_ledger_version'),
+        ('customer', '0002_customerpayment_business_date'),
+        ('store', '0052_bill_number_scopes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salesdetails',
+            name='client_key',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='salesdetails',
+            constraint=models.UniqueConstraint(fields=('tenant', 'client_key'), name='uniq_sale_client_key_per_tenant'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:06
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_purchase_debits(apps, schema_editor):
+    JournalLine = apps.get_model("store", "JournalLine")
+    LedgerDailyBalance = apps.get_model("store", "LedgerDailyBalance")
+    grouped = (
+        JournalLine.objects
+        .filter(journal_entry__reference_type="purchase", debit__gt=0)
+        .values(
+            "journal_entry__tenant_id",
+            "journal_entry__store_id",
+            "journal_entry__branch_id",
+            "account_id",
+            "journal_entry__entry_date",
+        )
+        .annotate(total_debit=Sum("debit"))
+        .order_by()
+    )
+    for row in grouped.iterator():
+        rollup_id = (
+            LedgerDailyBalance.objects.filter(
+                tenant_id=row["journal_entry__tenant_id"],
+                store_id=row["journal_entry__store_id"],
+                branch_id=row["journal_entry__branch_id"],
+                account_id=row["account_id"],
+                entry_date=row["journal_entry__entry_date"],
+            )
+            .values_list("id", flat=True)
+            .first()
+        )
+        if rollup_id is not None:
+            LedgerDailyBalance.objects.filter(pk=rollup_id).update(purchase_debit=row["total_debit"])
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0054_cart_store'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ledgerdailybalance',
+            name='purchase_debit',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16),
+        ),
+        migrations.RunPython(backfill_purchase_debits, noop_reverse),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:08
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+TOTAL_FIELDS = ("sales_total", "paid_total", "unpaid_total", "bill_count", "income_total", "expense_total")
+
+
+def merge_duplicate_totals(apps, schema_editor):
+    BranchDailyTotals = apps.get_model("store", "BranchDailyTotals")
+    kept = {}
+    merged = {}
+    duplicates = []
+    for row in BranchDailyTotals.objects.order_by("id").iterator():
+        key = (row.tenant_id, row.branch_id, row.business_date, row.user_id)
+        first = kept.get(key)
+        if first is None:
+            kept[key] = row
+            continue
+        for name in TOTAL_FIELDS:
+            setattr(first, name, getattr(first, name) + getattr(row, name))
+        merged[first.id] = first
+        duplicates.append(row.id)
+    if duplicates:
+        BranchDailyTotals.objects.bulk_update(list(merged.values()), TOTAL_FIELDS, batch_size=500)
+        BranchDailyTotals.objects.filter(id__in=duplicates).delete()
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0005_tenant_chart_version'),
+        ('store', '0055_ledgerdailybalance_purchase_debit'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='branchdailytotals',
+            name='customer_count',
+        ),
+        migrations.RunPython(merge_duplicate_totals, noop_reverse),
+        migrations.AddConstraint(
+            model_name='branchdailytotals',
+            constraint=models.UniqueConstraint(models.F('tenant'), models.F('branch'), models.F('business_date'), django.db.models.functions.comparison.Coalesce('user', 0), name='uniq_branch_daily_totals_key'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:10
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+FACT_FIELDS = ("quantity", "revenue", "line_count")
+
+
+def merge_duplicate_facts(apps, schema_editor):
+    SalesFact = apps.get_model("store", "SalesFact")
+    kept = {}
+    merged = {}
+    duplicates = []
+    for row in SalesFact.objects.order_by("id").iterator():
+        key = (row.tenant_id, row.branch_id, row.business_date, row.user_id, row.category_id, row.product_id)
+        first = kept.get(key)
+        if first is None:
+            kept[key] = row
+            continue
+        for name in FACT_FIELDS:
+            setattr(first, name, getattr(first, name) + getattr(row, name))
+        merged[first.id] = first
+        duplicates.append(row.id)
+    if duplicates:
+        SalesFact.objects.bulk_update(list(merged.values()), FACT_FIELDS, batch_size=500)
+        SalesFact.objects.filter(id__in=duplicates).delete()
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0005_tenant_chart_version'),
+        ('store', '0056_branchdailytotals_unique_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_facts, noop_reverse),
+        migrations.AddConstraint(
+            model_name='salesfact',
+            constraint=models.UniqueConstraint(models.F('tenant'), models.F('branch'), models.F('business_date'), django.db.models.functions.comparison.Coalesce('user', 0), django.db.models.functions.comparison.Coalesce('category', 0), django.db.models.functions.comparison.Coalesce('product', 0), name='uniq_sales_fact_key'),
+        ),
+    ]
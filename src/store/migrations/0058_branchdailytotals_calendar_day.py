@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0057_salesfact_unique_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='branchdailytotals',
+            name='calendar_day',
+            field=models.ForeignObject(from_fields=['business_date'], null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='store.jalalicalendar', to_fields=['date']),
+        ),
+    ]
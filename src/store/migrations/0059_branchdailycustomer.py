@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:48
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_daily_customers(apps, schema_editor):
+    BranchDailyCustomer = apps.get_model("store", "BranchDailyCustomer")
+    SalesDetails = apps.get_model("store", "SalesDetails")
+    rows = (
+        SalesDetails.objects.filter(tenant__isnull=False, branch__isnull=False)
+        .values_list("tenant_id", "branch_id", "user_id", "customer_id", "business_date")
+        .distinct()
+        .order_by()
+    )
+    BranchDailyCustomer.objects.bulk_create(
+        (
+            BranchDailyCustomer(tenant_id=tenant_id, branch_id=branch_id, user_id=user_id, customer_id=customer_id, business_date=business_date)
+            for tenant_id, branch_id, user_id, customer_id, business_date in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0005_tenant_chart_version'),
+        ('customer', '0002_customerpayment_business_date'),
+        ('store', '0058_branchdailytotals_calendar_day'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BranchDailyCustomer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_date', models.DateField()),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_customers', to='client.branch')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='branch_days', to='customer.customer')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='branch_daily_customers', to='client.tenant')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='branch_daily_customers', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tenant', 'branch', 'business_date'], name='branch_daily_customer_idx')],
+                'constraints': [models.UniqueConstraint(models.F('tenant'), models.F('branch'), models.F('business_date'), django.db.models.functions.comparison.Coalesce('user', 0), models.F('customer'), name='uniq_branch_daily_customer')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_customers, noop_reverse),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:51
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+BALANCE_FIELDS = ("debit", "credit", "purchase_debit")
+
+
+def merge_duplicate_balances(apps, schema_editor):
+    LedgerDailyBalance = apps.get_model("store", "LedgerDailyBalance")
+    kept = {}
+    merged = {}
+    duplicates = []
+    for row in LedgerDailyBalance.objects.order_by("id").iterator():
+        key = (row.tenant_id, row.store_id, row.branch_id, row.account_id, row.entry_date)
+        first = kept.get(key)
+        if first is None:
+            kept[key] = row
+            continue
+        for name in BALANCE_FIELDS:
+            setattr(first, name, getattr(first, name) + getattr(row, name))
+        merged[first.id] = first
+        duplicates.append(row.id)
+    if duplicates:
+        LedgerDailyBalance.objects.bulk_update(list(merged.values()), BALANCE_FIELDS, batch_size=500)
+        LedgerDailyBalance.objects.filter(id__in=duplicates).delete()
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0005_tenant_chart_version'),
+        ('store', '0059_branchdailycustomer'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_balances, noop_reverse),
+        migrations.AddConstraint(
+            model_name='ledgerdailybalance',
+            constraint=models.UniqueConstraint(models.F('tenant'), django.db.models.functions.comparison.Coalesce('store', 0), django.db.models.functions.comparison.Coalesce('branch', 0), models.F('account'), models.F('entry_date'), name='uniq_ledger_daily_balance_key'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+# The reference types post_journal_entry is called with idempotent=True for.
+IDEMPOTENT_REFERENCE_TYPES = ("purchase", "sale", "payment", "expense", "other_income")
+
+
+def backfill_idempotency_keys(apps, schema_editor):
+    """
+    Key entries posted before idempotency keys existed the way journal_idempotency_key
+    does, so retries of those documents find them. Only the earliest entry per key gets
+    it; later legacy duplicates keep no key.
+    """
+    JournalEntry = apps.get_model("store", "JournalEntry")
+    taken = set(
+        JournalEntry.objects.filter(idempotency_key__isnull=False).values_list("tenant_id", "idempotency_key")
+    )
+    legacy = (
+        JournalEntry.objects.filter(idempotency_key__isnull=True, reference_type__in=IDEMPOTENT_REFERENCE_TYPES)
+        .exclude(reference_id="")
+        .order_by("id")
+        .only("id", "tenant_id", "reference_type", "reference_id")
+    )
+    keyed = []
+    for entry in legacy.iterator():
+        key = f"{entry.reference_type}:{entry.reference_id}"
+        if (entry.tenant_id, key) in taken:
+            continue
+        taken.add((entry.tenant_id, key))
+        entry.idempotency_key = key
+        keyed.append(entry)
+    JournalEntry.objects.bulk_update(keyed, ["idempotency_key"], batch_size=500)
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0060_ledgerdailybalance_unique_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_idempotency_keys, noop_reverse),
+    ]
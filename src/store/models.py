@@ -1,8 +1,13 @@
+import threading
+import uuid
 from decimal import Decimal
+from functools import partial
 
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
@@ -111,17 +116,78 @@ class Products(models.Model):
         return self.package_sale_price or Decimal("0")
 
 
+_BILL_NUMBER_BLOCKS = {}
+_BILL_NUMBER_BLOCKS_LOCK = threading.Lock()
+
+
+def _keep_bill_number_block(key, start, limit):
+    with _BILL_NUMBER_BLOCKS_LOCK:
+        block = _BILL_NUMBER_BLOCKS.get(key)
+        if not block or block[0] >= block[1]:
+            _BILL_NUMBER_BLOCKS[key] = [start, limit]
+
+
 class BillNumberTracker(models.Model):
-    tenant = models.OneToOneField(Tenant, on_delete=models.CASCADE, related_name="bill_tracker", null=True, blank=True)
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="bill_trackers", null=True, blank=True)
+    scope_key = models.CharField(max_length=100, blank=True, default="")
     current_number = models.PositiveIntegerField(default=1001)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["tenant", "scope_key"], name="uniq_bill_tracker_scope"),
+        ]
+
+    @staticmethod
+    def bill_prefix(branch):
+        """
+        Sequence prefix for BILL_NUMBER_SCOPE: none for "tenant", the store code for
+        "store", store and branch codes for "branch" (ids stand in for missing codes).
+        """
+        scope = getattr(settings, "BILL_NUMBER_SCOPE", "tenant")
+        if branch is None or scope == "tenant":
+            return ""
+        store_part = branch.store.code or f"S{branch.store_id}"
+        if scope == "store":
+            return store_part
+        return f"{store_part}-{branch.code or f'B{branch.pk}'}"
+
     @classmethod
-    def get_next_bill_number(cls, tenant):
-        tracker, _ = cls.objects.get_or_create(tenant=tenant)
-        next_number = tracker.current_number
-        tracker.current_number += 1
-        tracker.save(update_fields=["current_number"])
-        return next_number
+    def reserve(cls, tenant, scope_key="", count=1):
+        with transaction.atomic():
+            cls.objects.get_or_create(tenant=tenant, scope_key=scope_key)
+            tracker = cls.objects.select_for_update().get(tenant=tenant, scope_key=scope_key)
+            start = tracker.current_number
+            tracker.current_number += count
+            tracker.save(update_fields=["current_number"])
+        return start
+
+    @classmethod
+    def get_next_bill_number(cls, tenant, branch=None):
+        """
+        With BILL_NUMBER_BLOCK_SIZE above 1 each process reserves that many numbers per
+        tracker row (hi/lo) and hands them out from memory, but only after the transaction
+        that reserved the block commits. Numbers left in a block when the process exits
+        are skipped.
+        """
+        prefix = cls.bill_prefix(branch)
+        block_size = max(getattr(settings, "BILL_NUMBER_BLOCK_SIZE", 1), 1)
+        key = (getattr(tenant, "pk", None), prefix)
+        number = None
+        if block_size > 1:
+            with _BILL_NUMBER_BLOCKS_LOCK:
+                block = _BILL_NUMBER_BLOCKS.get(key)
+                if block and block[0] < block[1]:
+                    number = block[0]
+                    block[0] += 1
+        if number is None:
+            number = cls.reserve(tenant, prefix, block_size)
+            if block_size > 1:
+                transaction.on_commit(partial(_keep_bill_number_block, key, number + 1, number + block_size))
+        return cls.format_bill_number(prefix, number)
+
+    @staticmethod
+    def format_bill_number(prefix, number):
+        return f"{prefix}-{number}" if prefix else str(number)
 
 
 class SalesDetails(models.Model):
@@ -136,10 +202,16 @@ class SalesDetails(models.Model):
     paid_amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
     unpaid_amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
     created_at = models.DateTimeField(auto_now_add=True)
+    business_date = models.DateField(default=timezone.localdate, editable=False)
+    client_key = models.CharField(max_length=100, null=True, blank=True, editable=False)
 
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=["tenant", "bill_number"], name="uniq_bill_per_tenant"),
+            models.UniqueConstraint(fields=["tenant", "client_key"], name="uniq_sale_client_key_per_tenant"),
+        ]
+        indexes = [
+            models.Index(fields=["tenant", "branch", "business_date"], name="sales_tenant_branch_date_idx"),
         ]
 
     def clean(self):
@@ -151,7 +223,7 @@ class SalesDetails(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.bill_number:
-            self.bill_number = str(BillNumberTracker.get_next_bill_number(self.tenant))
+            self.bill_number = BillNumberTracker.get_next_bill_number(self.tenant, self.branch)
         if self.payable_amount in (None, Decimal("0.00")) and (self.total_amount or self.carried_forward_amount):
             self.payable_amount = (self.total_amount or Decimal("0.00")) + (self.carried_forward_amount or Decimal("0.00"))
         self.full_clean()
@@ -198,6 +270,147 @@ class Expense(models.Model):
         return self.category
 
 
+class JalaliCalendar(models.Model):
+    date = models.DateField(primary_key=True)
+    jalali_year = models.PositiveSmallIntegerField()
+    jalali_month = models.PositiveSmallIntegerField()
+    jalali_day = models.PositiveSmallIntegerField()
+    jalali_week = models.PositiveSmallIntegerField()
+    month_key = models.PositiveIntegerField()
+    week_key = models.PositiveIntegerField()
+    fiscal_year = models.PositiveSmallIntegerField()
+    fiscal_period = models.PositiveSmallIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["month_key"], name="jalali_calendar_month_idx"),
+            models.Index(fields=["week_key"], name="jalali_calendar_week_idx"),
+            models.Index(fields=["fiscal_year", "fiscal_period"], name="jalali_calendar_fiscal_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.jalali_year}-{self.jalali_month:02d}-{self.jalali_day:02d}"
+
+
+class BranchDailyTotals(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="branch_daily_totals")
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name="daily_totals")
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="branch_daily_totals")
+    business_date = models.DateField()
+    sales_total = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    paid_total = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    unpaid_total = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    bill_count = models.IntegerField(default=0)
+    income_total = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    expense_total = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    # Joins business_date to the calendar dimension without a column of its own.
+    calendar_day = models.ForeignObject(
+        JalaliCalendar,
+        on_delete=models.DO_NOTHING,
+        from_fields=["business_date"],
+        to_fields=["date"],
+        null=True,
+        related_name="+",
+    )
+
+    class Meta:
+        constraints = [
+            # Coalesce makes a NULL cashier (income and expense rows) count as one key.
+            models.UniqueConstraint(
+                "tenant",
+                "branch",
+                "business_date",
+                Coalesce("user", 0),
+                name="uniq_branch_daily_totals_key",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["tenant", "branch", "business_date"], name="branch_daily_totals_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.branch} {self.business_date}"
+
+
+# The set of customers each cashier served per branch and day: distinct customer counts
+# read these rows instead of scanning the sales table.
+class BranchDailyCustomer(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="branch_daily_customers")
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name="daily_customers")
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="branch_daily_customers")
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name="branch_days")
+    business_date = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                "tenant",
+                "branch",
+                "business_date",
+                Coalesce("user", 0),
+                "customer",
+                name="uniq_branch_daily_customer",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["tenant", "branch", "business_date"], name="branch_daily_customer_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.branch} {self.business_date} {self.customer}"
+
+
+class SalesFact(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="sales_facts")
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name="sales_facts")
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="sales_facts")
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name="sales_facts")
+    product = models.ForeignKey(Products, on_delete=models.SET_NULL, null=True, blank=True, related_name="sales_facts")
+    business_date = models.DateField()
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    line_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                "tenant",
+                "branch",
+                "business_date",
+                Coalesce("user", 0),
+                Coalesce("category", 0),
+                Coalesce("product", 0),
+                name="uniq_sales_fact_key",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["tenant", "business_date"], name="sales_fact_tenant_date_idx"),
+            models.Index(fields=["tenant", "branch", "business_date"], name="sales_fact_branch_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product} {self.business_date}"
+
+
+def bump_chart_version(*tenant_ids):
+    Tenant.objects.filter(pk__in=tenant_ids).update(chart_version=models.F("chart_version") + 1)
+
+
+class LedgerAccountQuerySet(models.QuerySet):
+    # Queryset writes skip the post_save signal, so they move the chart version themselves.
+    def update(self, **kwargs):
+        tenant_ids = set(self.values_list("tenant_id", flat=True))
+        rows = super().update(**kwargs)
+        if rows:
+            bump_chart_version(*tenant_ids)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        bump_chart_version(*{obj.tenant_id for obj in objs})
+        return objs
+
+
 class LedgerAccount(models.Model):
     ACCOUNT_TYPE_CHOICES = [
         ("asset", _("Asset")),
@@ -222,6 +435,8 @@ class LedgerAccount(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = LedgerAccountQuerySet.as_manager()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=["tenant", "code"], name="uniq_ledger_code_per_tenant"),
@@ -250,11 +465,18 @@ class JournalEntry(models.Model):
     reference_type = models.CharField(max_length=20, choices=REFERENCE_TYPE_CHOICES)
     reference_id = models.CharField(max_length=80, blank=True, default="")
     memo = models.CharField(max_length=255, blank=True, default="")
+    idempotency_key = models.CharField(max_length=120, null=True, blank=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="journal_entries")
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-entry_date", "-id"]
+        constraints = [
+            models.UniqueConstraint(fields=["tenant", "idempotency_key"], name="journal_entry_idempotency_key_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["tenant", "reference_type", "reference_id"], name="journal_entry_reference_idx"),
+        ]
 
     def clean(self):
         super().clean()
@@ -279,9 +501,20 @@ class JournalLine(models.Model):
     debit = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
     credit = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
     description = models.CharField(max_length=255, blank=True, default="")
+    # Copied from the entry at posting time; store is taken from the branch when the entry has none.
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="journal_lines", db_index=False)
+    store = models.ForeignKey(Store, on_delete=models.SET_NULL, null=True, blank=True, related_name="journal_lines", db_index=False)
+    branch = models.ForeignKey(Branch, on_delete=models.SET_NULL, null=True, blank=True, related_name="journal_lines", db_index=False)
+    entry_date = models.DateField()
 
     class Meta:
         ordering = ["id"]
+        indexes = [
+            models.Index(fields=["tenant", "account", "entry_date"], name="journal_line_account_date_idx"),
+            models.Index(fields=["tenant", "entry_date"], name="journal_line_tenant_date_idx"),
+            models.Index(fields=["store", "account", "entry_date"], name="journal_line_store_idx"),
+            models.Index(fields=["branch", "account", "entry_date"], name="journal_line_branch_idx"),
+        ]
 
     def clean(self):
         super().clean()
@@ -303,6 +536,154 @@ class JournalLine(models.Model):
         return f"{self.account.code} (D:{self.debit} C:{self.credit})"
 
 
+class LedgerOutbox(models.Model):
+    STATUS_CHOICES = [
+        ("pending", _("Pending")),
+        ("posted", _("Posted")),
+        ("failed", _("Failed")),
+    ]
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="ledger_outbox")
+    store = models.ForeignKey(Store, on_delete=models.SET_NULL, null=True, blank=True, related_name="ledger_outbox")
+    branch = models.ForeignKey(Branch, on_delete=models.SET_NULL, null=True, blank=True, related_name="ledger_outbox")
+    reference_type = models.CharField(max_length=20, choices=JournalEntry.REFERENCE_TYPE_CHOICES)
+    reference_id = models.CharField(max_length=80, blank=True, default="")
+    memo = models.CharField(max_length=255, blank=True, default="")
+    entry_date = models.DateField(default=timezone.localdate)
+    lines = models.JSONField(default=list)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="ledger_outbox")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    journal_entry = models.ForeignKey(JournalEntry, on_delete=models.SET_NULL, null=True, blank=True, related_name="outbox_rows")
+    last_error = models.CharField(max_length=255, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tenant", "reference_type", "reference_id"],
+                condition=~models.Q(reference_id=""),
+                name="uniq_outbox_reference_per_tenant",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["status", "id"], name="ledger_outbox_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.reference_type} {self.reference_id} ({self.status})"
+
+
+class SaleLedgerStaging(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="sale_ledger_staging")
+    store = models.ForeignKey(Store, on_delete=models.SET_NULL, null=True, blank=True, related_name="sale_ledger_staging")
+    branch = models.ForeignKey(Branch, on_delete=models.SET_NULL, null=True, blank=True, related_name="sale_ledger_staging")
+    business_date = models.DateField(default=timezone.localdate)
+    reference_id = models.CharField(max_length=80, blank=True, default="")
+    sale_total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    paid_amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    unpaid_amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    cogs_total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="sale_ledger_staging")
+    journal_entry = models.ForeignKey(JournalEntry, on_delete=models.SET_NULL, null=True, blank=True, related_name="staged_sales")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tenant", "reference_id"],
+                condition=~models.Q(reference_id=""),
+                name="uniq_staged_sale_reference_per_tenant",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["business_date", "tenant"],
+                condition=models.Q(journal_entry__isnull=True),
+                name="sale_staging_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Staged sale {self.reference_id} ({self.business_date})"
+
+
+class LedgerDailyBalance(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="ledger_daily_balances")
+    store = models.ForeignKey(Store, on_delete=models.SET_NULL, null=True, blank=True, related_name="ledger_daily_balances")
+    branch = models.ForeignKey(Branch, on_delete=models.SET_NULL, null=True, blank=True, related_name="ledger_daily_balances")
+    account = models.ForeignKey(LedgerAccount, on_delete=models.PROTECT, related_name="daily_balances")
+    entry_date = models.DateField()
+    debit = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    credit = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    # Debits posted by purchase entries, so purchase series need no JournalEntry join.
+    purchase_debit = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+
+    class Meta:
+        constraints = [
+            # Coalesce makes tenant-level rows (no store or branch) count as one key.
+            models.UniqueConstraint(
+                "tenant",
+                Coalesce("store", 0),
+                Coalesce("branch", 0),
+                "account",
+                "entry_date",
+                name="uniq_ledger_daily_balance_key",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["tenant", "entry_date"], name="ledger_daily_tenant_date_idx"),
+            models.Index(fields=["tenant", "account", "entry_date"], name="ledger_daily_account_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.account.code} {self.entry_date} (D:{self.debit} C:{self.credit})"
+
+
+class AccountingPeriod(models.Model):
+    PERIOD_TYPE_CHOICES = [
+        ("month", _("Month")),
+        ("fiscal_year", _("Fiscal Year")),
+    ]
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="accounting_periods")
+    period_type = models.CharField(max_length=20, choices=PERIOD_TYPE_CHOICES, default="month")
+    start_date = models.DateField()
+    end_date = models.DateField()
+    closed_at = models.DateTimeField(auto_now_add=True)
+    closed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="closed_periods")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["tenant", "end_date"], name="uniq_period_end_per_tenant"),
+        ]
+        ordering = ["-end_date"]
+
+    def clean(self):
+        super().clean()
+        if self.start_date and self.end_date and self.start_date > self.end_date:
+            raise ValidationError({"end_date": _("Period end date must be on or after its start date.")})
+
+    def save(self, *args, **kwargs):
+        self.full_clean()
+        return super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.get_period_type_display()} {self.start_date} - {self.end_date}"
+
+
+class PeriodClosingBalance(models.Model):
+    period = models.ForeignKey(AccountingPeriod, on_delete=models.CASCADE, related_name="closing_balances")
+    store = models.ForeignKey(Store, on_delete=models.SET_NULL, null=True, blank=True, related_name="period_closing_balances")
+    branch = models.ForeignKey(Branch, on_delete=models.SET_NULL, null=True, blank=True, related_name="period_closing_balances")
+    account = models.ForeignKey(LedgerAccount, on_delete=models.PROTECT, related_name="closing_balances")
+    debit = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    credit = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+
+    def __str__(self):
+        return f"{self.period} {self.account.code} (D:{self.debit} C:{self.credit})"
+
+
 class BranchStock(models.Model):
     branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name="stock_levels")
     product = models.ForeignKey(Products, on_delete=models.CASCADE, related_name="branch_stocks")
@@ -313,6 +694,9 @@ class BranchStock(models.Model):
 
     class Meta:
         unique_together = ("branch", "product")
+        constraints = [
+            models.CheckConstraint(condition=models.Q(stock__gte=0), name="branch_stock_non_negative"),
+        ]
 
     def __str__(self):
         return f"{self.branch} - {self.product.name}"
@@ -455,3 +839,45 @@ class StockTransfer(models.Model):
 
     def __str__(self):
         return f"{self.product.name}: {self.from_branch} -> {self.to_branch}"
+
+
+class Cart(models.Model):
+    STATUS_CHOICES = [
+        ("open", _("Open")),
+        ("held", _("Held")),
+    ]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="carts")
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name="carts")
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="carts")
+    customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True, related_name="carts")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="open")
+    label = models.CharField(max_length=100, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["tenant", "branch", "status"], name="cart_branch_status_idx"),
+        ]
+
+    def __str__(self):
+        return self.label or str(self.id)
+
+
+class CartLine(models.Model):
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="lines")
+    product = models.ForeignKey(Products, on_delete=models.CASCADE, related_name="cart_lines")
+    item_quantity = models.IntegerField(default=0)
+    package_quantity = models.IntegerField(default=0)
+    item_price = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    package_price = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["cart", "product"], name="uniq_cart_line_product"),
+        ]
+
+    def __str__(self):
+        return f"{self.cart} - {self.product.name}"
@@ -0,0 +1,305 @@
+from datetime import datetime
+from decimal import Decimal
+from itertools import islice
+
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .accounting import ZERO, closed_through, money, post_journal_entries, sale_entry_lines
+from .models import (
+    CustomerPayment,
+    Expense,
+    InventoryMovement,
+    JournalLine,
+    OtherIncome,
+    SaleLedgerStaging,
+    SalesDetails,
+    SalesProducts,
+    Tenant,
+)
+
+RECONCILE_CHUNK_SIZE = 1000
+RECONCILE_REPORT_LIMIT = 100
+RECONCILE_KINDS = ("sale", "payment", "expense", "other_income", "purchase")
+
+# (debit account, credit account, reconciled account) of each source's journal entry.
+RECONCILE_ACCOUNTS = {
+    "sale": ("1100", "4000", "4000"),
+    "payment": ("1000", "1100", "1000"),
+    "expense": ("6100", "1000", "6100"),
+    "other_income": ("1000", "4100", "4100"),
+    "purchase": ("1200", "1000", "1200"),
+}
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _source_row(reference_id, amount, store, branch, created_at, **extra):
+    return {
+        "reference_id": str(reference_id),
+        "amount": money(amount),
+        "store": store,
+        "branch": branch,
+        "date": timezone.localdate(created_at) if isinstance(created_at, datetime) else created_at,
+        **extra,
+    }
+
+
+def _sale_rows(tenant_id, chunk_size):
+    rows = (
+        SalesDetails.objects.filter(tenant_id=tenant_id)
+        .order_by("id")
+        .values("id", "bill_number", "total_amount", "paid_amount", "carried_forward_amount", "branch_id", "branch__store_id", "business_date")
+        .iterator(chunk_size=chunk_size)
+    )
+    for row in rows:
+        paid = min(max(money(row["paid_amount"]) - money(row["carried_forward_amount"]), ZERO), money(row["total_amount"]))
+        yield _source_row(
+            row["bill_number"],
+            row["total_amount"],
+            row["branch__store_id"],
+            row["branch_id"],
+            row["business_date"],
+            sale_id=row["id"],
+            paid=paid,
+        )
+
+
+def _payment_rows(tenant_id, chunk_size):
+    rows = (
+        CustomerPayment.objects.filter(tenant_id=tenant_id)
+        .order_by("id")
+        .values("id", "payment_amount", "branch_id", "branch__store_id", "business_date")
+        .iterator(chunk_size=chunk_size)
+    )
+    for row in rows:
+        # Payments posted before PAYMENT-<id> references were keyed by the bare id.
+        yield _source_row(
+            f"PAYMENT-{row['id']}",
+            row["payment_amount"],
+            row["branch__store_id"],
+            row["branch_id"],
+            row["business_date"],
+            aliases=[str(row["id"])],
+        )
+
+
+def _cash_rows(model):
+    def rows_for(tenant_id, chunk_size):
+        rows = (
+            model.objects.filter(tenant_id=tenant_id)
+            .order_by("id")
+            .values("id", "amount", "branch_id", "branch__store_id", "date_created")
+            .iterator(chunk_size=chunk_size)
+        )
+        for row in rows:
+            yield _source_row(row["id"], row["amount"], row["branch__store_id"], row["branch_id"], row["date_created"])
+
+    return rows_for
+
+
+def _purchase_rows(tenant_id, chunk_size):
+    rows = (
+        InventoryMovement.objects.filter(tenant_id=tenant_id, movement_type="purchase")
+        .order_by("product_id", "id")
+        .values("product_id", "package_qty", "product__package_purchase_price", "store_id", "branch_id", "branch__store_id", "created_at")
+        .iterator(chunk_size=chunk_size)
+    )
+    current = None
+    for row in rows:
+        amount = Decimal(row["package_qty"] or 0) * (row["product__package_purchase_price"] or ZERO)
+        if current and current["reference_id"] == f"PRODUCT-{row['product_id']}":
+            current["amount"] = money(current["amount"] + amount)
+            continue
+        if current:
+            yield current
+        current = _source_row(
+            f"PRODUCT-{row['product_id']}",
+            amount,
+            row["store_id"] or row["branch__store_id"],
+            row["branch_id"],
+            row["created_at"],
+        )
+    if current:
+        yield current
+
+
+RECONCILE_SOURCES = {
+    "sale": _sale_rows,
+    "payment": _payment_rows,
+    "expense": _cash_rows(Expense),
+    "other_income": _cash_rows(OtherIncome),
+    "purchase": _purchase_rows,
+}
+
+
+def _posted_amounts(tenant_id, kind, chunk):
+    """
+    Net amount on the reconciled account per source reference, including reconciliation
+    corrections and staged sales, plus the set of references that have their own entry.
+    """
+    refs = {}
+    for row in chunk:
+        for ref in [row["reference_id"], *row.get("aliases", [])]:
+            refs[ref] = row["reference_id"]
+    corrections = {f"{kind}:{row['reference_id']}": row["reference_id"] for row in chunk}
+    debit_code, _credit_code, account_code = RECONCILE_ACCOUNTS[kind]
+
+    rows = (
+        JournalLine.objects.filter(tenant_id=tenant_id)
+        .filter(
+            Q(journal_entry__reference_type=kind, journal_entry__reference_id__in=list(refs))
+            | Q(journal_entry__reference_type="adjustment", journal_entry__reference_id__in=list(corrections))
+        )
+        .values("journal_entry__reference_type", "journal_entry__reference_id")
+        .annotate(
+            debit=Sum("debit", filter=Q(account__code=account_code)),
+            credit=Sum("credit", filter=Q(account__code=account_code)),
+        )
+        .order_by()
+    )
+    posted = {}
+    entered = set()
+    for row in rows:
+        reference_type = row["journal_entry__reference_type"]
+        if reference_type == kind:
+            reference_id = refs[row["journal_entry__reference_id"]]
+            entered.add(reference_id)
+        else:
+            reference_id = corrections[row["journal_entry__reference_id"]]
+        debit = row["debit"] or ZERO
+        credit = row["credit"] or ZERO
+        posted[reference_id] = posted.get(reference_id, ZERO) + (debit - credit if account_code == debit_code else credit - debit)
+
+    if kind == "sale":
+        # Sales of daily-summary tenants reach the ledger through the staging table.
+        staged = SaleLedgerStaging.objects.filter(tenant_id=tenant_id, reference_id__in=list(refs)).values_list(
+            "reference_id", "sale_total"
+        )
+        for reference_id, sale_total in staged:
+            entered.add(reference_id)
+            posted[reference_id] = posted.get(reference_id, ZERO) + sale_total
+    return posted, entered
+
+
+def _transfer_lines(kind, amount):
+    debit_code, credit_code, _account_code = RECONCILE_ACCOUNTS[kind]
+    if amount < ZERO:
+        debit_code, credit_code, amount = credit_code, debit_code, -amount
+    return [
+        {"account_code": debit_code, "debit": amount, "description": "Reconciliation"},
+        {"account_code": credit_code, "credit": amount, "description": "Reconciliation"},
+    ]
+
+
+def _sale_costs(sale_ids):
+    costs = {}
+    rows = SalesProducts.objects.filter(sale_detail_id__in=sale_ids).values(
+        "sale_detail_id", "package_qty", "item_qty", "product__package_contain", "product__package_purchase_price"
+    )
+    for row in rows:
+        package_contain = max(row["product__package_contain"] or 1, 1)
+        sold_stock = (row["package_qty"] or 0) * package_contain + (row["item_qty"] or 0)
+        unit_cost = (row["product__package_purchase_price"] or ZERO) / Decimal(package_contain)
+        costs[row["sale_detail_id"]] = costs.get(row["sale_detail_id"], ZERO) + Decimal(sold_stock) * unit_cost
+    return costs
+
+
+def _rebuild_specs(kind, missing, mismatched, lock_date):
+    costs = _sale_costs([row["sale_id"] for row in missing]) if kind == "sale" and missing else {}
+    specs = []
+    for row in missing:
+        if kind == "sale":
+            lines = sale_entry_lines(
+                sale_total=row["amount"],
+                paid_amount=row["paid"],
+                unpaid_amount=row["amount"] - row["paid"],
+                cogs_total=money(costs.get(row["sale_id"], ZERO)),
+            )
+        else:
+            lines = _transfer_lines(kind, row["amount"])
+        specs.append(
+            {
+                "store": row["store"],
+                "branch": row["branch"],
+                "reference_type": kind,
+                "reference_id": row["reference_id"],
+                "memo": "Rebuilt by ledger reconciliation",
+                "entry_date": row["date"] if not lock_date or row["date"] > lock_date else None,
+                "lines": lines,
+                "idempotent": True,
+            }
+        )
+    for row, difference in mismatched:
+        specs.append(
+            {
+                "store": row["store"],
+                "branch": row["branch"],
+                "reference_type": "adjustment",
+                "reference_id": f"{kind}:{row['reference_id']}",
+                "memo": f"Reconciliation correction for {kind} {row['reference_id']}",
+                "lines": _transfer_lines(kind, difference),
+            }
+        )
+    return specs
+
+
+def reconcile_tenant(
+    tenant_id,
+    kinds=RECONCILE_KINDS,
+    rebuild=False,
+    chunk_size=RECONCILE_CHUNK_SIZE,
+    report_limit=RECONCILE_REPORT_LIMIT,
+):
+    """
+    Stream one tenant's source rows in chunks and compare them with their journal entries.
+    Only counters and the first report_limit drift rows are kept, so memory stays bounded.
+    """
+    tenant = Tenant.objects.get(pk=tenant_id)
+    lock_date = closed_through(tenant)
+    result = {"tenant": tenant.slug, "checked": 0, "missing": 0, "mismatched": 0, "rebuilt": 0, "failed": 0, "drift": [], "errors": []}
+
+    for kind in kinds:
+        for chunk in _chunks(RECONCILE_SOURCES[kind](tenant_id, chunk_size), chunk_size):
+            posted, entered = _posted_amounts(tenant_id, kind, chunk)
+            missing = []
+            mismatched = []
+            for row in chunk:
+                amount = posted.get(row["reference_id"], ZERO)
+                if row["reference_id"] not in entered:
+                    if row["amount"] <= ZERO:
+                        continue
+                    missing.append(row)
+                    status = "missing"
+                elif amount != row["amount"]:
+                    mismatched.append((row, row["amount"] - amount))
+                    status = "mismatch"
+                else:
+                    continue
+                if len(result["drift"]) < report_limit:
+                    result["drift"].append(
+                        {"kind": kind, "reference_id": row["reference_id"], "expected": row["amount"], "posted": amount, "status": status}
+                    )
+            result["checked"] += len(chunk)
+            result["missing"] += len(missing)
+            result["mismatched"] += len(mismatched)
+
+            if not rebuild or not (missing or mismatched):
+                continue
+            specs = _rebuild_specs(kind, missing, mismatched, lock_date)
+            try:
+                post_journal_entries(tenant=tenant, entries=specs)
+            except ValueError as exc:
+                result["failed"] += len(specs)
+                if len(result["errors"]) < report_limit:
+                    result["errors"].append(f"{kind}: {exc}")
+            else:
+                result["rebuilt"] += len(specs)
+    return result
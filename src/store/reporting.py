@@ -0,0 +1,254 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+from django.db.models import Sum
+from django.utils import translation
+from django.utils.translation import gettext as _
+
+from .accounting import ZERO, balance_row
+from .models import Tenant
+
+DAILY_SERIES = ("sales", "purchase", "income", "cogs", "expense")
+
+# Pivot dimension -> (grouping key, label) on SalesFact.
+PIVOT_DIMENSIONS = {
+    "date": ("business_date", "business_date"),
+    "branch": ("branch_id", "branch__name"),
+    "category": ("category_id", "category__name"),
+    "product": ("product_id", "product__name"),
+    "cashier": ("user_id", "user__username"),
+}
+PIVOT_MEASURES = ("revenue", "quantity", "line_count")
+REPORT_SINGLE_FLIGHT_POLL = 0.05
+
+
+@dataclass
+class FinancialReport:
+    sales_total: Decimal = ZERO
+    paid_total: Decimal = ZERO
+    unpaid_total: Decimal = ZERO
+    purchase_total: Decimal = ZERO
+    ledger_rows: list = field(default_factory=list)
+    daily: dict = field(default_factory=dict)
+
+    def balance(self, code):
+        for row in self.ledger_rows:
+            if row["code"] == code:
+                return row["balance"]
+        return ZERO
+
+    @property
+    def sales_revenue(self):
+        return self.balance("4000")
+
+    @property
+    def other_income(self):
+        return self.balance("4100")
+
+    @property
+    def cogs(self):
+        return self.balance("5000")
+
+    @property
+    def operating_expense(self):
+        return self.balance("6100")
+
+    @property
+    def gross_profit(self):
+        return self.sales_revenue - self.cogs
+
+    @property
+    def net_profit(self):
+        return (self.sales_revenue + self.other_income) - (self.cogs + self.operating_expense)
+
+    def day(self, entry_date):
+        return self.daily.setdefault(entry_date, dict.fromkeys(DAILY_SERIES, ZERO))
+
+    def series(self, name, dates):
+        return [float(self.daily.get(entry_date, {}).get(name, ZERO)) for entry_date in dates]
+
+
+def build_financial_report(daily_balances, sales):
+    """
+    Compute the report's KPIs, ledger rows and daily series from already scoped querysets:
+    one grouped pass over the LedgerDailyBalance rollup keyed by date and account, and one
+    over sales by day.
+    """
+    report = FinancialReport()
+
+    accounts = {}
+    rows = (
+        daily_balances.values("entry_date", "account_id", "account__code", "account__name", "account__account_type")
+        .annotate(total_debit=Sum("debit"), total_credit=Sum("credit"), purchase_debit=Sum("purchase_debit"))
+        .order_by()
+    )
+    for row in rows:
+        debit = row["total_debit"] or ZERO
+        credit = row["total_credit"] or ZERO
+        account = accounts.setdefault(row["account_id"], {**row, "total_debit": ZERO, "total_credit": ZERO})
+        account["total_debit"] += debit
+        account["total_credit"] += credit
+
+        code = row["account__code"]
+        if code == "1200" and row["purchase_debit"]:
+            report.day(row["entry_date"])["purchase"] += row["purchase_debit"]
+            report.purchase_total += row["purchase_debit"]
+        elif code == "4100":
+            report.day(row["entry_date"])["income"] += credit
+        elif code == "5000":
+            report.day(row["entry_date"])["cogs"] += debit
+        elif code == "6100":
+            report.day(row["entry_date"])["expense"] += debit
+    report.ledger_rows = [balance_row(row) for row in sorted(accounts.values(), key=lambda row: row["account__code"])]
+
+    sales_rows = (
+        sales.values("business_date")
+        .annotate(total=Sum("total_amount"), paid=Sum("paid_amount"), unpaid=Sum("unpaid_amount"))
+        .order_by()
+    )
+    for row in sales_rows:
+        total = row["total"] or ZERO
+        report.day(row["business_date"])["sales"] += total
+        report.sales_total += total
+        report.paid_total += row["paid"] or ZERO
+        report.unpaid_total += row["unpaid"] or ZERO
+    return report
+
+
+def _pivot_value(value):
+    return float(value) if isinstance(value, Decimal) else value or 0
+
+
+def build_sales_pivot(facts, rows, columns=None, measure="revenue"):
+    """
+    Group already scoped SalesFact rows by one dimension, optionally crossed with a second
+    one, in a single query. Rows are ordered by their total, or chronologically for dates.
+    """
+    if rows not in PIVOT_DIMENSIONS or (columns and columns not in PIVOT_DIMENSIONS) or measure not in PIVOT_MEASURES:
+        raise ValueError("Unknown pivot dimension or measure.")
+    row_key, row_label = PIVOT_DIMENSIONS[rows]
+    fields = [row_key, row_label]
+    if columns:
+        column_key, column_label = PIVOT_DIMENSIONS[columns]
+        fields += [column_key, column_label]
+
+    data = {}
+    headers = {}
+    total = 0
+    for row in facts.values(*dict.fromkeys(fields)).annotate(value=Sum(measure)).order_by():
+        value = _pivot_value(row["value"])
+        entry = data.setdefault(
+            row[row_key],
+            {"key": row[row_key], "label": str(row[row_label] or _("Unknown")), "values": {}, "total": 0},
+        )
+        entry["total"] += value
+        total += value
+        if columns:
+            key = str(row[column_key])
+            headers.setdefault(key, {"key": row[column_key], "label": str(row[column_label] or _("Unknown"))})
+            entry["values"][key] = entry["values"].get(key, 0) + value
+
+    if rows == "date":
+        ordered = sorted(data.values(), key=lambda entry: entry["key"])
+    else:
+        ordered = sorted(data.values(), key=lambda entry: entry["total"], reverse=True)
+    return {
+        "rows": rows,
+        "columns": columns,
+        "measure": measure,
+        "headers": list(headers.values()),
+        "data": ordered,
+        "total": total,
+    }
+
+
+def ledger_version(tenant):
+    return Tenant.objects.filter(pk=tenant.pk).values_list("ledger_version", flat=True).first() or 0
+
+
+def cached_report(name, tenant, params, build):
+    """
+    Serve build() from the cache until the tenant's ledger version moves. The version is
+    read from the database, so per-process caches (locmem) stay correct across workers.
+    """
+    if tenant is None:
+        return build()
+    digest = hashlib.md5(repr(sorted(params.items())).encode()).hexdigest()
+    key = f"report:{name}:{tenant.pk}:{ledger_version(tenant)}:{digest}"
+    result = cache.get(key)
+    if result is None:
+        result = single_flight(key, build, getattr(settings, "REPORT_CACHE_TIMEOUT", 60 * 60 * 24))
+    return result
+
+
+def single_flight(key, build, timeout):
+    """
+    Let one caller build a missing cache entry while identical callers poll for its
+    result. The lock is a cache.add() key, so it spans worker processes whenever the cache
+    backend is shared; a waiter still empty-handed after REPORT_SINGLE_FLIGHT_TIMEOUT
+    builds the result itself.
+    """
+    lock_key = f"{key}:lock"
+    wait = getattr(settings, "REPORT_SINGLE_FLIGHT_TIMEOUT", 30)
+    deadline = time.monotonic() + wait
+    while True:
+        if cache.add(lock_key, 1, wait):
+            try:
+                result = cache.get(key)
+                if result is None:
+                    result = build()
+                    cache.set(key, result, timeout)
+            finally:
+                cache.delete(lock_key)
+            return result
+        time.sleep(REPORT_SINGLE_FLIGHT_POLL)
+        result = cache.get(key)
+        if result is not None:
+            return result
+        if time.monotonic() >= deadline:
+            return build()
+
+
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _report_executor(workers):
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report-query")
+        return _EXECUTOR
+
+
+def _run_report_task(task, language):
+    # Worker threads keep their connection between tasks, like request threads do, and
+    # drop it once it outlives CONN_MAX_AGE or becomes unusable.
+    try:
+        with translation.override(language):
+            return task()
+    finally:
+        close_old_connections()
+
+
+def run_concurrently(**tasks):
+    """
+    Run independent report callables and return their results by name. With
+    REPORT_QUERY_WORKERS above 1 they share a bounded thread pool, each worker on its own
+    database connection; otherwise, or inside a transaction the workers could not see,
+    they run one after another.
+    """
+    workers = getattr(settings, "REPORT_QUERY_WORKERS", 0)
+    if workers < 2 or len(tasks) < 2 or connection.in_atomic_block:
+        return {name: task() for name, task in tasks.items()}
+    executor = _report_executor(workers)
+    language = translation.get_language()
+    futures = {name: executor.submit(_run_report_task, task, language) for name, task in tasks.items()}
+    return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,332 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, Greatest
+
+from .accounting import ZERO
+from .models import BranchDailyCustomer, BranchDailyTotals, BranchMember, BranchStock, Expense, OtherIncome, SalesDetails, SalesFact, SalesProducts
+from .utils import safe_int, to_decimal
+
+TOTAL_FIELDS = (
+    "sales_total",
+    "paid_total",
+    "unpaid_total",
+    "bill_count",
+    "income_total",
+    "expense_total",
+)
+
+
+def _apply_deltas(model, lookup, deltas):
+    """
+    Add deltas to one rollup row with F() increments. The first write for a key creates
+    the row; if a concurrent first write wins the unique key, fall back to the increment.
+    """
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+    increments = {name: F(name) + value for name, value in deltas.items()}
+    if model.objects.filter(**lookup).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        model.objects.filter(**lookup).update(**increments)
+
+
+def add_daily_totals(tenant_id, branch_id, business_date, user_id=None, **deltas):
+    if not (tenant_id and branch_id):
+        return
+    lookup = {"tenant_id": tenant_id, "branch_id": branch_id, "business_date": business_date, "user_id": user_id}
+    _apply_deltas(BranchDailyTotals, lookup, deltas)
+
+
+def add_sale_totals(sale, **deltas):
+    add_daily_totals(sale.tenant_id, sale.branch_id, sale.business_date, sale.user_id, **deltas)
+
+
+def add_daily_customers(sales):
+    """
+    Add the sales' customers to their (date, branch, cashier) customer sets; customers
+    already in a set are skipped by the unique key.
+    """
+    BranchDailyCustomer.objects.bulk_create(
+        [
+            BranchDailyCustomer(
+                tenant_id=sale.tenant_id,
+                branch_id=sale.branch_id,
+                user_id=sale.user_id,
+                customer_id=sale.customer_id,
+                business_date=sale.business_date,
+            )
+            for sale in sales
+            if sale.tenant_id and sale.branch_id and sale.customer_id
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def record_checkout_totals(sale):
+    add_sale_totals(
+        sale,
+        sales_total=sale.total_amount,
+        paid_total=sale.paid_amount,
+        unpaid_total=sale.unpaid_amount,
+        bill_count=1,
+    )
+    add_daily_customers([sale])
+
+
+def record_batch_totals(sales):
+    """
+    record_checkout_totals for many new sales of one tenant, branch and cashier: one
+    rollup update per business day.
+    """
+    days = {}
+    for row in sales:
+        totals = days.setdefault(row.business_date, {"sale": row, "sales_total": ZERO, "paid_total": ZERO, "unpaid_total": ZERO, "bill_count": 0})
+        totals["sales_total"] += row.total_amount
+        totals["paid_total"] += row.paid_amount
+        totals["unpaid_total"] += row.unpaid_amount
+        totals["bill_count"] += 1
+    for totals in days.values():
+        add_sale_totals(totals.pop("sale"), **totals)
+    add_daily_customers(sales)
+
+
+def sold_quantity(line):
+    package_contain = max(safe_int(getattr(line.product, "package_contain", 1), 1), 1)
+    return safe_int(line.package_qty) * package_contain + safe_int(line.item_qty)
+
+
+def add_sales_facts(sale, lines, sign=1):
+    """
+    Fold sale lines into the (date, branch, cashier, category, product) fact rows; for
+    returns, pass sign=-1 with the removed lines.
+    """
+    if not (sale.tenant_id and sale.branch_id):
+        return
+    grouped = {}
+    for line in lines:
+        product = line.product
+        key = (getattr(product, "id", None), getattr(product, "category_id", None))
+        facts = grouped.setdefault(key, {"quantity": 0, "revenue": ZERO, "line_count": 0})
+        facts["quantity"] += sign * sold_quantity(line)
+        facts["revenue"] += sign * to_decimal(line.total_price or 0)
+        facts["line_count"] += sign
+    for (product_id, category_id), deltas in grouped.items():
+        lookup = {
+            "tenant_id": sale.tenant_id,
+            "branch_id": sale.branch_id,
+            "business_date": sale.business_date,
+            "user_id": sale.user_id,
+            "category_id": category_id,
+            "product_id": product_id,
+        }
+        _apply_deltas(SalesFact, lookup, deltas)
+
+
+def daily_totals(tenant, branch, start_date=None, end_date=None, **filters):
+    rows = BranchDailyTotals.objects.filter(tenant=tenant, branch=branch, **filters)
+    if start_date:
+        rows = rows.filter(business_date__gte=start_date)
+    if end_date:
+        rows = rows.filter(business_date__lte=end_date)
+    return rows
+
+
+def daily_customers(tenant, branch, start_date=None, end_date=None, **filters):
+    rows = BranchDailyCustomer.objects.filter(tenant=tenant, branch=branch, **filters)
+    if start_date:
+        rows = rows.filter(business_date__gte=start_date)
+    if end_date:
+        rows = rows.filter(business_date__lte=end_date)
+    return rows
+
+
+def count_customers(rows):
+    return rows.aggregate(total=Count("customer", distinct=True))["total"]
+
+
+def sum_totals(rows):
+    totals = rows.aggregate(**{name: Sum(name) for name in TOTAL_FIELDS})
+    return {name: value or (0 if name == "bill_count" else ZERO) for name, value in totals.items()}
+
+
+BRANCH_RANKINGS = {
+    "profit": "profit_total",
+    "sales": "sales_total",
+    "stock": "stock_total",
+}
+
+
+def _competition_ranks(rows, field):
+    ranks = {}
+    ordered = sorted(rows, key=lambda row: row[field], reverse=True)
+    for position, row in enumerate(ordered, start=1):
+        previous = ordered[position - 2] if position > 1 else None
+        ranks[row["branch"].id] = ranks[previous["branch"].id] if previous and previous[field] == row[field] else position
+    return ranks
+
+
+def branch_comparison(tenant, branches, start_date=None, end_date=None, sort="profit"):
+    """
+    Metrics for every branch with one grouped query per source (rollups, stock,
+    memberships). Rows carry a rank for each BRANCH_RANKINGS metric and come back ordered
+    by the requested one; ties keep the branch order.
+    """
+    branches = list(branches)
+    branch_ids = [branch.id for branch in branches]
+    rows = BranchDailyTotals.objects.filter(tenant=tenant, branch_id__in=branch_ids)
+    if start_date:
+        rows = rows.filter(business_date__gte=start_date)
+    if end_date:
+        rows = rows.filter(business_date__lte=end_date)
+    totals = {
+        row.pop("branch_id"): row
+        for row in rows.values("branch_id")
+        .annotate(**{name: Sum(name) for name in TOTAL_FIELDS})
+        .order_by()
+    }
+    stock = {
+        row.pop("branch_id"): row
+        for row in BranchStock.objects.filter(branch_id__in=branch_ids)
+        .values("branch_id")
+        .annotate(
+            total_stock=Sum("stock"),
+            active_products=Count("id", filter=Q(stock__gt=0)),
+            tracked_products=Count("id"),
+        )
+        .order_by()
+    }
+    employees = dict(
+        BranchMember.objects.filter(branch_id__in=branch_ids)
+        .values("branch_id")
+        .annotate(total=Count("id"))
+        .order_by()
+        .values_list("branch_id", "total")
+    )
+
+    rows = []
+    for branch in branches:
+        branch_totals = totals.get(branch.id, {})
+        branch_stock = stock.get(branch.id, {})
+        sales_amount = branch_totals.get("sales_total") or ZERO
+        income_amount = branch_totals.get("income_total") or ZERO
+        expense_amount = branch_totals.get("expense_total") or ZERO
+        rows.append(
+            {
+                "branch": branch,
+                "sales_count": branch_totals.get("bill_count") or 0,
+                "sales_total": sales_amount,
+                "income_total": income_amount,
+                "expense_total": expense_amount,
+                "profit_total": sales_amount + income_amount - expense_amount,
+                "stock_total": branch_stock.get("total_stock") or 0,
+                "active_products": branch_stock.get("active_products") or 0,
+                "tracked_products": branch_stock.get("tracked_products") or 0,
+                "employee_count": employees.get(branch.id, 0),
+            }
+        )
+
+    for name, field in BRANCH_RANKINGS.items():
+        ranks = _competition_ranks(rows, field)
+        for row in rows:
+            row[f"{name}_rank"] = ranks[row["branch"].id]
+    sort = sort if sort in BRANCH_RANKINGS else "profit"
+    rows.sort(key=lambda row: row[f"{sort}_rank"])
+    return rows
+
+
+def rebuild_branch_daily_totals(tenant_id):
+    """
+    Recompute a tenant's rollup rows from sales, other income and expenses, and its daily
+    customer sets from sales. Returns the number of rollup rows written.
+    """
+    with transaction.atomic():
+        rows = {}
+        sales = (
+            SalesDetails.objects.filter(tenant_id=tenant_id, branch__isnull=False)
+            .values("branch_id", "user_id", "business_date")
+            .annotate(
+                sales_total=Sum("total_amount"),
+                paid_total=Sum("paid_amount"),
+                unpaid_total=Sum("unpaid_amount"),
+                bill_count=Count("id"),
+            )
+            .order_by()
+        )
+        for row in sales:
+            key = (row.pop("branch_id"), row.pop("user_id"), row.pop("business_date"))
+            rows[key] = row
+        for model, field in ((OtherIncome, "income_total"), (Expense, "expense_total")):
+            amounts = (
+                model.objects.filter(tenant_id=tenant_id, branch__isnull=False)
+                .values("branch_id", "date_created")
+                .annotate(total=Sum("amount"))
+                .order_by()
+            )
+            for row in amounts:
+                rows.setdefault((row["branch_id"], None, row["date_created"]), {})[field] = row["total"]
+
+        BranchDailyTotals.objects.filter(tenant_id=tenant_id).delete()
+        BranchDailyTotals.objects.bulk_create(
+            [
+                BranchDailyTotals(tenant_id=tenant_id, branch_id=branch_id, user_id=user_id, business_date=business_date, **totals)
+                for (branch_id, user_id, business_date), totals in rows.items()
+            ],
+            batch_size=1000,
+        )
+
+        customers = (
+            SalesDetails.objects.filter(tenant_id=tenant_id, branch__isnull=False)
+            .values_list("branch_id", "user_id", "customer_id", "business_date")
+            .distinct()
+            .order_by()
+        )
+        BranchDailyCustomer.objects.filter(tenant_id=tenant_id).delete()
+        BranchDailyCustomer.objects.bulk_create(
+            [
+                BranchDailyCustomer(tenant_id=tenant_id, branch_id=branch_id, user_id=user_id, customer_id=customer_id, business_date=business_date)
+                for branch_id, user_id, customer_id, business_date in customers
+            ],
+            batch_size=1000,
+        )
+    return len(rows)
+
+
+def rebuild_sales_facts(tenant_id):
+    """
+    Recompute a tenant's sales fact rows from sale lines. Returns the number of rows written.
+    """
+    quantity = F("package_qty") * Coalesce(Greatest("product__package_contain", 1), 1) + F("item_qty")
+    with transaction.atomic():
+        rows = (
+            SalesProducts.objects.filter(sale_detail__tenant_id=tenant_id, sale_detail__branch__isnull=False)
+            .values(
+                "sale_detail__branch_id",
+                "sale_detail__user_id",
+                "sale_detail__business_date",
+                "product__category_id",
+                "product_id",
+            )
+            .annotate(quantity=Sum(quantity), revenue=Sum("total_price"), line_count=Count("id"))
+            .order_by()
+        )
+        facts = [
+            SalesFact(
+                tenant_id=tenant_id,
+                branch_id=row["sale_detail__branch_id"],
+                user_id=row["sale_detail__user_id"],
+                business_date=row["sale_detail__business_date"],
+                category_id=row["product__category_id"],
+                product_id=row["product_id"],
+                quantity=row["quantity"] or 0,
+                revenue=row["revenue"] or ZERO,
+                line_count=row["line_count"],
+            )
+            for row in rows
+        ]
+        SalesFact.objects.filter(tenant_id=tenant_id).delete()
+        SalesFact.objects.bulk_create(facts, batch_size=1000)
+    return len(facts)
@@ -1,9 +1,10 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.utils import timezone
 
-from .models import BranchMember, ExchangeRate, Products, StoreMember, TenantMember, UserOnboarding
+from .accounting import invalidate_account_cache
+from .models import BranchMember, ExchangeRate, LedgerAccount, Products, StoreMember, TenantMember, UserOnboarding
 from decimal import Decimal
 
 @receiver(post_save, sender=ExchangeRate)
@@ -17,6 +18,12 @@ def update_afn_prices_for_usd_products(sender, instance, created, **kwargs):
         product.save()
 
 
+@receiver(post_save, sender=LedgerAccount)
+@receiver(post_delete, sender=LedgerAccount)
+def invalidate_chart_of_accounts(sender, instance, **kwargs):
+    invalidate_account_cache(instance.tenant_id)
+
+
 def _assign_memberships_from_onboarding(onboarding):
     if not onboarding or not onboarding.user_id:
         return
@@ -1,16 +1,51 @@
+import csv
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from datetime import date, timedelta
 from decimal import Decimal
+from unittest import mock
 
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
 from django.db.models import Sum
-from django.test import Client, TestCase
+from django.test import Client, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone, translation
+
+import jdatetime
 
 from customer.services import customer_account_summary
-from .accounting import ensure_default_accounts, record_expense_entry, record_sale_entry
-from .models import Branch, BranchMember, BranchStock, Category, Customer, JournalLine, Products, SalesDetails, SalesProducts, Store, StoreMember, Tenant, TenantMember, UserOnboarding
+from .accounting import (
+    account_balances,
+    balances_as_of,
+    close_accounting_period,
+    drain_ledger_outbox,
+    ensure_default_accounts,
+    post_journal_entries,
+    post_journal_entry,
+    post_sale_summaries,
+    record_customer_payment_entry,
+    record_expense_entry,
+    record_purchase_entry,
+    record_sale_entries,
+    record_sale_entry,
+)
+from .carts import CacheCartStore, CartLockTimeout
+from .filters import SalesDetailsFilter
+from .jalali import calendar_row, month_label
+from .models import BillNumberTracker, Branch, BranchDailyTotals, BranchMember, BranchStock, Cart, CartLine, Category, Customer, Expense, JalaliCalendar, JournalEntry, JournalLine, LedgerAccount, LedgerDailyBalance, LedgerOutbox, Products, SaleLedgerStaging, SalesDetails, SalesFact, SalesProducts, Store, StoreMember, Tenant, TenantMember, UserOnboarding
 from .permissions import can_transfer_stock
+from .reconciliation import reconcile_tenant
+from .reporting import build_financial_report, cached_report, run_concurrently, single_flight
+from . import checkout, models, views
+from .rollups import add_daily_totals, daily_customers, daily_totals, sum_totals
+from .views import _summary_report_data
 
 
 class TenantIsolationTests(TestCase):
@@ -53,8 +88,726 @@ class AccountingPostingTests(TestCase):
         self.assertGreater(lines.count(), 0)
 
 
+class ChartOfAccountsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name="Tenant Cache", slug="tenant-cache")
+        self.store = Store.objects.create(tenant=self.tenant, name="Cache Store")
+        self.branch = Branch.objects.create(store=self.store, name="Cache Branch")
+        with self.captureOnCommitCallbacks(execute=True):
+            ensure_default_accounts(self.tenant)
+
+    def tearDown(self):
+        cache.clear()
+
+    def _post_sale(self):
+        return record_sale_entry(
+            tenant=self.tenant,
+            sale_total=Decimal("500.00"),
+            paid_amount=Decimal("500.00"),
+            unpaid_amount=Decimal("0.00"),
+            cogs_total=Decimal("200.00"),
+            store=self.store,
+            branch=self.branch,
+            reference_id="INV-CACHE",
+        )
+
+    def test_posting_resolves_accounts_without_querying_chart(self):
+        with CaptureQueriesContext(connection) as queries:
+            entry = self._post_sale()
+
+        self.assertEqual(entry.lines.count(), 4)
+        ledger_queries = [q["sql"] for q in queries.captured_queries if "store_ledgeraccount" in q["sql"]]
+        self.assertEqual(ledger_queries, [])
+        self.assertFalse(any("store_tenant" in q["sql"] for q in queries.captured_queries))
+
+    def test_warm_cache_posting_query_count(self):
+        # Idempotency lookup, period check, entry insert, line insert, rollup lookup and
+        # rollup insert; the other six are the savepoints around the posting, entry and rollups.
+        with self.assertNumQueries(12):
+            self._post_sale()
+
+    def test_deactivating_account_invalidates_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            account = LedgerAccount.objects.get(tenant=self.tenant, code="5000")
+            account.is_active = False
+            account.save(update_fields=["is_active"])
+
+        # The next request loads the tenant with the bumped chart version.
+        self.tenant = Tenant.objects.get(pk=self.tenant.pk)
+        with self.assertRaisesMessage(ValueError, "Account 5000 is inactive."):
+            self._post_sale()
+
+    def test_queryset_update_invalidates_cache(self):
+        LedgerAccount.objects.filter(tenant=self.tenant, code="5000").update(is_active=False)
+
+        self.tenant = Tenant.objects.get(pk=self.tenant.pk)
+        with self.assertRaisesMessage(ValueError, "Account 5000 is inactive."):
+            self._post_sale()
+
+    def test_unknown_account_code_is_rejected(self):
+        with self.assertRaisesMessage(ValueError, "Account 9999 does not exist."):
+            post_journal_entry(
+                tenant=self.tenant,
+                reference_type="adjustment",
+                lines=[
+                    {"account_code": "9999", "debit": Decimal("10.00")},
+                    {"account_code": "1000", "credit": Decimal("10.00")},
+                ],
+            )
+
+
+class BulkJournalPostingTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Tenant Bulk", slug="tenant-bulk")
+        self.store = Store.objects.create(tenant=self.tenant, name="Bulk Store")
+        self.branch = Branch.objects.create(store=self.store, name="Bulk Branch")
+        self.other_tenant = Tenant.objects.create(name="Tenant Other", slug="tenant-other")
+        self.other_store = Store.objects.create(tenant=self.other_tenant, name="Other Store")
+
+    def _spec(self, amount, **overrides):
+        spec = {
+            "store": self.store,
+            "branch": self.branch,
+            "reference_type": "adjustment",
+            "reference_id": f"OPEN-{amount}",
+            "lines": [
+                {"account_code": "1000", "debit": amount},
+                {"account_code": "3000", "credit": amount},
+            ],
+        }
+        spec.update(overrides)
+        return spec
+
+    def test_posts_all_entries_and_lines(self):
+        results = post_journal_entries(
+            tenant=self.tenant,
+            entries=[
+                self._spec(Decimal("100.00")),
+                self._spec(Decimal("0.00")),
+                self._spec(Decimal("250.00"), store=self.store.id, branch=self.branch.id),
+            ],
+        )
+
+        self.assertIsNone(results[1])
+        self.assertEqual(JournalEntry.objects.filter(tenant=self.tenant).count(), 2)
+        self.assertEqual(JournalLine.objects.filter(journal_entry__tenant=self.tenant).count(), 4)
+        self.assertEqual(results[2].lines.aggregate(total=Sum("debit"))["total"], Decimal("250.00"))
+
+    def test_lines_carry_entry_scope_with_store_from_branch(self):
+        single = post_journal_entry(
+            tenant=self.tenant,
+            branch=self.branch,
+            reference_type="adjustment",
+            entry_date=date(2026, 1, 5),
+            lines=self._spec(Decimal("10.00"))["lines"],
+        )
+        bulk = post_journal_entries(tenant=self.tenant, entries=[self._spec(Decimal("20.00"), store=None)])[0]
+
+        for entry in (single, bulk):
+            self.assertIsNone(entry.store_id)
+            scope = set(entry.lines.values_list("tenant_id", "store_id", "branch_id", "entry_date"))
+            self.assertEqual(scope, {(self.tenant.id, self.store.id, self.branch.id, entry.entry_date)})
+
+    def test_unbalanced_entry_rejects_whole_batch(self):
+        unbalanced = self._spec(Decimal("100.00"))
+        unbalanced["lines"][1]["credit"] = Decimal("90.00")
+
+        with self.assertRaisesMessage(ValueError, "Entry 1: Journal entry is not balanced."):
+            post_journal_entries(tenant=self.tenant, entries=[self._spec(Decimal("50.00")), unbalanced])
+        self.assertFalse(JournalEntry.objects.filter(tenant=self.tenant).exists())
+
+    def test_store_from_another_tenant_is_rejected(self):
+        with self.assertRaisesMessage(ValueError, "Entry 0: store must belong to the selected tenant."):
+            post_journal_entries(
+                tenant=self.tenant,
+                entries=[self._spec(Decimal("10.00"), store=self.other_store, branch=None)],
+            )
+
+
+class IdempotentJournalPostingTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Tenant Retry", slug="tenant-retry")
+        self.store = Store.objects.create(tenant=self.tenant, name="Retry Store")
+        self.branch = Branch.objects.create(store=self.store, name="Retry Branch")
+
+    def _sale(self, reference_id="INV-7"):
+        return record_sale_entry(
+            tenant=self.tenant,
+            sale_total=Decimal("500.00"),
+            paid_amount=Decimal("500.00"),
+            unpaid_amount=Decimal("0.00"),
+            cogs_total=Decimal("200.00"),
+            store=self.store,
+            branch=self.branch,
+            reference_id=reference_id,
+        )
+
+    def test_retried_sale_returns_existing_entry(self):
+        first = self._sale()
+        second = self._sale()
+
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(first.idempotency_key, "sale:INV-7")
+        self.assertEqual(JournalEntry.objects.filter(tenant=self.tenant).count(), 1)
+        cash = LedgerDailyBalance.objects.get(tenant=self.tenant, account__code="1000")
+        self.assertEqual(cash.debit, Decimal("500.00"))
+
+    def test_same_reference_for_another_type_posts_separately(self):
+        sale = self._sale()
+        payment = record_customer_payment_entry(
+            tenant=self.tenant,
+            amount=Decimal("50.00"),
+            store=self.store,
+            branch=self.branch,
+            reference_id="INV-7",
+        )
+
+        self.assertNotEqual(sale.id, payment.id)
+
+    def test_non_idempotent_posting_keeps_duplicates(self):
+        for _ in range(2):
+            post_journal_entry(
+                tenant=self.tenant,
+                reference_type="adjustment",
+                reference_id="ADJ-1",
+                lines=[
+                    {"account_code": "1000", "debit": Decimal("10.00")},
+                    {"account_code": "3000", "credit": Decimal("10.00")},
+                ],
+            )
+
+        self.assertEqual(JournalEntry.objects.filter(tenant=self.tenant, reference_id="ADJ-1").count(), 2)
+
+    def test_reprocessed_batch_skips_posted_keys(self):
+        def spec(reference_id):
+            return {
+                "reference_type": "adjustment",
+                "reference_id": reference_id,
+                "idempotent": True,
+                "lines": [
+                    {"account_code": "1000", "debit": Decimal("10.00")},
+                    {"account_code": "3000", "credit": Decimal("10.00")},
+                ],
+            }
+
+        first = post_journal_entries(tenant=self.tenant, entries=[spec("A-1")])
+        results = post_journal_entries(tenant=self.tenant, entries=[spec("A-1"), spec("A-2"), spec("A-2")])
+
+        self.assertEqual(results[0].id, first[0].id)
+        self.assertEqual(results[1].id, results[2].id)
+        self.assertEqual(JournalEntry.objects.filter(tenant=self.tenant).count(), 2)
+        self.assertEqual(JournalLine.objects.filter(journal_entry__tenant=self.tenant).count(), 4)
+
+
+class SaleSummaryPostingTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Tenant Summary", slug="tenant-summary", ledger_posting_mode="daily_summary")
+        self.store = Store.objects.create(tenant=self.tenant, name="Summary Store")
+        self.branch = Branch.objects.create(store=self.store, name="Summary Branch")
+        self.other_branch = Branch.objects.create(store=self.store, name="Summary Branch 2")
+
+    def _sale(self, reference_id, branch=None, total=Decimal("100.00"), paid=Decimal("100.00")):
+        return record_sale_entry(
+            tenant=self.tenant,
+            sale_total=total,
+            paid_amount=paid,
+            unpaid_amount=total - paid,
+            cogs_total=Decimal("40.00"),
+            store=self.store,
+            branch=branch or self.branch,
+            reference_id=reference_id,
+        )
+
+    def test_sales_are_staged_and_posted_per_branch_and_day(self):
+        self._sale("1001")
+        self._sale("1002", paid=Decimal("60.00"))
+        self._sale("1002")
+        self._sale("1003", branch=self.other_branch)
+
+        self.assertEqual(SaleLedgerStaging.objects.filter(tenant=self.tenant).count(), 3)
+        self.assertFalse(JournalEntry.objects.filter(tenant=self.tenant).exists())
+        self.assertEqual(post_sale_summaries(tenant=self.tenant), (0, []))
+
+        posted, errors = post_sale_summaries(tenant=self.tenant, through=date.today())
+
+        self.assertEqual((posted, errors), (2, []))
+        entry = JournalEntry.objects.get(tenant=self.tenant, branch=self.branch)
+        self.assertEqual(entry.staged_sales.count(), 2)
+        balances = {row["code"]: row["balance"] for row in balances_as_of(self.tenant, branch=self.branch)}
+        self.assertEqual(balances["4000"], Decimal("200.00"))
+        self.assertEqual(balances["1100"], Decimal("40.00"))
+        self.assertEqual(balances["5000"], Decimal("80.00"))
+        self.assertEqual(post_sale_summaries(tenant=self.tenant, through=date.today()), (0, []))
+
+    def test_batch_staging_skips_replayed_references(self):
+        sale = {
+            "sale_total": Decimal("100.00"),
+            "paid_amount": Decimal("100.00"),
+            "unpaid_amount": Decimal("0.00"),
+            "cogs_total": Decimal("40.00"),
+            "store": self.store,
+            "branch": self.branch,
+            "business_date": date.today(),
+        }
+        self._sale("1001")
+        record_sale_entries(tenant=self.tenant, sales=[{**sale, "reference_id": "1001"}, {**sale, "reference_id": "1002"}, {**sale, "reference_id": "1002"}])
+
+        self.assertEqual(
+            sorted(SaleLedgerStaging.objects.filter(tenant=self.tenant).values_list("reference_id", flat=True)),
+            ["1001", "1002"],
+        )
+
+    def test_staged_sales_reconcile_as_posted(self):
+        customer = Customer.objects.create(tenant=self.tenant, name="Summary Customer")
+        sale = SalesDetails.objects.create(tenant=self.tenant, branch=self.branch, customer=customer, total_amount=Decimal("100.00"))
+        self._sale(sale.bill_number)
+
+        result = reconcile_tenant(self.tenant.id, kinds=["sale"])
+
+        self.assertEqual((result["missing"], result["mismatched"]), (0, 0))
+
+
+class LedgerDailyBalanceTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Tenant Rollup", slug="tenant-rollup")
+        self.store = Store.objects.create(tenant=self.tenant, name="Rollup Store")
+        self.branch = Branch.objects.create(store=self.store, name="Rollup Branch")
+
+    def test_rollups_match_journal_line_balances(self):
+        for reference_id in ("INV-1", "INV-2"):
+            record_sale_entry(
+                tenant=self.tenant,
+                sale_total=Decimal("300.00"),
+                paid_amount=Decimal("200.00"),
+                unpaid_amount=Decimal("100.00"),
+                cogs_total=Decimal("120.00"),
+                store=self.store,
+                branch=self.branch,
+                reference_id=reference_id,
+            )
+        post_journal_entries(
+            tenant=self.tenant,
+            entries=[
+                {
+                    "store": self.store,
+                    "reference_type": "expense",
+                    "lines": [
+                        {"account_code": "6100", "debit": Decimal("40.00")},
+                        {"account_code": "1000", "credit": Decimal("40.00")},
+                    ],
+                }
+            ],
+        )
+
+        rollups = LedgerDailyBalance.objects.filter(tenant=self.tenant)
+        lines = JournalLine.objects.filter(journal_entry__tenant=self.tenant)
+        self.assertEqual(account_balances(rollups), account_balances(lines))
+        self.assertEqual(rollups.filter(branch=self.branch, account__code="1000").count(), 1)
+
+    def test_concurrent_first_postings_share_one_rollup_row(self):
+        def expense(amount):
+            post_journal_entry(
+                tenant=self.tenant,
+                store=self.store,
+                branch=self.branch,
+                reference_type="expense",
+                entry_date=date(2026, 9, 1),
+                lines=[
+                    {"account_code": "6100", "debit": amount},
+                    {"account_code": "1000", "credit": amount},
+                ],
+            )
+
+        expense(Decimal("40.00"))
+        # The second posting's lookup misses the rows, as if the first had not committed yet.
+        with mock.patch.object(LedgerDailyBalance.objects, "select_for_update", return_value=LedgerDailyBalance.objects.none()):
+            expense(Decimal("15.00"))
+
+        rollups = LedgerDailyBalance.objects.filter(tenant=self.tenant, account__code="6100")
+        self.assertEqual([row.debit for row in rollups], [Decimal("55.00")])
+
+
+class AccountingPeriodCloseTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Tenant Close", slug="tenant-close")
+        self.store = Store.objects.create(tenant=self.tenant, name="Close Store")
+        self.branch = Branch.objects.create(store=self.store, name="Close Branch")
+
+    def _expense(self, amount, entry_date):
+        return post_journal_entry(
+            tenant=self.tenant,
+            store=self.store,
+            branch=self.branch,
+            reference_type="expense",
+            entry_date=entry_date,
+            lines=[
+                {"account_code": "6100", "debit": amount},
+                {"account_code": "1000", "credit": amount},
+            ],
+        )
+
+    def test_balances_start_from_snapshot_and_add_later_postings(self):
+        self._expense(Decimal("100.00"), date(2026, 8, 10))
+        self._expense(Decimal("50.00"), date(2026, 9, 5))
+        close_accounting_period(tenant=self.tenant, end_date=date(2026, 8, 31))
+        period = close_accounting_period(tenant=self.tenant, end_date=date(2026, 9, 30))
+        self._expense(Decimal("25.00"), date(2026, 10, 2))
+
+        self.assertEqual(period.start_date, date(2026, 9, 1))
+        cash = {row["code"]: row for row in balances_as_of(self.tenant, branch=self.branch)}["1000"]
+        self.assertEqual(cash["balance"], Decimal("-175.00"))
+        september = {row["code"]: row for row in balances_as_of(self.tenant, as_of=date(2026, 9, 30))}["1000"]
+        self.assertEqual(september["balance"], Decimal("-150.00"))
+
+    def test_closed_period_rejects_late_postings(self):
+        close_accounting_period(tenant=self.tenant, end_date=date(2026, 8, 31))
+
+        with self.assertRaisesMessage(ValueError, "The accounting period through 2026-08-31 is closed."):
+            self._expense(Decimal("10.00"), date(2026, 8, 15))
+        with self.assertRaises(ValueError):
+            close_accounting_period(tenant=self.tenant, end_date=date(2026, 8, 20))
+
+
+@skipUnlessDBFeature("has_select_for_update")
+class ConcurrentPostingTests(TransactionTestCase):
+    serialized_rollback = True
+
+    def test_posts_for_one_tenant_do_not_wait_for_each_other(self):
+        tenant = Tenant.objects.create(name="Tenant Posts", slug="tenant-posts")
+        store = Store.objects.create(tenant=tenant, name="Posts Store")
+        branch = Branch.objects.create(store=store, name="Posts Branch")
+        ensure_default_accounts(tenant)
+        posted = threading.Event()
+        release = threading.Event()
+
+        def expense(entry_date, hold=False):
+            try:
+                with transaction.atomic():
+                    post_journal_entry(
+                        tenant=tenant,
+                        store=store,
+                        branch=branch,
+                        reference_type="expense",
+                        entry_date=entry_date,
+                        lines=[
+                            {"account_code": "6100", "debit": Decimal("10.00")},
+                            {"account_code": "1000", "credit": Decimal("10.00")},
+                        ],
+                    )
+                    if hold:
+                        posted.set()
+                        release.wait(10)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            held = pool.submit(expense, date(2026, 9, 1), hold=True)
+            self.assertTrue(posted.wait(10))
+            try:
+                pool.submit(expense, date(2026, 9, 2)).result(timeout=5)
+            finally:
+                release.set()
+            held.result()
+
+        self.assertEqual(JournalEntry.objects.filter(tenant=tenant).count(), 2)
+
+
+class LedgerReconciliationTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Tenant Recon", slug="tenant-recon")
+        self.store = Store.objects.create(tenant=self.tenant, name="Recon Store")
+        self.branch = Branch.objects.create(store=self.store, name="Recon Branch")
+        self.customer = Customer.objects.create(tenant=self.tenant, name="Recon Customer")
+
+    def test_missing_expense_is_reported_and_rebuilt(self):
+        posted = Expense.objects.create(tenant=self.tenant, branch=self.branch, date_created=date.today(), category="Rent", amount=Decimal("80.00"))
+        record_expense_entry(tenant=self.tenant, amount=posted.amount, store=self.store, branch=self.branch, reference_id=posted.id)
+        missing = Expense.objects.create(tenant=self.tenant, branch=self.branch, date_created=date.today(), category="Power", amount=Decimal("45.00"))
+
+        result = reconcile_tenant(self.tenant.id, kinds=["expense"], chunk_size=1)
+        self.assertEqual((result["checked"], result["missing"], result["mismatched"]), (2, 1, 0))
+        self.assertEqual(result["drift"][0]["reference_id"], str(missing.id))
+
+        result = reconcile_tenant(self.tenant.id, kinds=["expense"], rebuild=True)
+        self.assertEqual(result["rebuilt"], 1)
+        entry = JournalEntry.objects.get(tenant=self.tenant, reference_type="expense", reference_id=str(missing.id))
+        self.assertEqual(entry.branch, self.branch)
+        self.assertEqual(reconcile_tenant(self.tenant.id, kinds=["expense"])["missing"], 0)
+
+    def test_returned_sale_drift_is_corrected(self):
+        sale = SalesDetails.objects.create(
+            tenant=self.tenant,
+            branch=self.branch,
+            customer=self.customer,
+            total_amount=Decimal("300.00"),
+            paid_amount=Decimal("300.00"),
+        )
+        record_sale_entry(
+            tenant=self.tenant,
+            sale_total=Decimal("300.00"),
+            paid_amount=Decimal("300.00"),
+            unpaid_amount=Decimal("0.00"),
+            cogs_total=Decimal("0.00"),
+            store=self.store,
+            branch=self.branch,
+            reference_id=sale.bill_number,
+        )
+        SalesDetails.objects.filter(pk=sale.pk).update(total_amount=Decimal("250.00"))
+
+        result = reconcile_tenant(self.tenant.id, kinds=["sale"], rebuild=True)
+        self.assertEqual((result["mismatched"], result["rebuilt"]), (1, 1))
+        self.assertEqual(result["drift"][0]["posted"], Decimal("300.00"))
+
+        balances = {row["code"]: row["balance"] for row in balances_as_of(self.tenant)}
+        self.assertEqual(balances["4000"], Decimal("250.00"))
+        self.assertEqual(balances["1100"], Decimal("-50.00"))
+        self.assertEqual(reconcile_tenant(self.tenant.id, kinds=["sale"])["mismatched"], 0)
+
+    def test_command_prints_tenant_summary(self):
+        Expense.objects.create(tenant=self.tenant, branch=self.branch, date_created=date.today(), category="Rent", amount=Decimal("10.00"))
+        out = StringIO()
+
+        call_command("reconcile_ledger", "--tenant", self.tenant.slug, stdout=out)
+
+        self.assertIn(f"{self.tenant.slug}: checked 1, missing 1, mismatched 0", out.getvalue())
+
+
+class FinancialReportEngineTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Tenant Engine", slug="tenant-engine")
+        self.store = Store.objects.create(tenant=self.tenant, name="Engine Store")
+        self.branch = Branch.objects.create(store=self.store, name="Engine Branch")
+        customer = Customer.objects.create(tenant=self.tenant, name="Engine Customer")
+        sale = SalesDetails.objects.create(
+            tenant=self.tenant,
+            branch=self.branch,
+            customer=customer,
+            total_amount=Decimal("500.00"),
+            paid_amount=Decimal("300.00"),
+            unpaid_amount=Decimal("200.00"),
+        )
+        record_sale_entry(
+            tenant=self.tenant,
+            sale_total=Decimal("500.00"),
+            paid_amount=Decimal("300.00"),
+            unpaid_amount=Decimal("200.00"),
+            cogs_total=Decimal("150.00"),
+            store=self.store,
+            branch=self.branch,
+            reference_id=sale.bill_number,
+        )
+        record_purchase_entry(tenant=self.tenant, total_cost=Decimal("400.00"), store=self.store, branch=self.branch, reference_id="PRODUCT-1")
+        record_expense_entry(tenant=self.tenant, amount=Decimal("60.00"), store=self.store, branch=self.branch, reference_id="1")
+
+    def test_report_is_built_in_two_grouped_queries(self):
+        with self.assertNumQueries(2), CaptureQueriesContext(connection) as queries:
+            report = build_financial_report(
+                LedgerDailyBalance.objects.filter(tenant=self.tenant),
+                SalesDetails.objects.filter(tenant=self.tenant),
+            )
+
+        self.assertFalse([q["sql"] for q in queries.captured_queries if "store_journal" in q["sql"]])
+
+        today = timezone.localdate()
+        self.assertEqual((report.sales_total, report.paid_total, report.unpaid_total), (Decimal("500.00"), Decimal("300.00"), Decimal("200.00")))
+        self.assertEqual(report.purchase_total, Decimal("400.00"))
+        self.assertEqual(report.gross_profit, Decimal("350.00"))
+        self.assertEqual(report.net_profit, Decimal("290.00"))
+        self.assertEqual(report.balance("1200"), Decimal("250.00"))
+        self.assertEqual(
+            report.daily[today],
+            {"sales": Decimal("500.00"), "purchase": Decimal("400.00"), "income": Decimal("0.00"), "cogs": Decimal("150.00"), "expense": Decimal("60.00")},
+        )
+        self.assertEqual(report.series("expense", [today, date(2000, 1, 1)]), [60.0, 0.0])
+
+
+class BillNumberAllocationTests(TestCase):
+    def setUp(self):
+        models._BILL_NUMBER_BLOCKS.clear()
+        self.tenant = Tenant.objects.create(name="Bill Tenant", slug="bill-tenant")
+        self.store = Store.objects.create(tenant=self.tenant, name="Main Store", code="KBL")
+        self.branch_a = Branch.objects.create(store=self.store, name="Branch A", code="A")
+        self.branch_b = Branch.objects.create(store=self.store, name="Branch B")
+
+    def tearDown(self):
+        models._BILL_NUMBER_BLOCKS.clear()
+
+    def test_tenant_sequence_is_the_default(self):
+        numbers = [BillNumberTracker.get_next_bill_number(self.tenant, self.branch_a) for _ in range(2)]
+        self.assertEqual(numbers, ["1001", "1002"])
+
+    @override_settings(BILL_NUMBER_SCOPE="branch")
+    def test_branches_keep_prefixed_sequences(self):
+        customer = Customer.objects.create(tenant=self.tenant, name="Walk-in")
+        sale = SalesDetails.objects.create(tenant=self.tenant, branch=self.branch_a, customer=customer)
+        self.assertEqual(sale.bill_number, "KBL-A-1001")
+        self.assertEqual(BillNumberTracker.get_next_bill_number(self.tenant, self.branch_b), f"KBL-B{self.branch_b.pk}-1001")
+        self.assertEqual(BillNumberTracker.get_next_bill_number(self.tenant, self.branch_a), "KBL-A-1002")
+        with override_settings(BILL_NUMBER_SCOPE="store"):
+            self.assertEqual(BillNumberTracker.get_next_bill_number(self.tenant, self.branch_b), "KBL-1001")
+
+    @override_settings(BILL_NUMBER_BLOCK_SIZE=5)
+    def test_blocks_are_served_from_memory_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(BillNumberTracker.get_next_bill_number(self.tenant), "1001")
+        self.assertEqual(BillNumberTracker.objects.get(tenant=self.tenant).current_number, 1006)
+
+        with self.assertNumQueries(0):
+            numbers = [BillNumberTracker.get_next_bill_number(self.tenant) for _ in range(4)]
+        self.assertEqual(numbers, ["1002", "1003", "1004", "1005"])
+
+        with self.captureOnCommitCallbacks(execute=False):
+            self.assertEqual(BillNumberTracker.get_next_bill_number(self.tenant), "1006")
+        self.assertEqual(BillNumberTracker.get_next_bill_number(self.tenant), "1011")
+
+    def test_checkout_takes_its_number_before_the_sale_transaction(self):
+        customer = Customer.objects.create(tenant=self.tenant, name="Walk-in")
+        sale_args = {"tenant": self.tenant, "branch": self.branch_a, "user": None, "customer": customer, "lines": []}
+
+        with self.assertRaises(ValueError):
+            checkout.complete_sale(paid_amount=Decimal("1.00"), **sale_args)
+
+        self.assertEqual(BillNumberTracker.objects.get(tenant=self.tenant).current_number, 1002)
+        self.assertEqual(checkout.complete_sale(paid_amount=Decimal("0.00"), **sale_args).bill_number, "1002")
+
+
+class SalesBusinessDateTests(TestCase):
+    def test_business_date_is_local_and_drives_sales_filter(self):
+        tenant = Tenant.objects.create(name="Business Date Tenant", slug="business-date-tenant")
+        store = Store.objects.create(tenant=tenant, name="Main Store")
+        branch = Branch.objects.create(store=store, name="Branch 1")
+        customer = Customer.objects.create(tenant=tenant, name="Walk-in")
+        today = timezone.localdate()
+        current = SalesDetails.objects.create(tenant=tenant, branch=branch, customer=customer, total_amount=Decimal("10.00"))
+        earlier = SalesDetails.objects.create(
+            tenant=tenant,
+            branch=branch,
+            customer=customer,
+            total_amount=Decimal("20.00"),
+            business_date=today - timedelta(days=1),
+        )
+
+        self.assertEqual(current.business_date, today)
+        jalali_today = jdatetime.date.fromgregorian(date=today).strftime("%Y-%m-%d")
+        sales = SalesDetails.objects.filter(tenant=tenant)
+        filtered = SalesDetailsFilter({"from_date": jalali_today, "to_date": jalali_today}, queryset=sales).qs
+        self.assertEqual(list(filtered), [current])
+        filtered = SalesDetailsFilter({"to_date": jalali_today}, queryset=sales).qs
+        self.assertCountEqual(filtered, [current, earlier])
+
+
+class JalaliCalendarTests(TestCase):
+    def test_calendar_row_buckets_weeks_months_and_fiscal_periods(self):
+        row = calendar_row(date(2026, 3, 21), fiscal_start_month=10)
+        self.assertEqual((row["jalali_year"], row["jalali_month"], row["jalali_day"]), (1405, 1, 1))
+        self.assertEqual(row["month_key"], 140501)
+        self.assertEqual((row["fiscal_year"], row["fiscal_period"]), (1405, 4))
+        row = calendar_row(date(2025, 12, 22), fiscal_start_month=10)
+        self.assertEqual((row["month_key"], row["fiscal_year"], row["fiscal_period"]), (140410, 1405, 1))
+        self.assertTrue(JalaliCalendar.objects.filter(date=date(2026, 3, 21), month_key=140501).exists())
+
+    def test_summary_groups_rollups_by_jalali_month(self):
+        tenant = Tenant.objects.create(name="Jalali Tenant", slug="jalali-tenant")
+        store = Store.objects.create(tenant=tenant, name="Main Store")
+        branch = Branch.objects.create(store=store, name="Branch 1")
+        add_daily_totals(tenant.id, branch.id, date(2026, 3, 20), sales_total=Decimal("10.00"), bill_count=1)
+        add_daily_totals(tenant.id, branch.id, date(2026, 3, 21), sales_total=Decimal("20.00"), bill_count=1)
+        add_daily_totals(tenant.id, branch.id, date(2026, 4, 1), sales_total=Decimal("5.00"), bill_count=1)
+        add_daily_totals(tenant.id, branch.id, date(2045, 3, 21), sales_total=Decimal("7.00"), bill_count=1)
+
+        data = _summary_report_data(tenant, branch, None, None)
+
+        self.assertEqual(data["month_keys"], [140412, 140501, 142401])
+        self.assertEqual(data["month_sales"], [10.0, 25.0, 7.0])
+        self.assertTrue(JalaliCalendar.objects.filter(date=date(2045, 3, 21)).exists())
+        self.assertTrue(month_label(140501).endswith("1405"))
+
+
+class ReportCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name="Tenant Cache", slug="tenant-cache")
+        self.builds = []
+
+    def tearDown(self):
+        cache.clear()
+
+    def _report(self, **params):
+        return cached_report("test", self.tenant, params, lambda: self.builds.append(params) or len(self.builds))
+
+    def test_result_is_reused_until_ledger_version_moves(self):
+        self.assertEqual(self._report(scope="tenant"), 1)
+        self.assertEqual(self._report(scope="tenant"), 1)
+        self.assertEqual(self._report(scope="branch"), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record_expense_entry(tenant=self.tenant, amount=Decimal("5.00"), reference_id="1")
+
+        self.tenant.refresh_from_db()
+        self.assertEqual(self.tenant.ledger_version, 1)
+        self.assertEqual(self._report(scope="tenant"), 3)
+        self.assertEqual(self._report(scope="tenant"), 3)
+
+    def test_identical_misses_share_one_build(self):
+        started = threading.Event()
+        release = threading.Event()
+        results = []
+
+        def slow_build():
+            self.builds.append("slow")
+            started.set()
+            release.wait(5)
+            return "report"
+
+        def request():
+            results.append(single_flight("report:single-flight", slow_build, 60))
+
+        first = threading.Thread(target=request)
+        first.start()
+        started.wait(5)
+        second = threading.Thread(target=request)
+        second.start()
+        release.set()
+        first.join(5)
+        second.join(5)
+
+        self.assertEqual(results, ["report", "report"])
+        self.assertEqual(self.builds, ["slow"])
+        self.assertIsNone(cache.get("report:single-flight:lock"))
+
+
+class ConcurrentReportTests(TransactionTestCase):
+    serialized_rollback = True
+
+    def _tasks(self):
+        return {
+            "thread": lambda: threading.current_thread().name,
+            "language": translation.get_language,
+            "tenants": lambda: Tenant.objects.filter(slug="tenant-workers").count(),
+        }
+
+    def test_tasks_run_in_order_unless_workers_are_configured(self):
+        results = run_concurrently(**self._tasks())
+        self.assertEqual(results["thread"], threading.current_thread().name)
+
+    @override_settings(REPORT_QUERY_WORKERS=2)
+    def test_tasks_share_the_worker_pool_outside_transactions(self):
+        Tenant.objects.create(name="Tenant Workers", slug="tenant-workers")
+        with transaction.atomic():
+            self.assertEqual(run_concurrently(**self._tasks())["thread"], threading.current_thread().name)
+
+        with translation.override("fa"):
+            results = run_concurrently(**self._tasks())
+
+        self.assertTrue(results["thread"].startswith("report-query"))
+        self.assertEqual(results["language"], "fa")
+        self.assertEqual(results["tenants"], 1)
+
+
 class FinancialReportScopeTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = Client()
         self.user = User.objects.create_user(username="report_user", password="pass123")
         self.tenant = Tenant.objects.create(name="Tenant C", slug="tenant-c")
@@ -101,6 +854,80 @@ class FinancialReportScopeTests(TestCase):
         self.assertEqual(response.context["scope_branch"].id, self.branch_a.id)
         self.assertEqual(len(response.context["transactions"]), 1)
 
+    def test_exports_stream_scoped_rows_with_jalali_dates(self):
+        customer = Customer.objects.create(tenant=self.tenant, name="Export Customer")
+        for branch, amount in ((self.branch_a, "50.00"), (self.branch_b, "70.00")):
+            SalesDetails.objects.create(tenant=self.tenant, branch=branch, customer=customer, total_amount=Decimal(amount), unpaid_amount=Decimal(amount))
+
+        response = self.client.get(
+            reverse("export-report", args=["journal"]),
+            {"scope": "branch", "branch_id": self.branch_b.id, "jalali": "1"},
+        )
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(b"".join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0][:2], ["entry_date", "entry_date (jalali)"])
+        self.assertEqual({row[6] for row in rows[1:]}, {self.branch_a.name})
+        self.assertEqual(rows[1][1], jdatetime.date.fromgregorian(date=timezone.localdate()).strftime("%Y-%m-%d"))
+
+        response = self.client.get(reverse("export-report", args=["customers"]))
+        rows = list(csv.reader(b"".join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[1][1:4], ["Export Customer", "0", "1"])
+        self.assertEqual([Decimal(value) for value in rows[1][4:]], [Decimal("50.00"), Decimal("0.00"), Decimal("50.00")])
+        self.assertEqual(self.client.get(reverse("export-report", args=["unknown"])).status_code, 404)
+
+        with mock.patch("store.views.XLSX_AVAILABLE", False):
+            response = self.client.get(reverse("export-report", args=["customers"]), {"format": "xlsx"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b"openpyxl", response.content)
+
+
+class GeneralLedgerViewTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username="ledger_owner", password="pass123")
+        self.tenant = Tenant.objects.create(name="Tenant Ledger", slug="tenant-ledger")
+        self.store = Store.objects.create(tenant=self.tenant, name="Ledger Store")
+        self.branch = Branch.objects.create(store=self.store, name="Ledger Branch")
+        TenantMember.objects.create(tenant=self.tenant, user=self.user, role="owner")
+        BranchMember.objects.create(branch=self.branch, user=self.user, role="manager")
+
+        for day, amount in ((1, "100.00"), (1, "40.00"), (2, "60.00"), (3, "10.00"), (3, "5.00")):
+            post_journal_entry(
+                tenant=self.tenant,
+                store=self.store,
+                branch=self.branch,
+                reference_type="other_income",
+                entry_date=date(2026, 9, day),
+                lines=[
+                    {"account_code": "1000", "debit": Decimal(amount)},
+                    {"account_code": "4100", "credit": Decimal(amount)},
+                ],
+            )
+        self.cash = LedgerAccount.objects.get(tenant=self.tenant, code="1000")
+
+        self.client.force_login(self.user)
+        session = self.client.session
+        session["active_tenant_id"] = self.tenant.id
+        session["active_branch_id"] = self.branch.id
+        session.save()
+
+    @mock.patch("store.views.LEDGER_PAGE_SIZE", 2)
+    def test_running_balance_continues_across_keyset_pages(self):
+        url = reverse("general-ledger", args=[self.cash.id])
+        balances = []
+        params = {"scope": "branch", "branch_id": self.branch.id}
+        while True:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            balances.extend(line.running_balance for line in response.context["lines"])
+            if not response.context["next_page_query"]:
+                break
+            last_line = response.context["lines"][-1]
+            params = {**params, "after_date": last_line.journal_entry.entry_date.isoformat(), "after_id": last_line.id}
+
+        expected = [Decimal(value) for value in ("100.00", "140.00", "200.00", "210.00", "215.00")]
+        self.assertEqual(balances, expected)
+
 
 class OnboardingMembershipTests(TestCase):
     def setUp(self):
@@ -575,15 +1402,15 @@ class CustomerCarryForwardBillingTests(TestCase):
         session["active_branch_id"] = self.branch.id
         session["active_store_id"] = self.store.id
         session["customer"] = {str(self.customer.id): self.customer.name}
-        session["cart"] = {
-            str(self.product.id): {
-                "product_id": self.product.id,
-                "item_quantity": 0,
-                "package_quantity": 3,
-                "item_price": "150.00",
-                "package_price": "1500.00",
-            }
-        }
+        self.cart = Cart.objects.create(tenant=self.tenant, branch=self.branch, user=self.user)
+        CartLine.objects.create(
+            cart=self.cart,
+            product=self.product,
+            package_quantity=3,
+            item_price=Decimal("150.00"),
+            package_price=Decimal("1500.00"),
+        )
+        session["cart_id"] = str(self.cart.id)
         session.save()
 
     def test_cart_checkout_rolls_previous_unpaid_into_new_bill(self):
@@ -603,12 +1430,283 @@ class CustomerCarryForwardBillingTests(TestCase):
         self.assertEqual(new_sale.payable_amount, Decimal("5500.00"))
         self.assertEqual(new_sale.paid_amount, Decimal("3000.00"))
         self.assertEqual(new_sale.unpaid_amount, Decimal("2500.00"))
+        self.assertNotIn("cart_id", self.client.session)
+        self.assertFalse(Cart.objects.filter(pk=self.cart.pk).exists())
 
         summary = customer_account_summary(self.customer, self.tenant, branch=self.branch)
         self.assertEqual(summary["total_amount"], Decimal("7500.00"))
         self.assertEqual(summary["total_paid"], Decimal("5000.00"))
         self.assertEqual(summary["total_due"], Decimal("2500.00"))
 
+    @override_settings(LEDGER_DEFERRED_POSTING=True)
+    def test_deferred_checkout_posts_ledger_through_outbox(self):
+        response = self.client.post(reverse("cart-view"), {"paid": "3000.00"})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(JournalEntry.objects.filter(tenant=self.tenant).exists())
+        self.assertEqual(
+            set(LedgerOutbox.objects.filter(tenant=self.tenant).values_list("reference_type", flat=True)),
+            {"sale", "payment"},
+        )
+
+        self.assertEqual(drain_ledger_outbox(), 2)
+        self.assertEqual(drain_ledger_outbox(), 0)
+
+        entries = JournalEntry.objects.filter(tenant=self.tenant)
+        self.assertEqual(entries.count(), 2)
+        self.assertFalse(LedgerOutbox.objects.filter(tenant=self.tenant).exclude(status="posted").exists())
+        lines = JournalLine.objects.filter(journal_entry__in=entries)
+        self.assertEqual(lines.aggregate(total=Sum("debit"))["total"], lines.aggregate(total=Sum("credit"))["total"])
+
+    def test_checkout_payment_and_income_keep_branch_daily_totals_in_sync(self):
+        call_command("backfill_branch_daily_totals", "--tenant", self.tenant.slug, stdout=StringIO())
+        self.client.post(reverse("cart-view"), {"paid": "3000.00"})
+        self.client.post(
+            reverse("create-payment", args=[self.customer.id]),
+            {"payment_amount": "500.00", "payment_method": "cash"},
+        )
+        self.client.post(
+            reverse("income"),
+            {"date_created": timezone.localdate().isoformat(), "source": "Rent", "amount": "200.00"},
+        )
+
+        totals = sum_totals(daily_totals(self.tenant, self.branch))
+        self.assertEqual(totals["sales_total"], Decimal("7500.00"))
+        self.assertEqual(totals["paid_total"], Decimal("5500.00"))
+        self.assertEqual(totals["unpaid_total"], Decimal("2000.00"))
+        self.assertEqual(totals["bill_count"], 2)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(_summary_report_data(self.tenant, self.branch, None, None)["total_customer"], 1)
+        self.assertFalse(any("store_salesdetails" in query["sql"] for query in queries))
+        self.assertEqual(totals["income_total"], Decimal("200.00"))
+
+        response = self.client.get(reverse("home"))
+        self.assertEqual(response.context["sales_details"]["total_sale"], Decimal("7500.00"))
+        self.assertEqual(response.context["sales_details"]["total_customer"], 1)
+
+        customers = list(daily_customers(self.tenant, self.branch).values_list("user_id", "customer_id", "business_date"))
+        call_command("backfill_branch_daily_totals", "--tenant", self.tenant.slug, stdout=StringIO())
+        self.assertEqual(sum_totals(daily_totals(self.tenant, self.branch)), totals)
+        self.assertCountEqual(daily_customers(self.tenant, self.branch).values_list("user_id", "customer_id", "business_date"), customers)
+
+    def test_branch_daily_totals_keep_one_row_per_key(self):
+        day = date(2026, 1, 1)
+        add_daily_totals(self.tenant.id, self.branch.id, day, income_total=Decimal("5.00"))
+        add_daily_totals(self.tenant.id, self.branch.id, day, income_total=Decimal("7.00"))
+        add_daily_totals(self.tenant.id, self.branch.id, day, self.user.id, sales_total=Decimal("1.00"))
+
+        self.assertEqual(BranchDailyTotals.objects.get(tenant=self.tenant, business_date=day, user=None).income_total, Decimal("12.00"))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BranchDailyTotals.objects.create(tenant=self.tenant, branch=self.branch, business_date=day)
+        self.assertEqual(BranchDailyTotals.objects.filter(tenant=self.tenant).count(), 2)
+
+    def test_checkout_feeds_sales_facts_and_pivot_report(self):
+        cache.clear()
+        self.client.post(reverse("cart-view"), {"paid": "3000.00"})
+
+        fact = SalesFact.objects.get(tenant=self.tenant)
+        self.assertEqual((fact.product_id, fact.category_id, fact.user_id), (self.product.id, self.category.id, self.user.id))
+        self.assertEqual((fact.quantity, fact.revenue, fact.line_count), (30, Decimal("4500.00"), 1))
+
+        response = self.client.get(reverse("sales-pivot"), {"rows": "category", "columns": "cashier"})
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual(payload["total"], 4500.0)
+        self.assertEqual(payload["data"][0]["label"], self.category.name)
+        self.assertEqual(payload["data"][0]["values"], {str(self.user.id): 4500.0})
+        self.assertEqual(payload["headers"], [{"key": self.user.id, "label": self.user.username}])
+
+        response = self.client.get(reverse("sales-pivot"), {"rows": "product", "measure": "quantity", "category": self.category.id + 1})
+        self.assertEqual(response.json()["data"], [])
+        self.assertEqual(self.client.get(reverse("sales-pivot"), {"rows": "colour"}).status_code, 400)
+
+        call_command("backfill_sales_facts", "--tenant", self.tenant.slug, stdout=StringIO())
+        rebuilt = SalesFact.objects.get(tenant=self.tenant)
+        self.assertEqual((rebuilt.quantity, rebuilt.revenue, rebuilt.line_count), (30, Decimal("4500.00"), 1))
+
+    def test_checkout_api_completes_sale_in_one_request(self):
+        line = {"product_id": self.product.id, "package_quantity": 3, "item_quantity": 0, "package_price": "1500.00", "item_price": "150.00"}
+        url = reverse("checkout-api")
+
+        response = self.client.post(url, {"customer_id": self.customer.id, "lines": [{**line, "package_quantity": 11}]}, content_type="application/json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(SalesDetails.objects.filter(tenant=self.tenant).count(), 1)
+
+        response = self.client.post(url, {"customer_id": self.customer.id, "paid": "3000.00", "lines": [line]}, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        payload = response.json()
+        self.assertEqual((payload["total"], payload["payable"], payload["unpaid"]), ("4500.00", "5500.00", "2500.00"))
+        sale = SalesDetails.objects.get(tenant=self.tenant, bill_number=payload["bill_number"])
+        self.assertEqual(sale.sale_detail.get().package_qty, 3)
+        self.assertEqual(BranchStock.objects.get(branch=self.branch, product=self.product).stock, 70)
+        self.assertTrue(JournalEntry.objects.filter(tenant=self.tenant, reference_type="sale", reference_id=sale.bill_number).exists())
+        self.assertEqual(CartLine.objects.filter(cart=self.cart).count(), 1)
+
+        response = self.client.post(url, {"paid": "9999.00", "lines": [line]}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        sale_count = SalesDetails.objects.filter(tenant=self.tenant).count()
+        for paid in ("NaN", "sNaN", "Infinity", "-5", "abc"):
+            response = self.client.post(url, {"paid": paid, "lines": [line]}, content_type="application/json")
+            self.assertEqual((paid, response.status_code, response.json()["status"]), (paid, 400, "error"))
+        self.assertEqual(SalesDetails.objects.filter(tenant=self.tenant).count(), sale_count)
+        response = self.client.post(url, {"lines": [{**line, "product_id": 0}]}, content_type="application/json")
+        self.assertEqual(response.status_code, 404)
+
+    def test_held_cart_resumes_on_another_terminal(self):
+        other_terminal = Client()
+        other_terminal.force_login(self.user)
+        session = other_terminal.session
+        session["active_tenant_id"] = self.tenant.id
+        session["active_branch_id"] = self.branch.id
+        session.save()
+        line = {"product_id": self.product.id, "item_quantity": 2, "package_quantity": 0, "item_price": "150.00", "package_price": "1500.00"}
+
+        for backend in ("db", "cache"):
+            with self.subTest(backend=backend), override_settings(CART_STORE_BACKEND=backend):
+                cache.clear()
+                session = self.client.session
+                session["customer"] = {str(self.customer.id): self.customer.name}
+                session.save()
+                response = self.client.post(reverse("add-to-cart"), line, content_type="application/json")
+                self.assertEqual(response.json()["cart_length"], 1)
+                cart_id = self.client.session["cart_id"]
+                self.assertEqual(set(self.client.session.keys()) & {"cart", "cart_id"}, {"cart_id"})
+
+                response = self.client.post(reverse("hold-cart"), {"label": "Table 4"})
+                self.assertEqual(response.status_code, 302)
+                self.assertNotIn("cart_id", self.client.session)
+
+                response = other_terminal.get(reverse("cart-view"))
+                self.assertEqual([held["label"] for held in response.context["held_carts"]], ["Table 4"])
+                other_terminal.post(reverse("resume-cart", args=[cart_id]))
+                self.assertEqual(other_terminal.session["cart_id"], cart_id)
+                self.assertEqual(other_terminal.session["customer"], {str(self.customer.id): self.customer.name})
+                response = other_terminal.get(reverse("cart-view"))
+                self.assertEqual([row["item_quantity"] for row in response.context["cart_details"]], [2])
+                self.assertEqual(response.context["held_carts"], [])
+
+                response = self.client.post(reverse("resume-cart", args=[cart_id]))
+                self.assertNotIn("cart_id", self.client.session)
+
+    def test_cache_cart_changes_from_several_terminals_are_serialised(self):
+        cache.clear()
+        store = CacheCartStore()
+        cart_id = store.create(self.tenant.id, self.branch.id)
+        store.update(cart_id, status="held")
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            reopened = list(pool.map(lambda _: store.reopen(cart_id), range(8)))
+            list(pool.map(lambda product_id: store.put_line(cart_id, {"product_id": product_id}), range(1, 21)))
+
+        self.assertEqual(reopened.count(True), 1)
+        self.assertEqual(store.count(cart_id), 20)
+        self.assertEqual(store.held(self.tenant.id, self.branch.id), [])
+
+    def test_cache_cart_lock_waits_are_bounded_and_keep_foreign_locks(self):
+        cache.clear()
+        store = CacheCartStore()
+        cart_id = store.create(self.tenant.id, self.branch.id)
+        cache.set(f"cart:{cart_id}:lock", "other-terminal", 60)
+
+        with mock.patch("store.carts.CART_LOCK_WAIT", 0.05), self.assertRaises(CartLockTimeout):
+            store.update(cart_id, label="Table 9")
+
+        self.assertEqual(cache.get(f"cart:{cart_id}:lock"), "other-terminal")
+        self.assertEqual(store.get(cart_id)["label"], "")
+
+    def test_purge_carts_deletes_only_abandoned_carts(self):
+        old = timezone.now() - timedelta(days=2)
+        abandoned = Cart.objects.create(tenant=self.tenant, branch=self.branch)
+        busy = Cart.objects.create(tenant=self.tenant, branch=self.branch, status="held")
+        CartLine.objects.create(cart=busy, product=self.product, item_quantity=1)
+        Cart.objects.filter(pk__in=[abandoned.pk, busy.pk]).update(updated_at=old)
+
+        call_command("purge_carts", stdout=StringIO())
+
+        self.assertFalse(Cart.objects.filter(pk=abandoned.pk).exists())
+        self.assertTrue(Cart.objects.filter(pk=busy.pk).exists())
+        self.assertTrue(Cart.objects.filter(pk=self.cart.pk).exists())
+
+    def test_offline_batch_records_sales_once(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        line = {"product_id": self.product.id, "package_quantity": 3, "item_quantity": 0, "package_price": "1500.00", "item_price": "150.00"}
+        batch = {
+            "sales": [
+                {"key": "pos-1", "customer_id": self.customer.id, "paid": "1500.00", "business_date": yesterday.isoformat(), "lines": [line]},
+                {"key": "pos-2", "paid": "3000.00", "lines": [{**line, "package_quantity": 2}]},
+                {"key": "pos-3", "lines": [{**line, "package_quantity": 6}]},
+                {"key": "pos-1", "lines": [line]},
+                {"lines": [line]},
+            ]
+        }
+        url = reverse("offline-sales-api")
+
+        response = self.client.post(url, batch, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([row["status"] for row in results], ["created", "created", "error", "duplicate", "error"])
+        self.assertEqual(results[3]["bill_number"], results[0]["bill_number"])
+
+        first = SalesDetails.objects.get(tenant=self.tenant, client_key="pos-1")
+        self.assertEqual((first.business_date, first.total_amount, first.unpaid_amount), (yesterday, Decimal("4500.00"), Decimal("3000.00")))
+        self.assertEqual(first.sale_detail.get().package_qty, 3)
+        self.assertEqual(BranchStock.objects.get(branch=self.branch, product=self.product).stock, 50)
+        entry = JournalEntry.objects.get(tenant=self.tenant, reference_type="sale", reference_id=first.bill_number)
+        self.assertEqual(entry.entry_date, yesterday)
+        self.assertEqual(sum_totals(daily_totals(self.tenant, self.branch, yesterday, yesterday))["sales_total"], Decimal("4500.00"))
+        self.assertEqual(SalesFact.objects.filter(tenant=self.tenant).aggregate(total=Sum("quantity"))["total"], 50)
+
+        response = self.client.post(url, batch, content_type="application/json")
+        self.assertEqual([row["status"] for row in response.json()["results"]], ["duplicate", "duplicate", "error", "duplicate", "error"])
+        self.assertEqual(SalesDetails.objects.filter(tenant=self.tenant).count(), 3)
+        self.assertEqual(BranchStock.objects.get(branch=self.branch, product=self.product).stock, 50)
+
+    def test_offline_batch_rejects_only_the_malformed_documents(self):
+        line = {"product_id": self.product.id, "package_quantity": 1, "item_quantity": 0, "package_price": "1500.00", "item_price": "150.00"}
+        batch = {
+            "sales": [
+                {"key": "pos-bad", "business_date": "2024-13-45", "lines": [line]},
+                {"key": "pos-junk", "business_date": "yesterday", "lines": [line]},
+                {"key": "pos-nan", "paid": "NaN", "lines": [line]},
+                {"key": "pos-good", "lines": [line]},
+            ]
+        }
+
+        response = self.client.post(reverse("offline-sales-api"), batch, content_type="application/json")
+
+        results = response.json()["results"]
+        self.assertEqual([row["status"] for row in results], ["error", "error", "error", "created"])
+        self.assertEqual(results[0]["message"], "Invalid business date.")
+        self.assertTrue(SalesDetails.objects.filter(tenant=self.tenant, client_key="pos-good").exists())
+
+    def test_checkout_rejects_sale_when_stock_is_taken_concurrently(self):
+        take_branch_stock = checkout.take_branch_stock
+
+        def competing_checkout(branch, product, quantity):
+            BranchStock.objects.filter(branch=branch, product=product).update(stock=25)
+            return take_branch_stock(branch, product, quantity)
+
+        with mock.patch("store.checkout.take_branch_stock", side_effect=competing_checkout):
+            response = self.client.post(reverse("cart-view"), {"paid": "3000.00"})
+
+        self.assertRedirects(response, reverse("products-view"), fetch_redirect_response=False)
+        self.assertFalse(SalesDetails.objects.exclude(id=self.previous_sale.id).exists())
+        self.previous_sale.refresh_from_db()
+        self.assertEqual(self.previous_sale.unpaid_amount, Decimal("1000.00"))
+
+    def test_checkout_decrements_stock_and_constraint_rejects_negative_stock(self):
+        self.client.post(reverse("cart-view"), {"paid": "3000.00"})
+
+        row = BranchStock.objects.get(branch=self.branch, product=self.product)
+        self.assertEqual((row.stock, row.num_of_packages, row.num_items), (70, 7, 0))
+        self.assertTrue(checkout.take_branch_stock(self.branch, self.product, 65))
+        row.refresh_from_db()
+        self.assertEqual((row.stock, row.num_of_packages, row.num_items), (5, 0, 5))
+        self.assertFalse(checkout.take_branch_stock(self.branch, self.product, 6))
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BranchStock.objects.filter(pk=row.pk).update(stock=-1)
+
 
 class SalesReturnFlowTests(TestCase):
     def setUp(self):
@@ -695,3 +1793,19 @@ class SalesReturnFlowTests(TestCase):
         self.assertEqual(stock.stock, 48)
         self.assertEqual(stock.num_of_packages, 4)
         self.assertEqual(stock.num_items, 0)
+
+    def test_return_item_reverses_branch_daily_totals(self):
+        call_command("backfill_branch_daily_totals", "--tenant", self.tenant.slug, stdout=StringIO())
+        self.client.post(reverse("return-items", args=[self.sale_product.id]))
+
+        totals = sum_totals(daily_totals(self.tenant, self.branch))
+        self.assertEqual(totals["sales_total"], Decimal("0.00"))
+        self.assertEqual(totals["paid_total"], Decimal("0.00"))
+        self.assertEqual(totals["bill_count"], 1)
+
+    def test_return_item_reverses_sales_facts(self):
+        call_command("backfill_sales_facts", "--tenant", self.tenant.slug, stdout=StringIO())
+        self.client.post(reverse("return-items", args=[self.sale_product.id]))
+
+        fact = SalesFact.objects.get(tenant=self.tenant, product=self.product)
+        self.assertEqual((fact.quantity, fact.revenue, fact.line_count), (0, Decimal("0.00"), 0))
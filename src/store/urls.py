@@ -8,7 +8,11 @@ urlpatterns = [
     path("products/sale", views.products_view, name="products-view"),
     path("product/add", views.add_to_cart, name="add-to-cart"),
     path("sale/cart", views.cart_view, name="cart-view"),
+    path("sale/checkout", views.checkout_api, name="checkout-api"),
+    path("sale/offline-batch", views.offline_sales_api, name="offline-sales-api"),
     path("sale/cart/delete/<str:pid>", views.remove_cart_item, name="remove-cart-item"),
+    path("sale/cart/hold", views.hold_cart_view, name="hold-cart"),
+    path("sale/cart/resume/<uuid:cart_id>", views.resume_cart_view, name="resume-cart"),
     path("product/list", views.products_display, name="products_display"),
     path("product/<int:pid>/update", views.update_products, name="update-products"),
     path("product/<int:pid>/delete", views.delete_products, name="delete-products"),
@@ -20,6 +24,9 @@ urlpatterns = [
     path("dashboard/expense", views.expense, name="expense"),
     path("dashboard/summary", views.summary, name="summary"),
     path("dashboard/financial-reports", views.financial_reports, name="financial-reports"),
+    path("dashboard/sales-pivot", views.sales_pivot, name="sales-pivot"),
+    path("dashboard/export/<str:kind>", views.export_report, name="export-report"),
+    path("dashboard/ledger/<int:account_id>", views.general_ledger, name="general-ledger"),
     path("dashboard/returned", views.returned, name="returned"),
     path("dashboard/base-unit", views.base_unit, name="base-unit"),
     path("dashboard/unit/<str:unit_id>/update", views.update_base_unit, name="update-base-unit"),
@@ -1,30 +1,32 @@
 from datetime import date, timedelta
+from functools import partial
 from django.shortcuts import redirect, render, get_object_or_404
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib import messages
 from django.db import transaction
-from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models import Count, F, Q, Sum, Window
+from django.db.models.expressions import RowRange
+from django.utils.dateparse import parse_date
 from django.views.decorators.csrf import csrf_exempt
 from django.template.loader import render_to_string
 
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 
 from client.services import active_branch as _active_branch, active_tenant as _active_tenant
 from customer.forms import CustomerForm
-from customer.services import customer_account_summary, get_active_customer, is_walk_in_customer
+from customer.services import customer_account_summary, get_active_customer, get_or_create_walk_in_customer, is_walk_in_customer
 from store.filters import ProductsFilter, SalesDetailsFilter
 from .accounting import (
-    account_balances,
+    balances_as_of,
+    bump_ledger_version,
     ensure_default_accounts,
-    record_customer_payment_entry,
     record_expense_entry,
     record_other_income_entry,
     record_purchase_entry,
-    record_sale_entry,
 )
-from .models import BaseUnit, Branch, BranchStock, Category, Customer, ExchangeRate, OtherIncome, Expense, InventoryMovement, InventoryTransfer, JournalEntry, JournalLine, LedgerAccount, Products, SalesDetails, SalesProducts, Store, StoreMember, StoreStock, TenantStock, UserOnboarding
+from .models import BaseUnit, Branch, BranchStock, Category, Customer, ExchangeRate, OtherIncome, Expense, InventoryMovement, InventoryTransfer, JournalEntry, JournalLine, LedgerAccount, LedgerDailyBalance, Products, SalesDetails, SalesFact, SalesProducts, Store, StoreMember, StoreStock, TenantStock, UserOnboarding
 from .forms import BaseUnitForm, ExchangeRateForm, OtherIncomeForm, ExpenseForm, PurchaseForm, InventoryTransferForm
 from .permissions import (
     can_transfer_stock,
@@ -33,15 +35,24 @@ from .permissions import (
     has_tenant_scope_access,
     resolve_transfer_scope,
 )
+from .carts import add_cart_item, cart_items, forget_cart, held_carts, hold_cart, remove_cart_line, resume_cart
+from .checkout import InsufficientStock, checkout_lines, complete_sale, customer_due, ingest_offline_sales
+from .exports import EXPORTS, XLSX_AVAILABLE, csv_response, xlsx_response
+from .jalali import cover_jalali_calendar, month_label
+from .reporting import PIVOT_DIMENSIONS, build_financial_report, build_sales_pivot, cached_report, run_concurrently
+from .rollups import add_daily_totals, add_sale_totals, add_sales_facts, count_customers, daily_customers, daily_totals, sum_totals
 from django.utils.translation import gettext_lazy as _
 import jdatetime
 
 
 import json
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
 
 from .utils import safe_int, to_decimal
 
+LEDGER_PAGE_SIZE = 50
+OFFLINE_SALE_BATCH_LIMIT = 1000
+
 
 def _branch_and_store_access(request, tenant):
     user = request.user
@@ -127,6 +138,16 @@ def _apply_journal_scope(qs, scope_data):
         return qs.filter(Q(store=store) | Q(branch__store=store))
     return qs
 
+def _apply_journal_line_scope(qs, scope_data):
+    scope = scope_data.get("scope")
+    store = scope_data.get("store")
+    branch = scope_data.get("branch")
+    if scope == "branch" and branch:
+        return qs.filter(branch=branch)
+    if scope == "store" and store:
+        return qs.filter(store=store)
+    return qs
+
 def _resolve_inventory_scope(request, tenant, branch=None):
     if branch:
         return "branch", {"branch": branch}
@@ -318,16 +339,16 @@ def Home(request):
         .filter(tenant=tenant, branch_stocks__branch=branch, branch_stocks__num_of_packages__lt=10)
         .distinct()
     )
-    today_date = date.today()
-    sales_details = (
-        SalesDetails.objects
-        .filter(tenant=tenant, branch=branch, user=request.user, created_at__date=today_date)
-        .aggregate(
-            total_sale=Sum('total_amount'),
-            total_paid=Sum('paid_amount'),
-            total_unpaid=Sum('unpaid_amount'),
-            total_customer=Count('customer', distinct=True)  # Ensure distinct customers are counted
-        )
+    today_date = timezone.localdate()
+    sales_details = partial(
+        daily_totals(tenant, branch, today_date, today_date, user=request.user).aggregate,
+        total_sale=Sum('sales_total'),
+        total_paid=Sum('paid_total'),
+        total_unpaid=Sum('unpaid_total'),
+    )
+    customers = partial(
+        daily_customers(tenant, branch, today_date, today_date, user=request.user).aggregate,
+        total_customer=Count('customer'),
     )
     
     top_packages = (
@@ -336,16 +357,22 @@ def Home(request):
             sale_detail__tenant=tenant,
             sale_detail__branch=branch,
             sale_detail__user=request.user,
-            sale_detail__created_at__date=today_date,
+            sale_detail__business_date=today_date,
         )
         .values('product__name','product__category__name')  # Group by product name
         .annotate(total_package_qty=Sum('package_qty'))  # Calculate total package quantity for each product
         .order_by('-total_package_qty')[:10]  # Order by total package quantity in descending order
     )
+    results = run_concurrently(
+        sales_details=sales_details,
+        customers=customers,
+        top_packages=partial(list, top_packages),
+        order_products=partial(list, order_products),
+    )
     context = {
-        'top_packages':top_packages,
-        'sales_details':sales_details,
-        'order_products':order_products,
+        'top_packages':results['top_packages'],
+        'sales_details':{**results['sales_details'], **results['customers']},
+        'order_products':results['order_products'],
         'tenant': tenant,
         'store': store,
     }
@@ -774,20 +801,7 @@ def search_products(request):
 
 
 def remove_cart_item(request, pid):
-    cart = request.session.get('cart', {})
-    # Find the key of the item with the specified product_id
-    item_key_to_remove = None
-    for item_key, item in cart.items():
-        if str(item['product_id']) == pid:
-            item_key_to_remove = item_key
-            break
-
-    # Remove the item from the cart if found
-    if item_key_to_remove:
-        del cart[item_key_to_remove]
-
-        # Update the session
-        request.session['cart'] = cart
+    remove_cart_line(request, pid)
     return redirect('cart-view')
 
 # Add to Cart
@@ -842,18 +856,18 @@ def add_to_cart(request):
                 status=400,
             )
 
-        # Retrieve cart from session and update it
-        cart = request.session.get('cart', {})
-        cart[str(product_id)] = {
-            'product_id': product_id,
-            'item_quantity': item_quantity,
-            'package_quantity': package_quantity,
-            'item_price': item_price,
-            'package_price': package_price,
-        }
-        request.session['cart'] = cart  # Save updated cart back into session
+        cart_length = add_cart_item(
+            request,
+            {
+                'product_id': product_id,
+                'item_quantity': item_quantity,
+                'package_quantity': package_quantity,
+                'item_price': item_price,
+                'package_price': package_price,
+            },
+        )
 
-        return JsonResponse({"status": 200, "message": "success", "cart_length": len(cart)})
+        return JsonResponse({"status": 200, "message": "success", "cart_length": cart_length})
     
     return JsonResponse({"status": "error", "message": str(_("Invalid request."))}, status=400)
 
@@ -886,75 +900,17 @@ def cart_view(request):
         messages.error(request, _("Select a branch before checking out sales."))
         return redirect("select-branch")
 
-    # Retrieve cart and customer from session
-    cart = request.session.get('cart', {})
+    cart = cart_items(request)
     customer_session = request.session.get('customer', {})
-    cart_details = []
-    stock_updates = []
-    grand_total = Decimal("0.00")
-    pre_unpaid_amount = Decimal("0.00")
-    bill_total = Decimal("0.00")
-    payable_total = Decimal("0.00")
 
     if not cart:
-        return render(request, 'sale/cart_view.html', {'cart_details': [], 'grand_total': 0, 'customer': None})
+        return render(request, 'sale/cart_view.html', {'cart_details': [], 'grand_total': 0, 'customer': None, 'held_carts': held_carts(request)})
 
-    # Fetch all products at once
-    product_ids = [item['product_id'] for item in cart.values()]
-    products = Products.objects.filter(pk__in=product_ids, tenant=tenant).select_related()
-    product_mapping = {product.id: product for product in products}
-    branch_stocks = BranchStock.objects.filter(branch=branch, product_id__in=product_ids)
-    stock_mapping = {stock.product_id: stock for stock in branch_stocks}
-    missing_ids = [pid for pid in product_ids if pid not in stock_mapping]
-    if missing_ids:
-        BranchStock.objects.bulk_create(
-            [BranchStock(branch=branch, product_id=pid, stock=0, num_of_packages=0, num_items=0) for pid in missing_ids],
-            ignore_conflicts=True,
-        )
-        branch_stocks = BranchStock.objects.filter(branch=branch, product_id__in=product_ids)
-        stock_mapping = {stock.product_id: stock for stock in branch_stocks}
-
-    # Build cart details
-    for item in cart.values():
-        product = product_mapping.get(safe_int(item.get('product_id')))
-        if not product:
-            continue
-
-        item_quantity = safe_int(item.get('item_quantity'))
-        package_quantity = safe_int(item.get('package_quantity'))
-        item_price = to_decimal(item.get('item_price'))
-        package_price = to_decimal(item.get('package_price'))
-
-        # Calculate stock updates
-        package_contain = safe_int(product.package_contain, 1)  # Default to 1 to avoid division by zero
-        sold_stock = (package_quantity * package_contain) + item_quantity
-        stock_row = stock_mapping.get(product.id)
-        current_stock = safe_int(stock_row.stock if stock_row else 0)
-        new_stock = current_stock - sold_stock
-        if new_stock < 0:
-            messages.error(request, _("Insufficient stock for %(product)s.") % {"product": product.name})
-            return redirect("products-view")
-        if stock_row:
-            stock_row.stock = new_stock
-            stock_row.num_of_packages = new_stock // package_contain
-            stock_row.num_items = new_stock % package_contain
-            stock_updates.append(stock_row)
-        product.stock = current_stock
-        product.num_of_packages = safe_int(stock_row.num_of_packages if stock_row else 0)
-        product.num_items = safe_int(stock_row.num_items if stock_row else 0)
-
-        # Calculate subtotal and cart details
-        sub_total = to_decimal((Decimal(item_quantity) * item_price) + (Decimal(package_quantity) * package_price))
-        grand_total += sub_total
-        cart_details.append({
-            'product': product,
-            'item_quantity': item_quantity,
-            'package_quantity': package_quantity,
-            'item_price': item_price,
-            'package_price': package_price,
-            'sub_total': sub_total,
-            'sold_stock': sold_stock,
-        })
+    try:
+        cart_details = checkout_lines(tenant, branch, list(cart.values()))
+    except ValueError as exc:
+        messages.error(request, str(exc))
+        return redirect("products-view")
 
     # Retrieve customer instance
     customer_instance = None
@@ -963,120 +919,34 @@ def cart_view(request):
         customer_instance = Customer.objects.filter(pk=customer_pk, tenant=tenant).first()
     if not customer_instance:
         customer_instance = get_active_customer(request, tenant, create_if_missing=True)
-    if customer_instance:
-        pre_unpaid = SalesDetails.objects.filter(customer=customer_instance, tenant=tenant, branch=branch).aggregate(
-            total_unpaid=Sum('unpaid_amount')
-        )
-        pre_unpaid_amount = to_decimal(pre_unpaid['total_unpaid'] or 0)
-    bill_total = grand_total
+    pre_unpaid_amount = customer_due(customer_instance, tenant, branch)
+    bill_total = sum((item['sub_total'] for item in cart_details), Decimal("0.00"))
     payable_total = bill_total + pre_unpaid_amount
     # Handle sale submission
     if request.method == 'POST':
         try:
-            paid_amount = to_decimal(request.POST.get('paid', 0))
-            if paid_amount < 0:
-                messages.error(request, _("Paid amount cannot be negative."))
-                return redirect("cart-view")
-            if paid_amount > payable_total:
-                messages.error(request, _("Paid amount cannot be greater than the total payable amount."))
-                return redirect("cart-view")
-            unpaid_amount = payable_total - paid_amount
-
-            # Create SalesDetails instance
-            with transaction.atomic():
-                previous_unpaid_sales = list(
-                    SalesDetails.objects
-                    .select_for_update()
-                    .filter(customer=customer_instance, tenant=tenant, branch=branch, unpaid_amount__gt=0)
-                    .order_by("created_at", "id")
-                )
-                carried_forward_amount = sum(
-                    (to_decimal(sale.unpaid_amount or 0) for sale in previous_unpaid_sales),
-                    Decimal("0.00"),
-                )
-                if carried_forward_amount != pre_unpaid_amount:
-                    pre_unpaid_amount = carried_forward_amount
-                    payable_total = bill_total + carried_forward_amount
-                    if paid_amount > payable_total:
-                        messages.error(request, _("Paid amount cannot be greater than the total payable amount."))
-                        return redirect("cart-view")
-                    unpaid_amount = payable_total - paid_amount
-
-                for previous_sale in previous_unpaid_sales:
-                    previous_sale.unpaid_amount = Decimal("0.00")
-                    previous_sale.save(update_fields=["unpaid_amount"])
-
-                sales_details = SalesDetails.objects.create(
-                    user = request.user,
-                    tenant=tenant,
-                    branch=branch,
-                    customer=customer_instance,
-                    total_amount=bill_total,
-                    carried_forward_amount=carried_forward_amount,
-                    payable_amount=payable_total,
-                    paid_amount=paid_amount,
-                    unpaid_amount=unpaid_amount,
-                )
-                
-                # Bulk update product stock
-                if stock_updates:
-                    BranchStock.objects.bulk_update(stock_updates, ['stock', 'num_of_packages', 'num_items'])
-
-                # Bulk create SalesProducts
-                sales_products = [
-                    SalesProducts(
-                        sale_detail=sales_details,
-                        product=item['product'],  # Directly use the product instance
-                        item_price=item['item_price'],
-                        package_price=item['package_price'],
-                        item_qty=item['item_quantity'],
-                        package_qty=item['package_quantity'],
-                        total_price=item['sub_total'],
-                    ) for item in cart_details
-                ]
-                SalesProducts.objects.bulk_create(sales_products)
-
-                cogs_total = Decimal("0.00")
-                for item in cart_details:
-                    product = item["product"]
-                    package_contain = max(safe_int(getattr(product, "package_contain", 1), 1), 1)
-                    unit_cost = to_decimal(product.package_purchase_price or 0) / Decimal(package_contain)
-                    cogs_total += to_decimal(Decimal(item["sold_stock"]) * unit_cost)
-
-                applied_to_previous_due = min(paid_amount, carried_forward_amount)
-                current_sale_paid = paid_amount - applied_to_previous_due
-                current_sale_unpaid = bill_total - current_sale_paid
-
-                if applied_to_previous_due > Decimal("0.00"):
-                    record_customer_payment_entry(
-                        tenant=tenant,
-                        amount=applied_to_previous_due,
-                        store=branch.store,
-                        branch=branch,
-                        created_by=request.user,
-                        reference_id=sales_details.bill_number,
-                    )
-
-                record_sale_entry(
-                    tenant=tenant,
-                    sale_total=bill_total,
-                    paid_amount=current_sale_paid,
-                    unpaid_amount=current_sale_unpaid,
-                    cogs_total=cogs_total,
-                    store=branch.store,
-                    branch=branch,
-                    created_by=request.user,
-                    reference_id=sales_details.bill_number,
-                )
-
-            # Clear cart after successful sale
-            request.session['cart'] = {}
-            request.session['customer'] = {}
-            messages.success(request, _("Products have been sold successfully."))
-            return redirect("print-invoice", sales_details.bill_number)
+            sales_details = complete_sale(
+                tenant=tenant,
+                branch=branch,
+                user=request.user,
+                customer=customer_instance,
+                lines=cart_details,
+                paid_amount=to_decimal(request.POST.get('paid', 0)),
+            )
+        except InsufficientStock as exc:
+            messages.error(request, str(exc))
+            return redirect("products-view")
+        except ValueError as exc:
+            messages.error(request, str(exc))
+            return redirect("cart-view")
         except Exception as e:
             # Roll back the transaction and handle the error gracefully
             messages.error(request, _("An error occurred: %(error)s") % {"error": str(e)})
+        else:
+            forget_cart(request)
+            request.session['customer'] = {}
+            messages.success(request, _("Products have been sold successfully."))
+            return redirect("print-invoice", sales_details.bill_number)
 
     context = {
         'cart_details': cart_details,
@@ -1085,9 +955,116 @@ def cart_view(request):
         'customer': customer_instance,
         'total': bill_total,
         'payable_total': payable_total,
+        'held_carts': held_carts(request),
     }
     return render(request, 'sale/cart_view.html', context)
 
+
+def hold_cart_view(request):
+    if request.method != 'POST':
+        return redirect('cart-view')
+    if hold_cart(request, request.POST.get('label', '').strip()):
+        messages.success(request, _("Cart has been held."))
+    else:
+        messages.error(request, _("There is no cart to hold."))
+    return redirect('products-view')
+
+
+def resume_cart_view(request, cart_id):
+    if request.method != 'POST':
+        return redirect('cart-view')
+    if not resume_cart(request, cart_id):
+        messages.error(request, _("That cart is no longer held."))
+    return redirect('cart-view')
+
+
+def checkout_api(request):
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': str(_("Invalid request."))}, status=405)
+    if not request.user.is_authenticated:
+        return JsonResponse({'status': 'error', 'message': str(_("Sign in before selling."))}, status=401)
+    tenant = _active_tenant(request)
+    branch = _active_branch(request)
+    if not branch:
+        return JsonResponse({'status': 'error', 'message': str(_("Select an active branch before selling."))}, status=400)
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'status': 'error', 'message': str(_("Invalid JSON body."))}, status=400)
+
+    items = data.get('lines') if isinstance(data, dict) else None
+    if not items or not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return JsonResponse({'status': 'error', 'message': str(_("Add at least one line to the sale."))}, status=400)
+
+    try:
+        paid_amount = Decimal(str(data.get('paid', 0)))
+    except InvalidOperation:
+        paid_amount = None
+    if paid_amount is None or not paid_amount.is_finite() or paid_amount < 0:
+        return JsonResponse({'status': 'error', 'message': str(_("Enter a valid paid amount."))}, status=400)
+
+    customer_id = data.get('customer_id')
+    if customer_id:
+        customer = Customer.objects.filter(pk=safe_int(customer_id), tenant=tenant).first()
+        if not customer:
+            return JsonResponse({'status': 'error', 'message': str(_("Customer not found."))}, status=404)
+    else:
+        customer = get_or_create_walk_in_customer(tenant)
+
+    try:
+        lines = checkout_lines(tenant, branch, items)
+        if len(lines) != len(items):
+            return JsonResponse({'status': 'error', 'message': str(_("Product not found."))}, status=404)
+        sale = complete_sale(
+            tenant=tenant,
+            branch=branch,
+            user=request.user,
+            customer=customer,
+            lines=lines,
+            paid_amount=to_decimal(paid_amount),
+        )
+    except InsufficientStock as exc:
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=409)
+    except ValueError as exc:
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+
+    return JsonResponse({
+        'status': 'success',
+        'bill_number': sale.bill_number,
+        'total': str(sale.total_amount),
+        'carried_forward': str(sale.carried_forward_amount),
+        'payable': str(sale.payable_amount),
+        'paid': str(sale.paid_amount),
+        'unpaid': str(sale.unpaid_amount),
+        'invoice_url': reverse('print-invoice', args=[sale.bill_number]),
+    }, status=201)
+
+def offline_sales_api(request):
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': str(_("Invalid request."))}, status=405)
+    if not request.user.is_authenticated:
+        return JsonResponse({'status': 'error', 'message': str(_("Sign in before selling."))}, status=401)
+    tenant = _active_tenant(request)
+    branch = _active_branch(request)
+    if not branch:
+        return JsonResponse({'status': 'error', 'message': str(_("Select an active branch before selling."))}, status=400)
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'status': 'error', 'message': str(_("Invalid JSON body."))}, status=400)
+
+    documents = data.get('sales') if isinstance(data, dict) else None
+    if not isinstance(documents, list) or not all(isinstance(doc, dict) for doc in documents):
+        return JsonResponse({'status': 'error', 'message': str(_("Send the queued sales as a list."))}, status=400)
+    if len(documents) > OFFLINE_SALE_BATCH_LIMIT:
+        return JsonResponse(
+            {'status': 'error', 'message': str(_("Send at most %(count)s sales per batch.") % {"count": OFFLINE_SALE_BATCH_LIMIT})},
+            status=400,
+        )
+
+    results = ingest_offline_sales(tenant=tenant, branch=branch, user=request.user, documents=documents)
+    return JsonResponse({'status': 'success', 'results': results})
+
 def sold_products_view(request):
     tenant = _active_tenant(request)
     branch = _active_branch(request)
@@ -1144,6 +1121,7 @@ def return_items(request, pk):
 
     with transaction.atomic():
         sale_detail = SalesDetails.objects.select_for_update().get(pk=sale_detail.pk)
+        previous_totals = (sale_detail.total_amount, sale_detail.paid_amount, sale_detail.unpaid_amount)
 
         _adjust_stock(
             "branch",
@@ -1157,8 +1135,16 @@ def return_items(request, pk):
         sale_detail.paid_amount = min(to_decimal(sale_detail.paid_amount or 0), sale_detail.payable_amount)
         sale_detail.unpaid_amount = max(sale_detail.payable_amount - sale_detail.paid_amount, Decimal("0.00"))
         sale_detail.save(update_fields=["total_amount", "payable_amount", "paid_amount", "unpaid_amount"])
+        add_sale_totals(
+            sale_detail,
+            sales_total=sale_detail.total_amount - previous_totals[0],
+            paid_total=sale_detail.paid_amount - previous_totals[1],
+            unpaid_total=sale_detail.unpaid_amount - previous_totals[2],
+        )
 
+        add_sales_facts(sale_detail, [returned_product], sign=-1)
         returned_product.delete()
+        bump_ledger_version(tenant)
 
     messages.success(request, _("Item returned successfully."))
 
@@ -1184,19 +1170,21 @@ def income(request):
     if request.method == 'POST':
         form = OtherIncomeForm(request.POST)
         if form.is_valid():
-            income_obj = form.save(commit=False)
-            income_obj.tenant = tenant
-            income_obj.branch = branch
-            income_obj.save()
-            record_other_income_entry(
-                tenant=tenant,
-                amount=income_obj.amount,
-                store=store,
-                branch=branch,
-                created_by=request.user,
-                reference_id=income_obj.id,
-                memo=income_obj.source,
-            )
+            with transaction.atomic():
+                income_obj = form.save(commit=False)
+                income_obj.tenant = tenant
+                income_obj.branch = branch
+                income_obj.save()
+                add_daily_totals(income_obj.tenant_id, income_obj.branch_id, income_obj.date_created, income_total=income_obj.amount)
+                record_other_income_entry(
+                    tenant=tenant,
+                    amount=income_obj.amount,
+                    store=store,
+                    branch=branch,
+                    created_by=request.user,
+                    reference_id=income_obj.id,
+                    memo=income_obj.source,
+                )
             messages.success(request, _("Income has been added successfully"))
         else:
             messages.error(request, _("Something went wrong. Please try again"))
@@ -1216,19 +1204,21 @@ def expense(request):
     if request.method == 'POST':
         form = ExpenseForm(request.POST)
         if form.is_valid():
-            expense_obj = form.save(commit=False)
-            expense_obj.tenant = tenant
-            expense_obj.branch = branch
-            expense_obj.save()
-            record_expense_entry(
-                tenant=tenant,
-                amount=expense_obj.amount,
-                store=store,
-                branch=branch,
-                created_by=request.user,
-                reference_id=expense_obj.id,
-                memo=expense_obj.category,
-            )
+            with transaction.atomic():
+                expense_obj = form.save(commit=False)
+                expense_obj.tenant = tenant
+                expense_obj.branch = branch
+                expense_obj.save()
+                add_daily_totals(expense_obj.tenant_id, expense_obj.branch_id, expense_obj.date_created, expense_total=expense_obj.amount)
+                record_expense_entry(
+                    tenant=tenant,
+                    amount=expense_obj.amount,
+                    store=store,
+                    branch=branch,
+                    created_by=request.user,
+                    reference_id=expense_obj.id,
+                    memo=expense_obj.category,
+                )
             messages.success(request, _("Expense has been added successfully"))
         else:
             messages.error(request, _("Something went wrong. Please try again"))
@@ -1238,71 +1228,65 @@ def expense(request):
     }
     return render(request, 'partials/management/_expense-view.html', context)
 
-def summary(request):
-    tenant = _active_tenant(request)
-    branch = _active_branch(request)
-    sales = SalesDetails.objects.filter(tenant=tenant, branch=branch).order_by("-created_at")
-    sales_filter = SalesDetailsFilter(request.GET, queryset=sales)
-    filtered_sales = sales_filter.qs
-    totals = filtered_sales.aggregate(
-        total_paid_amount=Sum("paid_amount"),
-        total_unpaid_amount=Sum("unpaid_amount"),
-        total_sale_value=Sum(
-            ExpressionWrapper(
-                F("paid_amount") + F("unpaid_amount"),
-                output_field=DecimalField(),
+def _summary_report_data(tenant, branch, from_date, to_date):
+    rows = daily_totals(tenant, branch, from_date, to_date)
+    customers = daily_customers(tenant, branch, from_date, to_date)
+    facts = SalesFact.objects.filter(tenant=tenant, branch=branch)
+    if from_date:
+        facts = facts.filter(business_date__gte=from_date)
+    if to_date:
+        facts = facts.filter(business_date__lte=to_date)
+
+    cover_jalali_calendar(rows)
+    results = run_concurrently(
+        totals=partial(sum_totals, rows),
+        customers=partial(count_customers, customers),
+        daily_sales=partial(
+            list,
+            rows.filter(bill_count__gt=0)
+            .values("business_date")
+            .annotate(
+                sales=Sum("sales_total"),
+                paid=Sum("paid_total"),
+                unpaid=Sum("unpaid_total"),
             )
+            .order_by("business_date"),
+        ),
+        monthly_sales=partial(
+            list,
+            rows.values(month=F("calendar_day__month_key"))
+            .annotate(
+                sales=Sum("sales_total"),
+                paid=Sum("paid_total"),
+                unpaid=Sum("unpaid_total"),
+            )
+            .order_by("month"),
+        ),
+        top_products=partial(
+            list,
+            facts.values("product__name")
+            .annotate(total=Sum("revenue"))
+            .order_by("-total")[:6],
         ),
     )
-    total_customers = filtered_sales.aggregate(total_customer=Count("customer", distinct=True))
-
-    from_date = _parse_jalali_date(request.GET.get("from_date", ""))
-    to_date = _parse_jalali_date(request.GET.get("to_date", ""))
-
-    income_qs = OtherIncome.objects.filter(tenant=tenant, branch=branch)
-    expense_qs = Expense.objects.filter(tenant=tenant, branch=branch)
-
-    if from_date:
-        income_qs = income_qs.filter(date_created__gte=from_date)
-        expense_qs = expense_qs.filter(date_created__gte=from_date)
-    if to_date:
-        income_qs = income_qs.filter(date_created__lte=to_date)
-        expense_qs = expense_qs.filter(date_created__lte=to_date)
-
-    income_totals = income_qs.aggregate(total_amount=Sum("amount"))
-    expense_totals = expense_qs.aggregate(total_amount=Sum("amount"))
-
-    total_paid = to_decimal(totals["total_paid_amount"] or 0)
-    total_unpaid = to_decimal(totals["total_unpaid_amount"] or 0)
-    total_value = to_decimal(totals["total_sale_value"] or 0)
-    total_customer = total_customers["total_customer"] or 0
-    total_income = to_decimal(income_totals["total_amount"] or 0)
-    total_expense = to_decimal(expense_totals["total_amount"] or 0)
+    totals = results["totals"]
+
+    total_paid = to_decimal(totals["paid_total"])
+    total_unpaid = to_decimal(totals["unpaid_total"])
+    total_value = total_paid + total_unpaid
+    total_customer = results["customers"]
+    total_income = to_decimal(totals["income_total"])
+    total_expense = to_decimal(totals["expense_total"])
     net_balance = total_income - total_expense
 
-    daily_sales = list(
-        filtered_sales.values("created_at__date")
-        .annotate(
-            sales=Sum("total_amount"),
-            paid=Sum("paid_amount"),
-            unpaid=Sum("unpaid_amount"),
-        )
-        .order_by("created_at__date")
-    )
-    if len(daily_sales) > 31:
-        daily_sales = daily_sales[-31:]
-
-    trend_labels = [row["created_at__date"].isoformat() for row in daily_sales]
+    daily_sales = results["daily_sales"][-31:]
+    trend_labels = [row["business_date"].isoformat() for row in daily_sales]
     trend_sales = [float(to_decimal(row["sales"] or 0)) for row in daily_sales]
     trend_paid = [float(to_decimal(row["paid"] or 0)) for row in daily_sales]
     trend_unpaid = [float(to_decimal(row["unpaid"] or 0)) for row in daily_sales]
+    monthly_sales = results["monthly_sales"][-12:]
 
-    top_products_rows = list(
-        SalesProducts.objects.filter(sale_detail__in=filtered_sales)
-        .values("product__name")
-        .annotate(total=Sum("total_price"))
-        .order_by("-total")[:6]
-    )
+    top_products_rows = results["top_products"]
     top_product_labels = [row["product__name"] or _("Unknown Product") for row in top_products_rows]
     top_product_values = [float(to_decimal(row["total"] or 0)) for row in top_products_rows]
 
@@ -1314,9 +1298,7 @@ def summary(request):
         float(net_balance),
     ]
 
-    context = {
-        "sales": filtered_sales,
-        "filter": sales_filter,
+    return {
         "total_paid": total_paid,
         "total_unpaid": total_unpaid,
         "total_value": total_value,
@@ -1328,30 +1310,46 @@ def summary(request):
         "trend_sales": trend_sales,
         "trend_paid": trend_paid,
         "trend_unpaid": trend_unpaid,
+        "month_keys": [row["month"] for row in monthly_sales],
+        "month_sales": [float(to_decimal(row["sales"] or 0)) for row in monthly_sales],
+        "month_paid": [float(to_decimal(row["paid"] or 0)) for row in monthly_sales],
+        "month_unpaid": [float(to_decimal(row["unpaid"] or 0)) for row in monthly_sales],
         "payment_mix": [float(total_paid), float(total_unpaid)],
         "top_product_labels": top_product_labels,
         "top_product_values": top_product_values,
         "revenue_cost_labels": revenue_vs_cost_labels,
         "revenue_cost_values": revenue_vs_cost_values,
     }
-    return render(request, "partials/management/_summary-view.html", context)
 
 
-def financial_reports(request):
+def summary(request):
     tenant = _active_tenant(request)
-    if not tenant:
-        return redirect("select-tenant")
-
-    ensure_default_accounts(tenant)
-    scope_data = _resolve_reporting_scope(request, tenant)
-    scope = scope_data.get("scope")
-    if not scope:
-        messages.error(request, _("No reporting scope available for your account."))
-        return redirect("home")
+    branch = _active_branch(request)
+    sales = SalesDetails.objects.filter(tenant=tenant, branch=branch).order_by("-created_at")
+    sales_filter = SalesDetailsFilter(request.GET, queryset=sales)
+    filtered_sales = sales_filter.qs
 
     from_date = _parse_jalali_date(request.GET.get("from_date", ""))
     to_date = _parse_jalali_date(request.GET.get("to_date", ""))
+    report_params = {"branch": getattr(branch, "pk", None), "query": sorted(request.GET.lists())}
+
+    report = cached_report(
+        "summary",
+        tenant,
+        report_params,
+        partial(_summary_report_data, tenant, branch, from_date, to_date),
+    )
+    context = {
+        "sales": filtered_sales,
+        "filter": sales_filter,
+        **report,
+        "month_labels": [month_label(key) for key in report["month_keys"]],
+    }
+    return render(request, "partials/management/_summary-view.html", context)
 
+
+def _financial_report_data(tenant, scope_data, from_date, to_date):
+    scope = scope_data.get("scope")
     sales_qs = _apply_branch_scope(SalesDetails.objects.filter(tenant=tenant), scope_data)
     income_qs = _apply_branch_scope(OtherIncome.objects.filter(tenant=tenant), scope_data)
     expense_qs = _apply_branch_scope(Expense.objects.filter(tenant=tenant), scope_data)
@@ -1359,56 +1357,56 @@ def financial_reports(request):
         JournalEntry.objects.filter(tenant=tenant).select_related("store", "branch", "created_by"),
         scope_data,
     )
+    balance_qs = _apply_journal_scope(LedgerDailyBalance.objects.filter(tenant=tenant), scope_data)
 
     if from_date:
-        sales_qs = sales_qs.filter(created_at__date__gte=from_date)
+        sales_qs = sales_qs.filter(business_date__gte=from_date)
         income_qs = income_qs.filter(date_created__gte=from_date)
         expense_qs = expense_qs.filter(date_created__gte=from_date)
         journal_qs = journal_qs.filter(entry_date__gte=from_date)
+        balance_qs = balance_qs.filter(entry_date__gte=from_date)
     if to_date:
-        sales_qs = sales_qs.filter(created_at__date__lte=to_date)
+        sales_qs = sales_qs.filter(business_date__lte=to_date)
         income_qs = income_qs.filter(date_created__lte=to_date)
         expense_qs = expense_qs.filter(date_created__lte=to_date)
         journal_qs = journal_qs.filter(entry_date__lte=to_date)
+        balance_qs = balance_qs.filter(entry_date__lte=to_date)
 
-    sales_total = to_decimal(sales_qs.aggregate(total=Sum("total_amount"))["total"] or 0)
-    paid_total = to_decimal(sales_qs.aggregate(total=Sum("paid_amount"))["total"] or 0)
-    unpaid_total = to_decimal(sales_qs.aggregate(total=Sum("unpaid_amount"))["total"] or 0)
-
-    journal_lines = JournalLine.objects.filter(journal_entry__in=journal_qs).select_related("account", "journal_entry")
-    ledger_rows = account_balances(journal_lines)
-    account_by_code = {row["code"]: row for row in ledger_rows}
-
-    cash_balance = to_decimal(account_by_code.get("1000", {}).get("balance", 0))
-    receivable_balance = to_decimal(account_by_code.get("1100", {}).get("balance", 0))
-    inventory_balance = to_decimal(account_by_code.get("1200", {}).get("balance", 0))
-    payable_balance = to_decimal(account_by_code.get("2000", {}).get("balance", 0))
-    sales_revenue = to_decimal(account_by_code.get("4000", {}).get("balance", 0))
-    other_income_value = to_decimal(account_by_code.get("4100", {}).get("balance", 0))
-    cogs_total = to_decimal(account_by_code.get("5000", {}).get("balance", 0))
-    operating_expense = to_decimal(account_by_code.get("6100", {}).get("balance", 0))
+    results = run_concurrently(
+        report=partial(build_financial_report, balance_qs, sales_qs),
+        position_rows=partial(
+            balances_as_of,
+            tenant,
+            as_of=to_date,
+            store=scope_data.get("store") if scope == "store" else None,
+            branch=scope_data.get("branch") if scope == "branch" else None,
+        ),
+        entries=partial(list, journal_qs.prefetch_related("lines__account")[:60]),
+        trx_type_rows=partial(list, journal_qs.values("reference_type").annotate(count=Count("id")).order_by("-count")),
+        manual_income=partial(income_qs.aggregate, total=Sum("amount")),
+        manual_expense=partial(expense_qs.aggregate, total=Sum("amount")),
+    )
+    report = results["report"]
+    ledger_rows = report.ledger_rows
+    position_rows = results["position_rows"]
+    position_by_code = {row["code"]: row for row in position_rows}
 
-    gross_profit = sales_revenue - cogs_total
-    net_profit = (sales_revenue + other_income_value) - (cogs_total + operating_expense)
+    cash_balance = to_decimal(position_by_code.get("1000", {}).get("balance", 0))
+    receivable_balance = to_decimal(position_by_code.get("1100", {}).get("balance", 0))
+    inventory_balance = to_decimal(position_by_code.get("1200", {}).get("balance", 0))
+    payable_balance = to_decimal(position_by_code.get("2000", {}).get("balance", 0))
 
     assets_total = sum(
-        (to_decimal(row["balance"]) for row in ledger_rows if row["account_type"] == "asset"),
+        (to_decimal(row["balance"]) for row in position_rows if row["account_type"] == "asset"),
         Decimal("0.00"),
     )
     liabilities_total = sum(
-        (to_decimal(row["balance"]) for row in ledger_rows if row["account_type"] == "liability"),
+        (to_decimal(row["balance"]) for row in position_rows if row["account_type"] == "liability"),
         Decimal("0.00"),
     )
 
-    purchase_total = to_decimal(
-        journal_lines.filter(
-            account__code="1200",
-            journal_entry__reference_type="purchase",
-        ).aggregate(total=Sum("debit"))["total"] or 0
-    )
-
     transactions = []
-    for entry in journal_qs.prefetch_related("lines__account")[:60]:
+    for entry in results["entries"]:
         total_amount = sum((to_decimal(line.debit) for line in entry.lines.all()), Decimal("0.00"))
         transactions.append(
             {
@@ -1417,53 +1415,7 @@ def financial_reports(request):
             }
         )
 
-    sales_daily_rows = list(
-        sales_qs.values("created_at__date").annotate(total=Sum("total_amount")).order_by("created_at__date")
-    )
-    sales_daily_map = {row["created_at__date"]: float(to_decimal(row["total"] or 0)) for row in sales_daily_rows}
-
-    purchase_daily_rows = list(
-        journal_lines.filter(
-            account__code="1200",
-            journal_entry__reference_type="purchase",
-        )
-        .values("journal_entry__entry_date")
-        .annotate(total=Sum("debit"))
-        .order_by("journal_entry__entry_date")
-    )
-    purchase_daily_map = {row["journal_entry__entry_date"]: float(to_decimal(row["total"] or 0)) for row in purchase_daily_rows}
-
-    income_daily_rows = list(
-        journal_lines.filter(account__code="4100")
-        .values("journal_entry__entry_date")
-        .annotate(total=Sum("credit"))
-        .order_by("journal_entry__entry_date")
-    )
-    income_daily_map = {row["journal_entry__entry_date"]: float(to_decimal(row["total"] or 0)) for row in income_daily_rows}
-
-    cogs_daily_rows = list(
-        journal_lines.filter(account__code="5000")
-        .values("journal_entry__entry_date")
-        .annotate(total=Sum("debit"))
-        .order_by("journal_entry__entry_date")
-    )
-    cogs_daily_map = {row["journal_entry__entry_date"]: float(to_decimal(row["total"] or 0)) for row in cogs_daily_rows}
-
-    expense_daily_rows = list(
-        journal_lines.filter(account__code="6100")
-        .values("journal_entry__entry_date")
-        .annotate(total=Sum("debit"))
-        .order_by("journal_entry__entry_date")
-    )
-    expense_daily_map = {row["journal_entry__entry_date"]: float(to_decimal(row["total"] or 0)) for row in expense_daily_rows}
-
-    all_dates = sorted(
-        set(sales_daily_map.keys())
-        | set(purchase_daily_map.keys())
-        | set(income_daily_map.keys())
-        | set(cogs_daily_map.keys())
-        | set(expense_daily_map.keys())
-    )
+    all_dates = sorted(report.daily)
     if not all_dates:
         range_end = to_date or timezone.localdate()
         range_start = from_date or (range_end - timedelta(days=13))
@@ -1472,17 +1424,21 @@ def financial_reports(request):
         all_dates = all_dates[-31:]
 
     trend_labels = [d.isoformat() for d in all_dates]
-    trend_sales = [sales_daily_map.get(d, 0.0) for d in all_dates]
-    trend_purchase = [purchase_daily_map.get(d, 0.0) for d in all_dates]
-    trend_expense = [expense_daily_map.get(d, 0.0) for d in all_dates]
+    trend_sales = report.series("sales", all_dates)
+    trend_purchase = report.series("purchase", all_dates)
+    trend_expense = report.series("expense", all_dates)
     trend_net = [
-        (sales_daily_map.get(d, 0.0) + income_daily_map.get(d, 0.0))
-        - (expense_daily_map.get(d, 0.0) + cogs_daily_map.get(d, 0.0))
-        for d in all_dates
+        (sales + income) - (expense + cogs)
+        for sales, income, expense, cogs in zip(
+            trend_sales,
+            report.series("income", all_dates),
+            trend_expense,
+            report.series("cogs", all_dates),
+        )
     ]
 
     reference_choices = dict(JournalEntry.REFERENCE_TYPE_CHOICES)
-    trx_type_rows = list(journal_qs.values("reference_type").annotate(count=Count("id")).order_by("-count"))
+    trx_type_rows = results["trx_type_rows"]
     trx_type_labels = [reference_choices.get(row["reference_type"], row["reference_type"]) for row in trx_type_rows]
     trx_type_values = [row["count"] for row in trx_type_rows]
 
@@ -1490,31 +1446,25 @@ def financial_reports(request):
     ledger_top_labels = [f'{row["code"]} {row["name"]}' for row in ledger_top_rows]
     ledger_top_values = [float(to_decimal(row["balance"])) for row in ledger_top_rows]
 
-    context = {
-        "scope": scope,
-        "scope_store": scope_data.get("store"),
-        "scope_branch": scope_data.get("branch"),
-        "store_options": scope_data.get("store_options"),
-        "branch_options": scope_data.get("branch_options"),
-        "can_tenant_scope": scope_data.get("can_tenant_scope"),
-        "sales_total": sales_total,
-        "paid_total": paid_total,
-        "unpaid_total": unpaid_total,
-        "purchase_total": purchase_total,
-        "gross_profit": gross_profit,
-        "net_profit": net_profit,
+    return {
+        "sales_total": report.sales_total,
+        "paid_total": report.paid_total,
+        "unpaid_total": report.unpaid_total,
+        "purchase_total": report.purchase_total,
+        "gross_profit": report.gross_profit,
+        "net_profit": report.net_profit,
         "cash_balance": cash_balance,
         "receivable_balance": receivable_balance,
         "inventory_balance": inventory_balance,
         "payable_balance": payable_balance,
         "assets_total": assets_total,
         "liabilities_total": liabilities_total,
-        "sales_revenue": sales_revenue,
-        "other_income_value": other_income_value,
-        "cogs_total": cogs_total,
-        "operating_expense": operating_expense,
-        "manual_income_total": to_decimal(income_qs.aggregate(total=Sum("amount"))["total"] or 0),
-        "manual_expense_total": to_decimal(expense_qs.aggregate(total=Sum("amount"))["total"] or 0),
+        "sales_revenue": report.sales_revenue,
+        "other_income_value": report.other_income,
+        "cogs_total": report.cogs,
+        "operating_expense": report.operating_expense,
+        "manual_income_total": to_decimal(results["manual_income"]["total"] or 0),
+        "manual_expense_total": to_decimal(results["manual_expense"]["total"] or 0),
         "ledger_rows": ledger_rows,
         "transactions": transactions,
         "trend_labels": trend_labels,
@@ -1524,10 +1474,10 @@ def financial_reports(request):
         "trend_net": trend_net,
         "pnl_labels": [_("Sales Revenue"), _("Other Income"), _("COGS"), _("Operating Expense")],
         "pnl_values": [
-            float(sales_revenue),
-            float(other_income_value),
-            float(cogs_total),
-            float(operating_expense),
+            float(report.sales_revenue),
+            float(report.other_income),
+            float(report.cogs),
+            float(report.operating_expense),
         ],
         "asset_liability_labels": [_("Assets"), _("Liabilities")],
         "asset_liability_values": [float(assets_total), float(liabilities_total)],
@@ -1536,9 +1486,211 @@ def financial_reports(request):
         "ledger_top_labels": ledger_top_labels,
         "ledger_top_values": ledger_top_values,
     }
+
+
+def financial_reports(request):
+    tenant = _active_tenant(request)
+    if not tenant:
+        return redirect("select-tenant")
+
+    ensure_default_accounts(tenant)
+    scope_data = _resolve_reporting_scope(request, tenant)
+    scope = scope_data.get("scope")
+    if not scope:
+        messages.error(request, _("No reporting scope available for your account."))
+        return redirect("home")
+
+    from_date = _parse_jalali_date(request.GET.get("from_date", ""))
+    to_date = _parse_jalali_date(request.GET.get("to_date", ""))
+
+    report_params = {
+        "scope": scope,
+        "store": getattr(scope_data.get("store"), "pk", None),
+        "branch": getattr(scope_data.get("branch"), "pk", None),
+        "from_date": from_date,
+        "to_date": to_date,
+        "today": timezone.localdate(),
+    }
+    context = {
+        "scope": scope,
+        "scope_store": scope_data.get("store"),
+        "scope_branch": scope_data.get("branch"),
+        "store_options": scope_data.get("store_options"),
+        "branch_options": scope_data.get("branch_options"),
+        "can_tenant_scope": scope_data.get("can_tenant_scope"),
+        **cached_report(
+            "financial",
+            tenant,
+            report_params,
+            partial(_financial_report_data, tenant, scope_data, from_date, to_date),
+        ),
+    }
     return render(request, "partials/management/_financial_reports.html", context)
 
 
+def sales_pivot(request):
+    tenant = _active_tenant(request)
+    scope_data = _resolve_reporting_scope(request, tenant)
+    if not tenant or not scope_data.get("scope"):
+        return JsonResponse({'status': 'error', 'message': str(_("No reporting scope available for your account."))}, status=403)
+
+    rows = request.GET.get("rows", "category")
+    columns = request.GET.get("columns") or None
+    measure = request.GET.get("measure", "revenue")
+    from_date = _parse_jalali_date(request.GET.get("from_date", ""))
+    to_date = _parse_jalali_date(request.GET.get("to_date", ""))
+
+    facts = _apply_branch_scope(SalesFact.objects.filter(tenant=tenant), scope_data)
+    if from_date:
+        facts = facts.filter(business_date__gte=from_date)
+    if to_date:
+        facts = facts.filter(business_date__lte=to_date)
+    drill_down = {}
+    for dimension in ("branch", "category", "product", "cashier"):
+        value = safe_int(request.GET.get(dimension), 0)
+        if value:
+            drill_down[dimension] = value
+            facts = facts.filter(**{PIVOT_DIMENSIONS[dimension][0]: value})
+
+    report_params = {
+        "scope": scope_data["scope"],
+        "store": getattr(scope_data.get("store"), "pk", None),
+        "branch": getattr(scope_data.get("branch"), "pk", None),
+        "from_date": from_date,
+        "to_date": to_date,
+        "rows": rows,
+        "columns": columns,
+        "measure": measure,
+        "drill_down": drill_down,
+    }
+    try:
+        pivot = cached_report("sales_pivot", tenant, report_params, partial(build_sales_pivot, facts, rows, columns, measure))
+    except ValueError as exc:
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+    return JsonResponse({'status': 'success', 'filters': drill_down, **pivot})
+
+
+def _export_queryset(kind, tenant, scope_data, from_date, to_date):
+    if kind == "journal":
+        qs = _apply_journal_line_scope(JournalLine.objects.filter(tenant=tenant), scope_data)
+        date_field = "entry_date"
+    elif kind == "stock":
+        return _apply_branch_scope(BranchStock.objects.filter(branch__store__tenant=tenant), scope_data)
+    elif kind == "sale-lines":
+        qs = _apply_branch_scope(SalesProducts.objects.filter(sale_detail__tenant=tenant), scope_data, "sale_detail__branch")
+        date_field = "sale_detail__business_date"
+    else:
+        qs = _apply_branch_scope(SalesDetails.objects.filter(tenant=tenant), scope_data)
+        date_field = "business_date"
+    if from_date:
+        qs = qs.filter(**{f"{date_field}__gte": from_date})
+    if to_date:
+        qs = qs.filter(**{f"{date_field}__lte": to_date})
+    return qs
+
+
+def export_report(request, kind):
+    tenant = _active_tenant(request)
+    if not tenant:
+        return redirect("select-tenant")
+    if kind not in EXPORTS:
+        raise Http404
+    scope_data = _resolve_reporting_scope(request, tenant)
+    if not scope_data.get("scope"):
+        messages.error(request, _("No reporting scope available for your account."))
+        return redirect("home")
+
+    as_xlsx = request.GET.get("format") == "xlsx"
+    if as_xlsx and not XLSX_AVAILABLE:
+        return HttpResponse(_("Excel export needs the openpyxl package on the server; export as CSV instead."), status=400, content_type="text/plain")
+
+    from_date = _parse_jalali_date(request.GET.get("from_date", ""))
+    to_date = _parse_jalali_date(request.GET.get("to_date", ""))
+    queryset = _export_queryset(kind, tenant, scope_data, from_date, to_date)
+    header, rows = EXPORTS[kind](queryset, jalali=request.GET.get("jalali") == "1")
+    filename = f"{kind}-{timezone.localdate():%Y%m%d}"
+
+    if as_xlsx:
+        return xlsx_response(filename, header, rows)
+    return csv_response(filename, header, rows)
+
+
+def general_ledger(request, account_id):
+    tenant = _active_tenant(request)
+    if not tenant:
+        return redirect("select-tenant")
+
+    account = get_object_or_404(LedgerAccount, pk=account_id, tenant=tenant)
+    scope_data = _resolve_reporting_scope(request, tenant)
+    if not scope_data.get("scope"):
+        messages.error(request, _("No reporting scope available for your account."))
+        return redirect("home")
+
+    if account.account_type in {"asset", "expense"}:
+        signed_amount = F("debit") - F("credit")
+    else:
+        signed_amount = F("credit") - F("debit")
+
+    lines = _apply_journal_line_scope(
+        JournalLine.objects.filter(tenant=tenant, account=account),
+        scope_data,
+    )
+
+    # Keyset cursor: the page continues after the (entry_date, line id) of the previous page's last row.
+    after_date = parse_date(request.GET.get("after_date") or "")
+    after_id = safe_int(request.GET.get("after_id"), 0)
+    opening_balance = Decimal("0.00")
+    if after_date and after_id:
+        earlier_days = _apply_journal_scope(
+            LedgerDailyBalance.objects.filter(tenant=tenant, account=account, entry_date__lt=after_date),
+            scope_data,
+        ).aggregate(total=Sum(signed_amount))
+        same_day = lines.filter(entry_date=after_date, id__lte=after_id).aggregate(total=Sum(signed_amount))
+        opening_balance = to_decimal(earlier_days["total"] or 0) + to_decimal(same_day["total"] or 0)
+        lines = lines.filter(
+            Q(entry_date__gt=after_date)
+            | Q(entry_date=after_date, id__gt=after_id)
+        )
+
+    page = list(
+        lines.select_related("journal_entry")
+        .annotate(
+            running_total=Window(
+                expression=Sum(signed_amount),
+                order_by=[F("entry_date").asc(), F("id").asc()],
+                frame=RowRange(start=None, end=0),
+            )
+        )
+        .order_by("entry_date", "id")[:LEDGER_PAGE_SIZE + 1]
+    )
+    has_next = len(page) > LEDGER_PAGE_SIZE
+    page = page[:LEDGER_PAGE_SIZE]
+    for line in page:
+        line.running_balance = opening_balance + to_decimal(line.running_total or 0)
+
+    scope_query = request.GET.copy()
+    scope_query.pop("after_date", None)
+    scope_query.pop("after_id", None)
+    next_query = None
+    if has_next and page:
+        next_query = scope_query.copy()
+        next_query["after_date"] = page[-1].entry_date.isoformat()
+        next_query["after_id"] = page[-1].id
+
+    context = {
+        "account": account,
+        "lines": page,
+        "opening_balance": opening_balance,
+        "first_page_query": scope_query.urlencode(),
+        "next_page_query": next_query.urlencode() if next_query else "",
+        "is_first_page": not (after_date and after_id),
+        "scope": scope_data.get("scope"),
+        "scope_store": scope_data.get("store"),
+        "scope_branch": scope_data.get("branch"),
+    }
+    return render(request, "partials/management/_general_ledger.html", context)
+
+
 def returned(request):
     bill_query = request.GET.get('bill')
     customer_query = request.GET.get('customer')
@@ -1723,7 +1875,7 @@ def scanner_view(request):
 def cart_fragment(request):
     tenant = _active_tenant(request)
     branch = _active_branch(request)
-    cart = request.session.get('cart', {})
+    cart = cart_items(request)
     customer_session = request.session.get('customer', {})
     cart_details = []
     grand_total = Decimal("0.00")